@@ -6,6 +6,15 @@ from flask_cors import CORS
 import os
 from app.upload import upload_bp  # Importar el blueprint de upload
 from app.routes.layers import layers_bp  # Mantener importación de layers
+from app.routes.jobs import jobs_bp  # Estado de los trabajos de ingesta en segundo plano
+from app.routes.status import status_bp  # Métricas internas (pool de conexiones, cliente de GeoServer)
+from app.routes.stats import stats_bp  # Estadísticas y agregados de las capas calculados en PostgreSQL
+from app.routes.tiles import tiles_bp  # Teselas vectoriales (MVT) generadas desde PostGIS
+from app.routes.search import search_bp  # Búsqueda por nombre con índices de trigramas
+from app.routes.feature_info import feature_info_bp  # Consulta de elementos en un punto para varias capas
+from app.routes.metrics import metrics_bp  # Métricas en formato Prometheus
+from app.metrics import instrument_app
+from app.jobs import recover_interrupted_jobs
 
 def create_app():
     """
@@ -30,6 +39,19 @@ def create_app():
     # Registrar blueprints - upload_bp sin prefijo ya que ya define la ruta completa
     app.register_blueprint(upload_bp)  # Sin url_prefix, el blueprint ya usa /api/upload-shapefile
     app.register_blueprint(layers_bp, url_prefix='/api/layers')
+    app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+    app.register_blueprint(status_bp, url_prefix='/api/status')
+    app.register_blueprint(stats_bp, url_prefix='/api/stats')
+    app.register_blueprint(tiles_bp, url_prefix='/api/tiles')
+    app.register_blueprint(search_bp, url_prefix='/api/search')
+    app.register_blueprint(feature_info_bp, url_prefix='/api/feature-info')
+    app.register_blueprint(metrics_bp, url_prefix='/api/metrics')
+    
+    # Latencia de cada petición para /api/metrics
+    instrument_app(app)
+    
+    # Trabajos que quedaron en curso en un proceso que ya terminó (reinicio o recarga)
+    recover_interrupted_jobs()
     
     # Endpoint para verificar CORS
     @app.route('/api/cors-test', methods=['GET', 'OPTIONS'])
@@ -0,0 +1,149 @@
+"""
+Caché en memoria de resultados calculados por capa (estadísticas, catálogo...).
+Cada entrada se guarda junto con la versión de la tabla en PostGIS; la versión
+combina el OID de la tabla (cambia cuando la capa se vuelve a subir, porque la
+tabla se reemplaza), su relfilenode (cambia cuando se reescribe) y los contadores
+de filas insertadas/actualizadas/eliminadas. Como esos contadores vuelven a cero
+con pg_stat_reset() o al reiniciar PostgreSQL, la versión incluye también el
+instante de la última puesta a cero de las estadísticas (o del arranque), para
+que una versión antigua no coincida con un contenido distinto.
+Así, aunque la invalidación explícita solo llegue al proceso que atendió la
+subida, el resto de procesos del servidor detectan el cambio por sí mismos.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from app.config import CACHE_CONFIG
+from app.database import get_connection
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+# Versiones consultadas recientemente: {capa: (versión, instante de la consulta)}
+_versions = {}
+
+# Funciones a las que se avisa cuando una capa cambia o se elimina
+_subscribers = []
+
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def layer_version(layer_name):
+    """
+    Versión actual de una tabla de PostGIS.
+    El resultado se reutiliza durante CACHE_CONFIG['version_check_seconds'].
+
+    Args:
+        layer_name: Nombre de la tabla
+
+    Returns:
+        tuple: (oid, relfilenode, época de las estadísticas en µs, cambios acumulados)
+               o None si la tabla no existe
+    """
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _versions.get(layer_name)
+    if cached and now - cached[1] < CACHE_CONFIG['version_check_seconds']:
+        return cached[0]
+
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT c.oid::bigint,
+                       c.relfilenode::bigint,
+                       (extract(epoch FROM GREATEST(
+                           pg_postmaster_start_time(),
+                           pg_stat_get_db_stat_reset_time(
+                               (SELECT oid FROM pg_database WHERE datname = current_database()))
+                       )) * 1000000)::bigint,
+                       COALESCE(s.n_tup_ins + s.n_tup_upd + s.n_tup_del, 0)
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+                WHERE n.nspname = 'public' AND c.relname = %s
+            """, (layer_name,))
+            row = cursor.fetchone()
+
+    version = tuple(row) if row else None
+    with _cache_lock:
+        _versions[layer_name] = (version, now)
+    return version
+
+
+def cached_for_layer(layer_name, key, loader):
+    """
+    Devuelve un resultado cacheado para una capa o lo calcula con loader()
+
+    Args:
+        layer_name: Nombre de la tabla de la que depende el resultado
+        key: Clave del resultado dentro de la capa (hashable)
+        loader: Función sin argumentos que calcula el resultado
+
+    Returns:
+        tuple: (resultado, True si vino de la caché)
+    """
+    version = layer_version(layer_name)
+    cache_key = (layer_name, key)
+    now = time.monotonic()
+
+    with _cache_lock:
+        entry = _cache.get(cache_key)
+        if entry and entry[0] == version and now - entry[1] < CACHE_CONFIG['ttl']:
+            _cache.move_to_end(cache_key)
+            _stats['hits'] += 1
+            return entry[2], True
+        _stats['misses'] += 1
+
+    value = loader()
+
+    with _cache_lock:
+        _cache[cache_key] = (version, now, value)
+        _cache.move_to_end(cache_key)
+        while len(_cache) > CACHE_CONFIG['max_entries']:
+            _cache.popitem(last=False)
+    return value, False
+
+
+def invalidate_layer(layer_name):
+    """
+    Descarta los resultados cacheados de una capa y avisa a los suscriptores.
+    Se llama tras importar, actualizar o eliminar la capa.
+
+    Args:
+        layer_name: Nombre de la tabla modificada
+    """
+    with _cache_lock:
+        for cache_key in [k for k in _cache if k[0] == layer_name]:
+            del _cache[cache_key]
+        _versions.pop(layer_name, None)
+        _stats['invalidations'] += 1
+        subscribers = list(_subscribers)
+
+    for callback in subscribers:
+        try:
+            callback(layer_name)
+        except Exception as e:
+            print(f"⚠️ Error al notificar el cambio de la capa {layer_name}: {str(e)}")
+
+
+def subscribe(callback):
+    """
+    Registra una función que se llama con el nombre de la capa cada vez que se invalida
+
+    Args:
+        callback: Función callback(layer_name)
+    """
+    with _cache_lock:
+        _subscribers.append(callback)
+
+
+def cache_stats():
+    """
+    Estado de la caché por capa
+
+    Returns:
+        dict: Entradas, aciertos, fallos e invalidaciones
+    """
+    with _cache_lock:
+        return {**_stats, 'entries': len(_cache), 'max_entries': CACHE_CONFIG['max_entries']}
@@ -0,0 +1,209 @@
+"""
+Catálogo de capas servido por /api/layers/.
+Se construye a partir de geometry_columns de PostGIS (columna y tipo de
+geometría, SRID, registros estimados y extensión) combinado con el estado de
+publicación en GeoServer, y se mantiene en memoria:
+
+- Las capas se recargan de forma incremental: solo las que son nuevas, las
+  que cambiaron de OID (se volvieron a subir) o las que se invalidaron desde
+  app.cache (subida, actualización o eliminación en este proceso).
+- La respuesta serializada y su ETag se reutilizan mientras nada cambie, de
+  modo que listar miles de capas cuesta una respuesta 304 o un JSON ya hecho.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from app.cache import subscribe
+from app.config import CATALOG_CONFIG, GEOSERVER_CONFIG
+from app.database import get_connection
+from app.geoserver import get_geoserver_client
+from app.loader import is_staging_table
+from app.utils import format_response
+
+_LAYER_QUERY = """
+    SELECT g.f_table_name,
+           g.f_geometry_column,
+           g.type,
+           g.srid,
+           c.oid::bigint,
+           c.reltuples::bigint,
+           ST_XMin(x.extent), ST_YMin(x.extent), ST_XMax(x.extent), ST_YMax(x.extent)
+    FROM geometry_columns g
+    JOIN pg_namespace n ON n.nspname = g.f_table_schema
+    JOIN pg_class c ON c.relnamespace = n.oid AND c.relname = g.f_table_name
+    LEFT JOIN LATERAL (
+        -- Extensión estimada a partir de las estadísticas (no recorre la tabla)
+        SELECT CASE WHEN g.srid IN (0, 4326) THEN e::geometry
+                    ELSE ST_Transform(ST_SetSRID(e::geometry, g.srid), 4326) END AS extent
+        FROM ST_EstimatedExtent(g.f_table_schema, g.f_table_name, g.f_geometry_column) AS e
+    ) x ON true
+    WHERE g.f_table_schema = 'public'
+      -- Solo la primera columna de geometría de cada tabla (las siguientes son versiones generalizadas)
+      AND g.f_geometry_column = (
+          SELECT a.attname FROM pg_attribute a
+          WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+            AND a.atttypid = 'geometry'::regtype
+          ORDER BY a.attnum
+          LIMIT 1
+      )
+"""
+
+_lock = threading.Lock()
+_index = {}          # {capa: entrada del catálogo}
+_dirty = set()       # Capas invalidadas pendientes de recargar
+_state = {
+    'checked_at': 0.0,       # Última comprobación de OIDs contra PostgreSQL
+    'generation': 0,         # Aumenta con cada cambio del índice
+    'published': frozenset(),
+    'body': None,            # (generación, publicadas, cuerpo JSON, ETag)
+    'refreshes': 0,
+    'reloaded_layers': 0
+}
+
+
+def _mark_dirty(layer_name):
+    """Suscriptor de app.cache: la capa se recargará en la siguiente consulta del catálogo"""
+    with _lock:
+        _dirty.add(layer_name)
+
+
+subscribe(_mark_dirty)
+
+
+def _entry(row):
+    name, geometry_column, geometry_type, srid, oid, reltuples, minx, miny, maxx, maxy = row
+    return {
+        'name': name,
+        'full_name': f"{GEOSERVER_CONFIG['workspace']}:{name}",
+        'geometry_column': geometry_column,
+        'geometry_type': geometry_type,
+        'srid': srid,
+        # reltuples es -1 (o 0) si la tabla nunca se analizó
+        'rows_estimate': reltuples if reltuples and reltuples > 0 else None,
+        'extent': [minx, miny, maxx, maxy] if minx is not None else None,
+        '_oid': oid
+    }
+
+
+def _refresh_index(force=False):
+    """
+    Sincroniza el índice en memoria con PostgreSQL.
+    Una consulta ligera de nombres y OIDs detecta capas nuevas, reemplazadas o eliminadas;
+    solo esas (más las invalidadas) se vuelven a describir.
+    """
+    now = time.monotonic()
+    with _lock:
+        if not force and not _dirty and _index and now - _state['checked_at'] < CATALOG_CONFIG['check_seconds']:
+            return
+        dirty = set(_dirty)
+        _dirty.clear()
+
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT g.f_table_name, c.oid::bigint
+                FROM geometry_columns g
+                JOIN pg_namespace n ON n.nspname = g.f_table_schema
+                JOIN pg_class c ON c.relnamespace = n.oid AND c.relname = g.f_table_name
+                WHERE g.f_table_schema = 'public'
+            """)
+            # Las tablas de preparación de una importación en curso no son capas
+            current = {name: oid for name, oid in cursor.fetchall() if not is_staging_table(name)}
+
+            with _lock:
+                known = {name: entry['_oid'] for name, entry in _index.items()}
+            if force:
+                changed = set(current)
+            else:
+                changed = {name for name, oid in current.items() if known.get(name) != oid}
+                changed |= dirty & set(current)
+            removed = set(known) - set(current)
+
+            rows = []
+            if changed:
+                cursor.execute(_LAYER_QUERY + " AND g.f_table_name = ANY(%s)", (list(changed),))
+                rows = cursor.fetchall()
+
+    with _lock:
+        for name in removed:
+            _index.pop(name, None)
+        for row in rows:
+            entry = _entry(row)
+            _index[entry['name']] = entry
+        if changed or removed:
+            _state['generation'] += 1
+            _state['reloaded_layers'] += len(changed)
+            print(f"🔄 Catálogo de capas actualizado: {len(changed)} recargadas, {len(removed)} eliminadas")
+        _state['checked_at'] = time.monotonic()
+        _state['refreshes'] += 1
+
+
+def _published_layers():
+    """Capas publicadas en GeoServer (catálogo cacheado del cliente REST)"""
+    try:
+        return frozenset(get_geoserver_client().featuretypes())
+    except Exception as e:
+        print(f"⚠️ No se pudo consultar GeoServer para el catálogo: {str(e)}")
+        with _lock:
+            return _state['published']
+
+
+def get_catalog(force=False):
+    """
+    Devuelve el catálogo de capas serializado junto con su ETag
+
+    Args:
+        force: Recargar todas las capas desde PostgreSQL
+
+    Returns:
+        tuple: (cuerpo JSON como str, ETag)
+    """
+    _refresh_index(force)
+    published = _published_layers()
+
+    with _lock:
+        _state['published'] = published
+        cached = _state['body']
+        if cached and cached[0] == _state['generation'] and cached[1] == published:
+            return cached[2], cached[3]
+
+        layers = []
+        for name in sorted(_index):
+            entry = {key: value for key, value in _index[name].items() if not key.startswith('_')}
+            entry['published'] = name in published
+            layers.append(entry)
+        generation = _state['generation']
+
+    data = {
+        'workspace': GEOSERVER_CONFIG['workspace'],
+        'wms_url': f"{GEOSERVER_CONFIG['url']}/{GEOSERVER_CONFIG['workspace']}/wms",
+        'wfs_url': f"{GEOSERVER_CONFIG['url']}/{GEOSERVER_CONFIG['workspace']}/wfs",
+        'count': len(layers),
+        'layers': layers
+    }
+    body = json.dumps(format_response(data, True, "Lista de capas obtenida correctamente"),
+                      ensure_ascii=False, separators=(',', ':'))
+    etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+
+    with _lock:
+        _state['body'] = (generation, published, body, etag)
+    return body, etag
+
+
+def catalog_stats():
+    """
+    Estado del índice del catálogo
+
+    Returns:
+        dict: Capas indexadas, generación y número de recargas
+    """
+    with _lock:
+        return {
+            'layers': len(_index),
+            'generation': _state['generation'],
+            'refreshes': _state['refreshes'],
+            'reloaded_layers': _state['reloaded_layers'],
+            'pending': len(_dirty)
+        }
@@ -16,3 +16,152 @@ GEOSERVER_CONFIG = {
     'password': 'geoserver',
     'workspace': 'sembrando'
 }
+
+# Configuración de la cola de trabajos de ingesta en segundo plano
+JOBS_CONFIG = {
+    'max_workers': 2,            # Número de trabajos de ingesta que se ejecutan a la vez
+    'max_async_jobs': 16,        # Trabajos asíncronos (UPLOAD_CONFIG['async_pipeline']) en curso a la vez
+    'folder': 'jobs',            # Directorio donde se guarda el estado de cada trabajo
+    'retention_hours': 48        # Horas que se conserva el estado de un trabajo terminado
+}
+
+# Configuración de la ingesta de archivos subidos
+UPLOAD_CONFIG = {
+    'stream_zip': True,          # Leer los shapefiles directamente del ZIP (/vsizip/) en lugar de extraerlos
+    'import_workers': 4,         # Procesos que importan capas de un mismo ZIP en paralelo
+    'batch_size': 50000,         # Máximo de registros por lote leído y enviado a PostGIS con COPY
+    'batch_memory_mb': 256,      # Memoria máxima aproximada por lote durante la importación
+    'target_srid': 4326,         # SRID canónico: todas las capas se reproyectan a él al importarse
+    'default_source_srid': 4326, # SRID que se supone para los shapefiles sin archivo .prj
+    'make_valid': True,          # Reparar las geometrías inválidas durante la importación
+    'validate_before_import': True, # Validar las geometrías antes de importar con ogr2ogr (informe por capa)
+    'async_pipeline': False      # Procesar las subidas con asyncio (app.pipeline): ogr2ogr y GeoServer sin bloquear hilos
+}
+
+# Configuración del pool de conexiones compartido a PostgreSQL/PostGIS
+DB_POOL_CONFIG = {
+    'pool_size': 5,              # Conexiones que se mantienen abiertas
+    'max_overflow': 10,          # Conexiones adicionales permitidas en picos de carga
+    'pool_timeout': 30,          # Segundos de espera por una conexión libre
+    'pool_recycle': 1800,        # Segundos tras los que se renueva una conexión
+    'pre_ping': True             # Verificar la conexión antes de usarla (la BD es remota)
+}
+
+# Configuración del cliente REST de GeoServer
+GEOSERVER_CLIENT_CONFIG = {
+    'pool_maxsize': 10,          # Conexiones keep-alive reutilizables hacia GeoServer
+    'retries': 3,                # Reintentos ante errores de conexión o 502/503/504
+    'backoff_factor': 0.5,       # Espera exponencial entre reintentos (0.5s, 1s, 2s...)
+    'timeout': 30,               # Segundos máximos por petición
+    'cache_ttl': 300             # Segundos que se confía en el catálogo cacheado
+}
+
+# Configuración de la caché de resultados por capa (estadísticas, catálogo...)
+CACHE_CONFIG = {
+    'ttl': 3600,                 # Segundos máximos que se conserva un resultado
+    'max_entries': 512,          # Resultados en memoria antes de descartar los menos usados
+    'version_check_seconds': 5   # Segundos que se reutiliza la versión consultada de una tabla
+}
+
+# Configuración de las estadísticas calculadas en PostgreSQL
+STATS_CONFIG = {
+    'histogram_bins': 10,        # Intervalos por defecto de los histogramas
+    'max_bins': 100,             # Máximo de intervalos que se pueden pedir
+    'top_k': 10,                 # Valores más frecuentes por columna de texto
+    'max_top_k': 1000,           # Máximo de valores más frecuentes que se pueden pedir
+    'max_groups': 1000           # Máximo de grupos devueltos por una agregación
+}
+
+# Configuración del catálogo de capas (/api/layers/)
+CATALOG_CONFIG = {
+    'check_seconds': 10          # Segundos entre comprobaciones de capas nuevas o reemplazadas en PostGIS
+}
+
+# Configuración de las teselas vectoriales (MVT) servidas desde PostGIS
+TILES_CONFIG = {
+    'extent': 4096,              # Resolución interna de cada tesela MVT
+    'buffer': 64,                # Margen en unidades de tesela para evitar cortes en los bordes
+    'max_zoom': 22,              # Zoom máximo admitido
+    'simplify_max_zoom': 14,     # A partir de este zoom las geometrías no se simplifican
+    'simplify_factor': 0.5,      # Tolerancia de simplificación en fracciones de píxel de la tesela
+    'max_features': 50000,       # Máximo de elementos por tesela
+    'cache_max_age': 300         # Segundos que el navegador puede reutilizar una tesela
+}
+
+# Configuración de la caché en disco de teselas vectoriales
+TILE_CACHE_CONFIG = {
+    'enabled': True,             # Guardar en disco las teselas generadas
+    'folder': 'tile_cache',      # Directorio raíz de la caché
+    'max_size_mb': 2048,         # Tamaño máximo antes de expulsar las teselas menos usadas
+    'evict_to': 0.9              # Fracción del máximo que queda ocupada tras una expulsión
+}
+
+# Configuración de la búsqueda por nombre (/api/search)
+SEARCH_CONFIG = {
+    # Columnas de nombre que se indexan y consultan, por orden de prioridad
+    'name_columns': ['nombre_territorio', 'nombre', 'nombre_municipio', 'nombre_up',
+                     'territorio', 'entidad', 'municipio', 'name'],
+    'min_length': 2,             # Longitud mínima del texto buscado
+    'default_limit': 10,         # Resultados por defecto
+    'max_limit': 100,            # Máximo de resultados por búsqueda
+    'similarity_threshold': 0.3, # Similitud mínima de trigramas para coincidencias aproximadas
+    'targets_ttl': 60            # Segundos que se reutiliza la lista de capas y columnas buscables
+}
+
+# Configuración de la consulta de elementos en un punto (/api/feature-info)
+FEATURE_INFO_CONFIG = {
+    'max_workers': 8,            # Capas que se consultan a la vez (cada una usa una conexión del pool)
+    'max_layers': 50,            # Máximo de capas por petición
+    'tolerance': 5,              # Píxeles de tolerancia alrededor del clic
+    'default_limit': 10,         # Elementos por capa por defecto
+    'max_limit': 100             # Máximo de elementos por capa
+}
+
+# Configuración de la optimización de tablas tras cada importación
+OPTIMIZE_CONFIG = {
+    'enabled': True,             # Crear índices, reordenar y analizar cada capa importada
+    'cluster': True,             # Reordenar la tabla por geohash (CLUSTER)
+    'cluster_max_rows': 5000000, # Por encima de este tamaño se omite CLUSTER (alarga la carga; se hace antes de publicar)
+    # Columnas que reciben un índice btree (claves y códigos habituales en las capas)
+    'key_column_pattern': r'(^id$|_id$|^id_|^cve|^clave|^codigo|^cod_|^folio)'
+}
+
+# Configuración de las geometrías generalizadas (versiones simplificadas por nivel de zoom)
+GENERALIZE_CONFIG = {
+    'enabled': True,             # Crear columnas generalizadas al importar capas de líneas o polígonos
+    'zoom_levels': [5, 8, 11],   # Zoom máximo para el que se usa cada versión simplificada
+    'pixel_tolerance': 0.5,      # Tolerancia de simplificación en fracciones de píxel (256 px por tesela)
+    'min_avg_points': 50,        # Vértices medios por elemento por debajo de los cuales no se generaliza
+    'style_fill': '#AAAAAA',     # Relleno del estilo por escalas publicado en GeoServer
+    'style_stroke': '#333333'    # Contorno del estilo por escalas publicado en GeoServer
+}
+
+# Configuración de la exportación de capas completas (/api/layers/<nombre>/export)
+EXPORT_CONFIG = {
+    'chunk_rows': 2000,          # Filas que el cursor del servidor envía en cada bloque
+    'flush_bytes': 65536,        # Bytes que se acumulan antes de enviar un fragmento al cliente
+    'parquet_row_group': 10000,  # Filas por grupo de filas en GeoParquet (memoria por bloque)
+    'parquet_compression': 'zstd', # Compresión de las columnas de GeoParquet
+    'gzip_level': 6,             # Nivel de gzip para GeoJSON, CSV y FlatGeobuf (1 rápido ... 9 máximo)
+    'coordinate_precision': 6    # Decimales de las coordenadas en GeoJSON (EPSG:4326)
+}
+
+# Configuración del servidor de producción (gunicorn.conf.py); cada valor se puede
+# sobrescribir con una variable de entorno GEOPORTAL_<CLAVE>, por ejemplo GEOPORTAL_WORKERS=8
+SERVER_CONFIG = {
+    'bind': '0.0.0.0:5000',      # Dirección y puerto (nginx reenvía /api/ a localhost:5000)
+    'workers': 4,                # Procesos de gunicorn; cada uno tiene su pool de conexiones a PostgreSQL
+    'threads': 8,                # Hilos por proceso (worker gthread): peticiones simultáneas por proceso
+    'timeout': 120,              # Segundos sin señal de un proceso antes de reiniciarlo
+    'graceful_timeout': 60,      # Segundos para terminar las peticiones en curso al reiniciar
+    'keepalive': 5,              # Segundos que se mantiene abierta una conexión keep-alive de nginx
+    'max_requests': 0,           # Reiniciar cada proceso tras N peticiones (0 = nunca: interrumpiría los trabajos de ingesta)
+    'loglevel': 'info'           # Nivel de log de gunicorn
+}
+
+# Configuración de las métricas en formato Prometheus (/api/metrics)
+METRICS_CONFIG = {
+    'enabled': True,             # Medir la latencia de cada petición HTTP
+    'request_buckets': [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30],  # Límites (s) de latencia por endpoint
+    'stage_buckets': [0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800]  # Límites (s) de las etapas de importación
+}
@@ -0,0 +1,147 @@
+"""
+Pool de conexiones compartido para PostgreSQL/PostGIS.
+Todos los módulos del backend (consultas, eliminación de capas e importación
+con GeoPandas) obtienen sus conexiones de un único engine SQLAlchemy, de modo
+que el saludo TCP + autenticación con el servidor remoto se hace una sola vez
+por conexión y no en cada petición.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from app.config import DB_CONFIG, DB_POOL_CONFIG
+
+_engine = None
+_engine_lock = threading.Lock()
+
+# Contadores del pool para exponer métricas
+_stats = {
+    'connections_created': 0,
+    'checkouts': 0,
+    'checkout_wait_seconds': 0.0,
+    'max_checkout_wait_seconds': 0.0,
+    'errors': 0
+}
+_stats_lock = threading.Lock()
+
+
+def _on_connect(dbapi_connection, connection_record):
+    with _stats_lock:
+        _stats['connections_created'] += 1
+
+
+def get_engine():
+    """
+    Devuelve el engine SQLAlchemy compartido, creándolo la primera vez
+
+    Returns:
+        sqlalchemy.engine.Engine: Engine con pool de conexiones
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            # Asegurarnos que el puerto sea string para la URL de conexión
+            port = str(DB_CONFIG['port'])
+            db_url = f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{port}/{DB_CONFIG['dbname']}"
+            _engine = create_engine(
+                db_url,
+                pool_size=DB_POOL_CONFIG['pool_size'],
+                max_overflow=DB_POOL_CONFIG['max_overflow'],
+                pool_timeout=DB_POOL_CONFIG['pool_timeout'],
+                pool_recycle=DB_POOL_CONFIG['pool_recycle'],
+                pool_pre_ping=DB_POOL_CONFIG['pre_ping']
+            )
+            event.listen(_engine, 'connect', _on_connect)
+        return _engine
+
+
+@contextmanager
+def get_connection():
+    """
+    Obtiene una conexión psycopg2 del pool compartido.
+    Al salir del bloque se hace commit (o rollback si hubo una excepción)
+    y la conexión se devuelve al pool en lugar de cerrarse.
+
+    Uso:
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+    """
+    start = time.perf_counter()
+    conn = get_engine().raw_connection()
+    wait = time.perf_counter() - start
+    with _stats_lock:
+        _stats['checkouts'] += 1
+        _stats['checkout_wait_seconds'] += wait
+        _stats['max_checkout_wait_seconds'] = max(_stats['max_checkout_wait_seconds'], wait)
+
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        with _stats_lock:
+            _stats['errors'] += 1
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        conn.close()
+
+
+@contextmanager
+def get_autocommit_connection():
+    """
+    Conexión del pool en modo autocommit, necesaria para comandos que no pueden
+    ejecutarse dentro de una transacción (VACUUM, CREATE INDEX CONCURRENTLY).
+    Al salir se restablece el modo transaccional antes de devolverla al pool.
+
+    Uso:
+        with get_autocommit_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("VACUUM ANALYZE capa")
+    """
+    with get_connection() as conn:
+        # El proxy del pool no reenvía asignaciones de atributos: usar la conexión psycopg2 real
+        dbapi_connection = getattr(conn, 'dbapi_connection', None) or conn.connection
+        dbapi_connection.autocommit = True
+        try:
+            yield conn
+        finally:
+            dbapi_connection.autocommit = False
+
+
+def pool_status():
+    """
+    Estado actual del pool de conexiones
+
+    Returns:
+        dict: Tamaño configurado, conexiones en uso/libres y contadores acumulados
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+
+    stats['avg_checkout_wait_seconds'] = (
+        round(stats['checkout_wait_seconds'] / stats['checkouts'], 6) if stats['checkouts'] else 0.0
+    )
+    stats['checkout_wait_seconds'] = round(stats['checkout_wait_seconds'], 6)
+    stats['max_checkout_wait_seconds'] = round(stats['max_checkout_wait_seconds'], 6)
+
+    if _engine is None:
+        stats.update({'initialized': False, 'pool_size': DB_POOL_CONFIG['pool_size'],
+                      'max_overflow': DB_POOL_CONFIG['max_overflow'],
+                      'checked_out': 0, 'checked_in': 0, 'overflow': 0})
+        return stats
+
+    pool = _engine.pool
+    stats.update({
+        'initialized': True,
+        'pool_size': pool.size(),
+        'max_overflow': DB_POOL_CONFIG['max_overflow'],
+        'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0)
+    })
+    return stats
@@ -0,0 +1,314 @@
+"""
+Exportación de capas completas en streaming directamente desde PostGIS.
+Sustituye la descarga por WFS (GeoServer construye el documento completo en
+memoria antes de enviarlo): las filas se leen con un cursor del lado del
+servidor por bloques y cada bloque se serializa y se envía en cuanto está
+listo, de modo que la memoria del proceso Flask no depende del tamaño de la capa.
+
+Formatos:
+- geojson: FeatureCollection; cada Feature lo construye PostgreSQL (json_build_object).
+- csv: atributos y geometría como WKT.
+- parquet: GeoParquet 1.0 (geometría WKB) con un grupo de filas por bloque (pyarrow).
+- fgb: FlatGeobuf sin índice espacial, escrito por ogr2ogr en /vsistdout/.
+
+Las geometrías se exportan siempre en EPSG:4326.
+"""
+
+import csv
+import io
+import json
+import subprocess
+import tempfile
+import uuid
+import zlib
+import pyarrow as pa
+import pyarrow.parquet as pq
+from psycopg2 import sql
+from app.config import DB_CONFIG, EXPORT_CONFIG
+from app.database import get_connection
+from app.postgis import build_where
+
+# Formato: (tipo MIME, extensión del archivo)
+EXPORT_FORMATS = {
+    'geojson': ('application/geo+json', 'geojson'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'fgb': ('application/flatgeobuf', 'fgb')
+}
+
+# Formatos que ya van comprimidos: gzip no los reduce
+COMPRESSED_FORMATS = {'parquet'}
+
+# Alias de la geometría exportada dentro de las consultas
+GEOMETRY_ALIAS = '_export_geom'
+
+
+def _select(info, columns, geometry_expression, conditions):
+    """
+    Consulta de exportación: las columnas pedidas más la geometría transformada
+
+    Args:
+        info: Descripción de la capa (app.postgis.get_layer_info)
+        columns: Columnas de atributos
+        geometry_expression: Plantilla SQL aplicada a la geometría en EPSG:4326, por ejemplo "ST_AsText({})"
+        conditions: Condiciones de app.postgis.build_where
+
+    Returns:
+        sql.Composed: SELECT ... FROM capa [WHERE ...]
+    """
+    select_list = [sql.Identifier(column) for column in columns]
+    if info['geometry_column']:
+        geometry = sql.SQL("ST_Transform({}, 4326)").format(sql.Identifier(info['geometry_column']))
+    else:
+        geometry = sql.SQL("NULL::geometry")
+    select_list.append(sql.SQL(geometry_expression + " AS {}").format(geometry, sql.Identifier(GEOMETRY_ALIAS)))
+
+    return sql.SQL("SELECT {} FROM {} {}").format(
+        sql.SQL(', ').join(select_list),
+        sql.Identifier(info['name']),
+        sql.SQL("WHERE ") + sql.SQL(" AND ").join(conditions) if conditions else sql.SQL("")
+    )
+
+
+def _row_chunks(query, params, chunk_rows):
+    """
+    Filas de una consulta por bloques, con un cursor con nombre (del lado del servidor)
+
+    Yields:
+        list: Bloques de hasta chunk_rows tuplas
+    """
+    with get_connection() as conn:
+        with conn.cursor(name=f"layer_export_{uuid.uuid4().hex}") as cursor:
+            cursor.itersize = chunk_rows
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    return
+                yield rows
+
+
+def _buffered(pieces, size):
+    """
+    Agrupa fragmentos pequeños (texto o bytes) en bloques de al menos size bytes
+
+    Yields:
+        bytes: Bloques listos para enviarse al cliente
+    """
+    buffer = []
+    length = 0
+    for piece in pieces:
+        if isinstance(piece, str):
+            piece = piece.encode('utf-8')
+        if not piece:
+            continue
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzip_chunks(chunks, level=None):
+    """
+    Comprime en gzip un flujo de bloques sin acumularlo (zlib con cabecera gzip)
+
+    Args:
+        chunks: Bloques de bytes
+        level: Nivel de compresión (EXPORT_CONFIG['gzip_level'] por defecto)
+
+    Yields:
+        bytes: Bloques comprimidos
+    """
+    compressor = zlib.compressobj(level or EXPORT_CONFIG['gzip_level'], zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _geojson(info, columns, conditions, params):
+    """Fragmentos de una FeatureCollection; cada Feature se serializa en PostgreSQL"""
+    query = sql.SQL("""
+        SELECT json_build_object(
+            'type', 'Feature',
+            'geometry', ST_AsGeoJSON(t.{geometry}, {digits})::json,
+            'properties', to_jsonb(t) - {alias}
+        )::text
+        FROM ({inner}) AS t
+    """).format(
+        geometry=sql.Identifier(GEOMETRY_ALIAS),
+        digits=sql.Literal(EXPORT_CONFIG['coordinate_precision']),
+        alias=sql.Literal(GEOMETRY_ALIAS),
+        inner=_select(info, columns, "{}", conditions)
+    )
+    yield '{"type": "FeatureCollection", "name": %s, "features": [\n' % json.dumps(info['name'])
+    first = True
+    for rows in _row_chunks(query, params, EXPORT_CONFIG['chunk_rows']):
+        text = ',\n'.join(row[0] for row in rows)
+        yield text if first else ',\n' + text
+        first = False
+    yield '\n]}\n'
+
+
+def _csv(info, columns, conditions, params):
+    """Fragmentos CSV con cabecera; la geometría va en la última columna como WKT"""
+    query = _select(info, columns, "ST_AsText({})", conditions)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns + ['wkt'])
+    yield buffer.getvalue()
+    for rows in _row_chunks(query, params, EXPORT_CONFIG['chunk_rows']):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+class _StreamSink(io.RawIOBase):
+    """Destino de escritura de pyarrow que retiene los bytes hasta que se recogen con drain()"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_type(column_type):
+    """Tipo de Arrow para un tipo de PostgreSQL (texto por defecto)"""
+    if column_type in ('smallint', 'integer', 'bigint'):
+        return pa.int64()
+    if column_type in ('real', 'double precision') or column_type.startswith('numeric'):
+        return pa.float64()
+    if column_type == 'boolean':
+        return pa.bool_()
+    if column_type == 'date':
+        return pa.date32()
+    if column_type == 'timestamp with time zone':
+        return pa.timestamp('us', tz='UTC')
+    if column_type.startswith('timestamp'):
+        return pa.timestamp('us')
+    return pa.string()
+
+
+def _arrow_values(values, arrow_type):
+    """Adapta los valores de psycopg2 (Decimal, tipos sin equivalente) al tipo de Arrow de su columna"""
+    if arrow_type == pa.float64():
+        return [None if value is None else float(value) for value in values]
+    if arrow_type == pa.string():
+        return [value if value is None or isinstance(value, str) else str(value) for value in values]
+    return values
+
+
+def _parquet(info, columns, conditions, params):
+    """Bloques de un archivo GeoParquet: un grupo de filas por bloque leído de PostgreSQL"""
+    types = {column['name']: column['type'] for column in info['columns']}
+    geometry_name = 'geometry' if 'geometry' not in columns else GEOMETRY_ALIAS
+    geometry_types = [] if info['geometry_type'] in (None, 'Geometry') else [info['geometry_type']]
+    # Metadatos GeoParquet 1.0; sin 'crs' se entiende OGC:CRS84 (longitud, latitud)
+    geo = {
+        'version': '1.0.0',
+        'primary_column': geometry_name,
+        'columns': {geometry_name: {'encoding': 'WKB', 'geometry_types': geometry_types}}
+    }
+    fields = [pa.field(column, _arrow_type(types[column])) for column in columns]
+    fields.append(pa.field(geometry_name, pa.binary()))
+    schema = pa.schema(fields, metadata={'geo': json.dumps(geo)})
+
+    query = _select(info, columns, "ST_AsBinary({})", conditions)
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(sink, schema, compression=EXPORT_CONFIG['parquet_compression'])
+    try:
+        for rows in _row_chunks(query, params, EXPORT_CONFIG['parquet_row_group']):
+            data = list(zip(*rows))
+            arrays = [pa.array(_arrow_values(list(values), field.type), type=field.type)
+                      for values, field in zip(data[:-1], fields)]
+            arrays.append(pa.array([None if value is None else bytes(value) for value in data[-1]], type=pa.binary()))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def _flatgeobuf(info, columns, conditions, params):
+    """
+    Bloques de un archivo FlatGeobuf escrito por ogr2ogr en su salida estándar.
+    Sin índice espacial el formato se escribe de forma secuencial y no necesita archivo temporal.
+    """
+    query = _select(info, columns, "{}", conditions)
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            statement = cursor.mogrify(query, params).decode('utf-8')
+
+    pg_conn_string = f"PG:host={DB_CONFIG['host']} port={DB_CONFIG['port']} dbname={DB_CONFIG['dbname']} user={DB_CONFIG['user']} password={DB_CONFIG['password']}"
+    ogr_cmd = [
+        'ogr2ogr',
+        '-f', 'FlatGeobuf',
+        '-lco', 'SPATIAL_INDEX=NO',  # Escritura secuencial, sin reordenar los elementos
+        '-nln', info['name'],
+        '-sql', statement,
+        '/vsistdout/', pg_conn_string
+    ]
+    with tempfile.TemporaryFile() as errors:
+        process = subprocess.Popen(ogr_cmd, stdout=subprocess.PIPE, stderr=errors)
+        try:
+            while True:
+                data = process.stdout.read(EXPORT_CONFIG['flush_bytes'])
+                if not data:
+                    break
+                yield data
+            process.wait()
+        finally:
+            # El cliente puede cortar la descarga: no dejar ogr2ogr ejecutándose
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+        if process.returncode != 0:
+            # Una excepción (y no solo el aviso) hace que la conexión se corte sin el fin del
+            # cuerpo chunked: el cliente no confunde un archivo truncado con uno completo
+            errors.seek(0)
+            message = errors.read().decode('utf-8', 'replace')
+            print(f"❌ Error de ogr2ogr al exportar {info['name']}: {message}")
+            raise RuntimeError(f"ogr2ogr terminó con código {process.returncode}: {message}")
+
+
+def export_layer(info, output_format, columns, bbox=None, filters=None):
+    """
+    Flujo de bytes con la capa completa (o filtrada) en el formato pedido
+
+    Args:
+        info: Descripción de la capa (app.postgis.get_layer_info)
+        output_format: Clave de EXPORT_FORMATS
+        columns: Columnas de atributos a exportar
+        bbox, filters: Igual que en app.postgis.build_where
+
+    Returns:
+        generator: Bloques de bytes de aproximadamente EXPORT_CONFIG['flush_bytes']
+    """
+    conditions, params = build_where(info, bbox, filters)
+    writers = {'geojson': _geojson, 'csv': _csv, 'parquet': _parquet, 'fgb': _flatgeobuf}
+    pieces = writers[output_format](info, columns, conditions, params)
+    return _buffered(pieces, EXPORT_CONFIG['flush_bytes'])
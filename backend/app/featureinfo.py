@@ -0,0 +1,144 @@
+"""
+Consulta de elementos en un punto para varias capas a la vez.
+Sustituye las peticiones WMS GetFeatureInfo (una por capa visible en cada
+clic) por una sola petición al backend: se lanza una consulta espacial por
+capa, todas en paralelo sobre el pool de conexiones, filtrando con el índice
+GiST (&&) y ordenando por distancia (<->), y se devuelve un JSON combinado.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor
+from app.config import FEATURE_INFO_CONFIG
+from app.database import get_connection
+from app.postgis import get_layer_info_cached, generalized_column, json_value
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """
+    Pool de hilos compartido para las consultas por capa
+
+    Returns:
+        ThreadPoolExecutor: Pool con FEATURE_INFO_CONFIG['max_workers'] hilos
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=FEATURE_INFO_CONFIG['max_workers'],
+                thread_name_prefix='geoportal-featureinfo'
+            )
+        return _executor
+
+
+def search_window(x, y, resolution, tolerance):
+    """
+    Ventana de búsqueda alrededor de un clic, igual que GetFeatureInfo:
+    un cuadrado de tolerance píxeles a cada lado del punto
+
+    Args:
+        x, y: Coordenadas del clic en el SRID del mapa
+        resolution: Unidades del mapa por píxel
+        tolerance: Píxeles de tolerancia
+
+    Returns:
+        tuple: (minx, miny, maxx, maxy)
+    """
+    distance = resolution * tolerance
+    return x - distance, y - distance, x + distance, y + distance
+
+
+def query_layer(layer_name, window, srid, limit, include_geometry=False, zoom=None):
+    """
+    Elementos de una capa que intersecan la ventana, del más cercano al más lejano al centro
+
+    Args:
+        layer_name: Nombre de la capa
+        window: (minx, miny, maxx, maxy) en el SRID indicado
+        srid: SRID de la ventana (el del mapa, normalmente 3857)
+        limit: Máximo de elementos
+        include_geometry: Incluir la geometría como GeoJSON en EPSG:4326
+        zoom: Zoom del mapa; la geometría devuelta es la versión generalizada para ese zoom
+
+    Returns:
+        dict: {layer, features, error}
+    """
+    info = get_layer_info_cached(layer_name)
+    if info is None or not info['geometry_column']:
+        return {'layer': layer_name, 'features': [], 'error': 'La capa no existe o no tiene geometría'}
+
+    geometry = sql.Identifier(info['geometry_column'])
+    select_list = [sql.Identifier(column['name']) for column in info['columns']]
+    if include_geometry:
+        select_list.append(sql.SQL("ST_AsGeoJSON(ST_Transform({}, 4326), 6)::json AS geometry").format(
+            sql.Identifier(generalized_column(info, zoom))
+        ))
+
+    query = sql.SQL("""
+        WITH window_geom AS (
+            SELECT ST_Transform(ST_MakeEnvelope(%(minx)s, %(miny)s, %(maxx)s, %(maxy)s, %(srid)s), %(layer_srid)s) AS geom
+        )
+        SELECT {columns}
+        FROM {table}, window_geom
+        WHERE {geometry} && window_geom.geom
+          AND ST_Intersects({geometry}, window_geom.geom)
+        ORDER BY {geometry} <-> ST_Centroid(window_geom.geom)
+        LIMIT %(limit)s
+    """).format(
+        columns=sql.SQL(', ').join(select_list) if select_list else sql.SQL("1"),
+        table=sql.Identifier(info['name']),
+        geometry=geometry
+    )
+    minx, miny, maxx, maxy = window
+    params = {
+        'minx': minx, 'miny': miny, 'maxx': maxx, 'maxy': maxy,
+        'srid': srid, 'layer_srid': info['srid'] or 4326, 'limit': limit
+    }
+
+    with get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+
+    features = []
+    for row in rows:
+        feature_geometry = row.pop('geometry', None) if include_geometry else None
+        properties = {key: json_value(value) for key, value in row.items()}
+        features.append({
+            'id': properties.get(info['primary_key']) if info['primary_key'] else None,
+            'properties': properties,
+            'geometry': feature_geometry
+        })
+    return {'layer': layer_name, 'features': features, 'error': None}
+
+
+def query_layers(layer_names, window, srid, limit, include_geometry=False, zoom=None):
+    """
+    Consulta varias capas en paralelo y combina los resultados
+
+    Args:
+        layer_names: Capas a consultar, en el orden en que se devolverán
+        window, srid, limit, include_geometry, zoom: Igual que en query_layer
+
+    Returns:
+        list: Un resultado por capa (con 'error' si la consulta de esa capa falló)
+    """
+    def run(layer_name):
+        start = time.perf_counter()
+        try:
+            result = query_layer(layer_name, window, srid, limit, include_geometry, zoom)
+        except Exception as e:
+            print(f"⚠️ Error al consultar elementos de la capa {layer_name}: {str(e)}")
+            result = {'layer': layer_name, 'features': [], 'error': str(e)}
+        result['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    if len(layer_names) == 1:
+        return [run(layer_names[0])]
+    futures = [_get_executor().submit(run, layer_name) for layer_name in layer_names]
+    return [future.result() for future in futures]
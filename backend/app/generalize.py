@@ -0,0 +1,260 @@
+"""
+Versiones generalizadas (simplificadas) de las geometrías de cada capa.
+Las capas de límites (municipios, territorios) tienen costas y contornos con
+muchísimos vértices que no se distinguen a escala estatal. Durante la importación
+se añaden a la tabla columnas generadas con ST_SimplifyPreserveTopology a
+varias tolerancias, una por nivel de zoom de GENERALIZE_CONFIG['zoom_levels']
+(por ejemplo geom_z5, geom_z8, geom_z11). Al ser columnas generadas se
+mantienen al día si la tabla se modifica después.
+
+Añadir columnas STORED reescribe la tabla con un bloqueo ACCESS EXCLUSIVE, por
+lo que se crean en la tabla de preparación (app.loader.staging_name), antes de
+que reemplace a la capa publicada (app.loader.swap_table).
+
+Las teselas, el endpoint de datos y la consulta de elementos eligen la columna
+adecuada para el zoom pedido (app.postgis.generalized_column), y en GeoServer
+se publica un estilo con reglas por escala que dibuja cada rango de escalas
+con su columna.
+"""
+
+import asyncio
+import math
+from xml.sax.saxutils import escape
+from psycopg2 import sql
+from app.config import GENERALIZE_CONFIG, GEOSERVER_CONFIG
+from app.database import get_connection
+from app.loader import derived_name
+from app.postgis import get_layer_info
+from app.tiles import WEB_MERCATOR_WIDTH
+
+# Denominador de escala del zoom 0 (píxel de 0.28 mm, como GeoServer)
+ZOOM_0_SCALE = 559082264.0287178
+TILE_SIZE = 256
+METERS_PER_DEGREE = 111320.0
+
+
+def generalized_name(geometry_column, zoom):
+    """Nombre de la columna generalizada de una geometría para un nivel de zoom"""
+    return derived_name(geometry_column, f"_z{zoom}")
+
+
+def style_name(table_name):
+    """Nombre del estilo por escalas de una capa en GeoServer"""
+    return derived_name(table_name, '_generalized')
+
+
+def zoom_tolerance(zoom, geographic=False):
+    """
+    Tolerancia de simplificación para un nivel de zoom: una fracción del tamaño
+    de un píxel de pantalla (teselas de 256 px) a ese zoom
+
+    Args:
+        zoom: Nivel de zoom
+        geographic: True si la capa está en grados (por ejemplo EPSG:4326)
+
+    Returns:
+        float: Tolerancia en las unidades de la capa
+    """
+    meters = WEB_MERCATOR_WIDTH / (TILE_SIZE * 2 ** zoom) * GENERALIZE_CONFIG['pixel_tolerance']
+    return meters / METERS_PER_DEGREE if geographic else meters
+
+
+def zoom_for_resolution(resolution):
+    """
+    Nivel de zoom equivalente a una resolución en metros por píxel de EPSG:3857
+
+    Returns:
+        int: Zoom (redondeado hacia abajo, nunca negativo)
+    """
+    if not resolution or resolution <= 0:
+        return 0
+    return max(int(math.floor(math.log2(WEB_MERCATOR_WIDTH / (TILE_SIZE * resolution)))), 0)
+
+
+def scale_denominator(zoom):
+    """Denominador de escala de un nivel de zoom (admite zooms fraccionarios)"""
+    return ZOOM_0_SCALE / 2 ** zoom
+
+
+def generalized_type(info):
+    """
+    Tipo de las columnas generalizadas: el mismo tipo y SRID que la geometría de origen
+    (ST_SimplifyPreserveTopology no cambia ninguno de los dos), para que GeoServer y
+    geometry_columns las describan igual que la geometría completa
+
+    Args:
+        info: Descripción de la capa (app.postgis.get_layer_info)
+
+    Returns:
+        str: Por ejemplo 'geometry(MultiPolygon, 32616)', o 'geometry' si el origen no declara tipo
+    """
+    if info['geometry_type'] in (None, 'Geometry') or not info['srid']:
+        return 'geometry'
+    return f"geometry({info['geometry_type']}, {int(info['srid'])})"
+
+
+def generalize_table(table_name, info):
+    """
+    Añade a la tabla las columnas generalizadas de su geometría.
+    Todas se crean en un único ALTER TABLE, de modo que la tabla se reescribe una sola vez.
+    Se omiten las capas de puntos y las de pocos vértices por elemento.
+
+    Args:
+        table_name: Tabla de preparación de la capa (todavía sin lectores)
+        info: Descripción de la capa (app.postgis.get_layer_info)
+
+    Returns:
+        list: Niveles creados {zoom, column, tolerance}
+    """
+    geometry_column = info['geometry_column']
+    if not geometry_column or 'point' in (info['geometry_type'] or '').lower():
+        return []
+
+    geometry = sql.Identifier(geometry_column)
+    table = sql.Identifier(table_name)
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL("SELECT avg(ST_NPoints({})) FROM {}").format(geometry, table))
+            average = cursor.fetchone()[0] or 0
+            if average < GENERALIZE_CONFIG['min_avg_points']:
+                print(f"👉 {table_name} tiene {round(average)} vértices por elemento: no se generaliza")
+                return []
+
+            cursor.execute("SELECT proj4text LIKE '%%+proj=longlat%%' FROM spatial_ref_sys WHERE srid = %s",
+                           (info['srid'] or 4326,))
+            row = cursor.fetchone()
+            geographic = bool(row and row[0])
+
+            levels = []
+            for zoom in sorted(GENERALIZE_CONFIG['zoom_levels']):
+                levels.append({
+                    'zoom': zoom,
+                    'column': generalized_name(geometry_column, zoom),
+                    'tolerance': zoom_tolerance(zoom, geographic)
+                })
+
+            column_type = sql.SQL(generalized_type(info))
+            cursor.execute(sql.SQL("ALTER TABLE {} {}").format(table, sql.SQL(', ').join(
+                sql.SQL(
+                    "ADD COLUMN IF NOT EXISTS {} {} GENERATED ALWAYS AS "
+                    "(ST_SimplifyPreserveTopology({}, {})) STORED"
+                ).format(sql.Identifier(level['column']), column_type, geometry, sql.Literal(level['tolerance']))
+                for level in levels
+            )))
+
+    print(f"✅ Geometrías generalizadas de {table_name}: {', '.join(level['column'] for level in levels)}")
+    return levels
+
+
+def build_style(info):
+    """
+    Estilo SLD con una regla por rango de escalas; cada regla dibuja la columna
+    generalizada correspondiente y la última, a escalas grandes, la geometría completa
+
+    Args:
+        info: Descripción de la capa con columnas generalizadas
+
+    Returns:
+        str: Documento SLD 1.0
+    """
+    polygon = 'polygon' in (info['geometry_type'] or '').lower()
+    fill = GENERALIZE_CONFIG['style_fill']
+    stroke = GENERALIZE_CONFIG['style_stroke']
+    if polygon:
+        symbolizer = (
+            '<PolygonSymbolizer><Geometry><ogc:PropertyName>{column}</ogc:PropertyName></Geometry>'
+            f'<Fill><CssParameter name="fill">{fill}</CssParameter></Fill>'
+            f'<Stroke><CssParameter name="stroke">{stroke}</CssParameter>'
+            '<CssParameter name="stroke-width">0.5</CssParameter></Stroke></PolygonSymbolizer>'
+        )
+    else:
+        symbolizer = (
+            '<LineSymbolizer><Geometry><ogc:PropertyName>{column}</ogc:PropertyName></Geometry>'
+            f'<Stroke><CssParameter name="stroke">{stroke}</CssParameter>'
+            '<CssParameter name="stroke-width">1</CssParameter></Stroke></LineSymbolizer>'
+        )
+
+    # El límite entre dos zooms consecutivos se sitúa a medio camino (z + 0.5)
+    rules = []
+    previous = None
+    ranges = list(info.get('generalized') or []) + [(None, info['geometry_column'])]
+    for level, column in ranges:
+        scales = ''
+        if level is not None:
+            scales += f"<MinScaleDenominator>{scale_denominator(level + 0.5):.2f}</MinScaleDenominator>"
+        if previous is not None:
+            scales += f"<MaxScaleDenominator>{scale_denominator(previous + 0.5):.2f}</MaxScaleDenominator>"
+        rules.append(
+            f"<Rule><Name>{escape(column)}</Name>{scales}{symbolizer.format(column=escape(column))}</Rule>"
+        )
+        previous = level
+
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<StyledLayerDescriptor version="1.0.0" xmlns="http://www.opengis.net/sld" '
+        'xmlns:ogc="http://www.opengis.net/ogc" xmlns:xlink="http://www.w3.org/1999/xlink" '
+        'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+        'xsi:schemaLocation="http://www.opengis.net/sld StyledLayerDescriptor.xsd">'
+        f"<NamedLayer><Name>{escape(info['name'])}</Name><UserStyle>"
+        f"<Title>{escape(info['name'])} (generalizado por escala)</Title>"
+        f"<FeatureTypeStyle>{''.join(rules)}</FeatureTypeStyle>"
+        '</UserStyle></NamedLayer></StyledLayerDescriptor>'
+    )
+
+
+def publish_styles(table_names, client):
+    """
+    Publica en GeoServer el estilo por escalas de cada capa generalizada y lo asigna
+    como estilo por defecto. Un fallo deja la capa con el estilo genérico de GeoServer.
+
+    Args:
+        table_names: Capas recién publicadas
+        client: Cliente REST de GeoServer (app.geoserver.get_geoserver_client)
+
+    Returns:
+        list: Capas a las que se asignó el estilo por escalas
+    """
+    styled = []
+    for table_name in table_names:
+        try:
+            info = get_layer_info(table_name)
+            if not info or not info['generalized']:
+                continue
+            name = style_name(table_name)
+            client.publish_style(name, build_style(info))
+            client.set_default_style(table_name, name)
+            styled.append(table_name)
+            print(f"✅ Estilo por escalas {GEOSERVER_CONFIG['workspace']}:{name} asignado a {table_name}")
+        except Exception as e:
+            print(f"⚠️ No se pudo publicar el estilo por escalas de {table_name}: {str(e)}")
+    return styled
+
+
+async def publish_styles_async(table_names, client):
+    """
+    Igual que publish_styles con el cliente asíncrono (app.geoserver.AsyncGeoServerClient);
+    los estilos de todas las capas se publican a la vez
+
+    Args:
+        table_names: Capas recién publicadas
+        client: Cliente asíncrono de GeoServer (app.geoserver.get_async_geoserver_client)
+
+    Returns:
+        list: Capas a las que se asignó el estilo por escalas
+    """
+    async def publish(table_name):
+        try:
+            info = await asyncio.to_thread(get_layer_info, table_name)
+            if not info or not info['generalized']:
+                return False
+            name = style_name(table_name)
+            await client.publish_style(name, build_style(info))
+            await client.set_default_style(table_name, name)
+            print(f"✅ Estilo por escalas {GEOSERVER_CONFIG['workspace']}:{name} asignado a {table_name}")
+            return True
+        except Exception as e:
+            print(f"⚠️ No se pudo publicar el estilo por escalas de {table_name}: {str(e)}")
+            return False
+
+    styled = await asyncio.gather(*(publish(table_name) for table_name in table_names))
+    return [table_name for table_name, done in zip(table_names, styled) if done]
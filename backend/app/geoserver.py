@@ -0,0 +1,647 @@
+"""
+Cliente REST de GeoServer para GeoportalSV.
+Mantiene una sesión HTTP persistente (keep-alive, pool de conexiones y
+reintentos con espera exponencial) y una caché con TTL de los workspaces,
+datastores y featuretypes conocidos, de modo que publicar una capa cuesta una
+sola petición REST cuando el catálogo ya está en caché.
+
+AsyncGeoServerClient hace las mismas peticiones con httpx.AsyncClient para el
+flujo asíncrono de subida (app.pipeline), con los mismos reintentos y la misma
+caché del catálogo que el cliente síncrono, que ambos comparten.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.config import DB_CONFIG, GEOSERVER_CONFIG, GEOSERVER_CLIENT_CONFIG, UPLOAD_CONFIG
+
+DATASTORE_NAME = 'postgis_store'
+
+# Respuestas que se reintentan, solo en los métodos idempotentes: un POST repetido
+# podría crear el recurso dos veces
+RETRY_STATUSES = (502, 503, 504)
+RETRY_METHODS = frozenset(['GET', 'HEAD', 'PUT', 'DELETE'])
+
+
+class GeoServerError(Exception):
+    """Error devuelto por la API REST de GeoServer"""
+
+
+def _names(payload, collection, item):
+    """
+    Extrae los nombres de un listado REST de GeoServer.
+    GeoServer devuelve una cadena vacía en lugar de una lista cuando no hay elementos.
+    """
+    container = payload.get(collection) or {}
+    if not isinstance(container, dict):
+        return set()
+    items = container.get(item) or []
+    if isinstance(items, dict):
+        items = [items]
+    return {entry['name'] for entry in items if 'name' in entry}
+
+
+def _datastore_payload(store):
+    """Cuerpo de la petición que crea el datastore PostGIS"""
+    return {
+        "dataStore": {
+            "name": store,
+            "connectionParameters": {
+                "entry": [
+                    {"@key": "host", "$": DB_CONFIG['host']},
+                    {"@key": "port", "$": str(DB_CONFIG['port'])},  # Asegurar que sea string
+                    {"@key": "database", "$": DB_CONFIG['dbname']},
+                    {"@key": "user", "$": DB_CONFIG['user']},
+                    {"@key": "passwd", "$": DB_CONFIG['password']},
+                    {"@key": "dbtype", "$": "postgis"},
+                    {"@key": "schema", "$": "public"},
+                    {"@key": "Expose primary keys", "$": "true"}
+                ]
+            }
+        }
+    }
+
+
+def _featuretype_payload(table_name, srs):
+    """Cuerpo de la petición que publica una tabla como featuretype"""
+    return {
+        "featureType": {
+            "name": table_name,
+            "nativeName": table_name,
+            "title": table_name.replace("_", " ").title(),
+            "srs": srs,
+            "enabled": True
+        }
+    }
+
+
+def _already_exists(response):
+    """
+    Indica si GeoServer rechazó la publicación porque el featuretype ya existe
+    (409 en versiones recientes; 500 con "already exists" en el texto en las anteriores)
+    """
+    return response.status_code == 409 or 'already exists' in response.text
+
+
+class GeoServerClient:
+    """
+    Cliente reutilizable para la API REST de GeoServer
+    """
+
+    def __init__(self, config=GEOSERVER_CONFIG, client_config=GEOSERVER_CLIENT_CONFIG):
+        self.url = config['url'].rstrip('/')
+        self.workspace = config['workspace']
+        self.timeout = client_config['timeout']
+        self.cache_ttl = client_config['cache_ttl']
+        self.max_workers = client_config['pool_maxsize']
+
+        self.session = requests.Session()
+        self.session.auth = (config['user'], config['password'])
+        self.session.headers.update({'Accept': 'application/json'})
+
+        # Los POST solo se reintentan ante errores de conexión (la petición no llegó a enviarse)
+        retry = Retry(
+            total=client_config['retries'],
+            connect=client_config['retries'],
+            read=client_config['retries'],
+            backoff_factor=client_config['backoff_factor'],
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=RETRY_METHODS,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=client_config['pool_maxsize'],
+            max_retries=retry
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._cache = {}
+        self._lock = threading.RLock()
+        self._stats = {'requests': 0, 'errors': 0, 'seconds': 0.0, 'cache_hits': 0, 'cache_misses': 0}
+
+    # ------------------------------------------------------------------
+    # Peticiones y caché
+    # ------------------------------------------------------------------
+
+    def request(self, method, path, **kwargs):
+        """
+        Ejecuta una petición contra la API REST usando la sesión persistente
+
+        Args:
+            method: Método HTTP
+            path: Ruta relativa a /rest (por ejemplo 'workspaces.json')
+
+        Returns:
+            requests.Response: Respuesta de GeoServer
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.url}/rest/{path}", **kwargs)
+        except requests.RequestException:
+            self._count(start, error=True)
+            raise
+        self._count(start, error=response.status_code >= 500)
+        return response
+
+    def _count(self, start, error=False):
+        """Registra una petición en las métricas del cliente"""
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['seconds'] += time.perf_counter() - start
+            if error:
+                self._stats['errors'] += 1
+
+    def _cache_get(self, key):
+        """Conjunto de nombres cacheado, o None si no está o expiró"""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry and time.monotonic() - entry[0] < self.cache_ttl:
+                self._stats['cache_hits'] += 1
+                return entry[1]
+            self._stats['cache_misses'] += 1
+            return None
+
+    def _cache_put(self, key, names):
+        with self._lock:
+            self._cache[key] = (time.monotonic(), names)
+
+    def _cache_drop(self, key):
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def _cached(self, key, loader):
+        """Devuelve un conjunto de nombres cacheado o lo carga si expiró"""
+        names = self._cache_get(key)
+        if names is None:
+            names = loader()
+            self._cache_put(key, names)
+        return names
+
+    def _remember(self, key, name, present=True):
+        """Actualiza un conjunto cacheado tras crear o eliminar un recurso"""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry:
+                if present:
+                    entry[1].add(name)
+                else:
+                    entry[1].discard(name)
+
+    def invalidate(self):
+        """Vacía la caché del catálogo (por ejemplo tras cambios hechos fuera del backend)"""
+        with self._lock:
+            self._cache.clear()
+
+    def _load(self, path, collection, item):
+        response = self.request('GET', path)
+        if response.status_code == 404:
+            return set()
+        if response.status_code != 200:
+            raise GeoServerError(f"Error al consultar {path}: {response.status_code} - {response.text}")
+        return _names(response.json(), collection, item)
+
+    # ------------------------------------------------------------------
+    # Catálogo
+    # ------------------------------------------------------------------
+
+    def workspaces(self):
+        return self._cached(('workspaces',), lambda: self._load('workspaces.json', 'workspaces', 'workspace'))
+
+    def datastores(self, workspace=None):
+        workspace = workspace or self.workspace
+        return self._cached(
+            ('datastores', workspace),
+            lambda: self._load(f"workspaces/{workspace}/datastores.json", 'dataStores', 'dataStore')
+        )
+
+    def featuretypes(self, store=DATASTORE_NAME, workspace=None):
+        workspace = workspace or self.workspace
+        return self._cached(
+            ('featuretypes', workspace, store),
+            lambda: self._load(f"workspaces/{workspace}/datastores/{store}/featuretypes.json",
+                               'featureTypes', 'featureType')
+        )
+
+    def ensure_workspace(self, workspace=None):
+        """
+        Crea el workspace si no existe
+
+        Returns:
+            bool: True si se creó, False si ya existía
+        """
+        workspace = workspace or self.workspace
+        if workspace in self.workspaces():
+            return False
+
+        print(f"🆕 Workspace {workspace} no existe. Creándolo...")
+        response = self.request('POST', 'workspaces', json={"workspace": {"name": workspace}})
+        if response.status_code not in [200, 201]:
+            raise GeoServerError(f"Error al crear workspace: {response.status_code} - {response.text}")
+
+        self._remember(('workspaces',), workspace)
+        return True
+
+    def ensure_datastore(self, store=DATASTORE_NAME, workspace=None):
+        """
+        Crea el datastore PostGIS si no existe
+
+        Returns:
+            bool: True si se creó, False si ya existía
+        """
+        workspace = workspace or self.workspace
+        self.ensure_workspace(workspace)
+        if store in self.datastores(workspace):
+            return False
+
+        print(f"🆕 El datastore '{store}' no existe. Creando nuevo datastore...")
+        response = self.request('POST', f"workspaces/{workspace}/datastores", json=_datastore_payload(store))
+        if response.status_code not in [200, 201]:
+            raise GeoServerError(f"Error al crear DataStore: {response.status_code} - {response.text}")
+
+        self._remember(('datastores', workspace), store)
+        # Un datastore nuevo no tiene featuretypes: evitar consultarlos
+        self._cache_put(('featuretypes', workspace, store), set())
+        print(f"✅ DataStore creado correctamente")
+        return True
+
+    # ------------------------------------------------------------------
+    # Capas
+    # ------------------------------------------------------------------
+
+    def publish_featuretype(self, table_name, srs=None, store=DATASTORE_NAME, workspace=None):
+        """
+        Publica una tabla de PostGIS como featuretype (y capa) de GeoServer
+
+        Args:
+            table_name: Nombre de la tabla
+            srs: Sistema de referencia declarado de la capa (por defecto el SRID canónico de la importación,
+                 el mismo en que está almacenada, para que GeoServer no reproyecte en cada petición)
+
+        Returns:
+            bool: True si la capa se creó, False si ya existía
+        """
+        workspace = workspace or self.workspace
+        srs = srs or f"EPSG:{UPLOAD_CONFIG['target_srid']}"
+        self.ensure_datastore(store, workspace)
+        # Siempre se envía el POST: la caché de featuretypes es de este proceso y puede conservar una
+        # capa que otro worker ya eliminó; GeoServer es quien sabe si la capa existe
+        response = self.request('POST', f"workspaces/{workspace}/datastores/{store}/featuretypes",
+                                json=_featuretype_payload(table_name, srs))
+        if _already_exists(response):
+            self._remember(('featuretypes', workspace, store), table_name)
+            print(f"⚠️ La capa {table_name} ya existe en GeoServer. Se mantendrá la configuración actual.")
+            return False
+        if response.status_code not in [200, 201]:
+            # La caché pudo quedar desactualizada por cambios externos: recargarla la próxima vez
+            self._cache_drop(('featuretypes', workspace, store))
+            raise GeoServerError(
+                f"Error al publicar la capa {table_name}: {response.status_code} - {response.text}"
+            )
+
+        self._remember(('featuretypes', workspace, store), table_name)
+        print(f"✅ Capa {table_name} publicada en GeoServer correctamente.")
+        return True
+
+    def publish_featuretypes(self, table_names, srs=None):
+        """
+        Publica un lote de tablas; el workspace y el datastore se verifican una sola vez
+
+        Returns:
+            dict: Para cada tabla, True si se creó y False si ya existía
+        """
+        self.ensure_datastore()
+        return {name: self.publish_featuretype(name, srs) for name in table_names}
+
+    def publish_style(self, style_name, sld_body, workspace=None):
+        """
+        Crea un estilo SLD en el workspace o reemplaza su contenido si ya existe
+
+        Args:
+            style_name: Nombre del estilo
+            sld_body: Documento SLD 1.0
+
+        Returns:
+            bool: True si el estilo se creó, False si se actualizó
+        """
+        workspace = workspace or self.workspace
+        headers = {'Content-Type': 'application/vnd.ogc.sld+xml'}
+        body = sld_body.encode('utf-8')
+
+        response = self.request('PUT', f"workspaces/{workspace}/styles/{style_name}", data=body, headers=headers)
+        if response.status_code in [200, 201]:
+            return False
+        if response.status_code != 404:
+            raise GeoServerError(f"Error al actualizar el estilo {style_name}: {response.status_code} - {response.text}")
+
+        response = self.request('POST', f"workspaces/{workspace}/styles", params={'name': style_name},
+                                data=body, headers=headers)
+        if response.status_code not in [200, 201]:
+            raise GeoServerError(f"Error al crear el estilo {style_name}: {response.status_code} - {response.text}")
+        return True
+
+    def set_default_style(self, layer_name, style_name, workspace=None):
+        """
+        Asigna un estilo del workspace como estilo por defecto de una capa
+        """
+        workspace = workspace or self.workspace
+        payload = {"layer": {"defaultStyle": {"name": style_name, "workspace": workspace}}}
+        response = self.request('PUT', f"layers/{workspace}:{layer_name}", json=payload)
+        if response.status_code not in [200, 201]:
+            raise GeoServerError(
+                f"Error al asignar el estilo {style_name} a {layer_name}: {response.status_code} - {response.text}"
+            )
+
+    def delete_layer(self, layer_name, store=DATASTORE_NAME, workspace=None):
+        """
+        Elimina una capa y su featuretype con una sola petición (recurse=true)
+
+        Returns:
+            bool: True si la capa ya no existe en GeoServer
+        """
+        workspace = workspace or self.workspace
+        response = self.request(
+            'DELETE',
+            f"workspaces/{workspace}/datastores/{store}/featuretypes/{layer_name}",
+            params={'recurse': 'true'}
+        )
+        # 200/204 indican eliminación y 404 que ya no existía
+        if response.status_code in [200, 204, 404]:
+            self._remember(('featuretypes', workspace, store), layer_name, present=False)
+            return True
+
+        print(f"❌ Error al eliminar capa de GeoServer: {response.status_code} - {response.text}")
+        return False
+
+    def delete_style(self, style_name, workspace=None):
+        """
+        Elimina un estilo del workspace (purge=true borra también el archivo SLD)
+
+        Returns:
+            bool: True si el estilo ya no existe en GeoServer
+        """
+        workspace = workspace or self.workspace
+        response = self.request('DELETE', f"workspaces/{workspace}/styles/{style_name}", params={'purge': 'true'})
+        if response.status_code in [200, 204, 404]:
+            return True
+
+        print(f"❌ Error al eliminar el estilo {style_name} de GeoServer: {response.status_code} - {response.text}")
+        return False
+
+    def delete_layers(self, layer_names, styles=None, store=DATASTORE_NAME, workspace=None):
+        """
+        Elimina varias capas con peticiones concurrentes que comparten el pool
+        de conexiones keep-alive de la sesión
+
+        Args:
+            layer_names: Nombres de las capas
+            styles: Estilo propio de cada capa que se elimina con ella {capa: estilo} (opcional)
+
+        Returns:
+            dict: Para cada capa, True si ya no existe en GeoServer
+        """
+        styles = styles or {}
+
+        def delete(layer_name):
+            try:
+                deleted = self.delete_layer(layer_name, store, workspace)
+                if deleted and layer_name in styles:
+                    self.delete_style(styles[layer_name], workspace)
+                return deleted
+            except requests.RequestException as e:
+                print(f"❌ Excepción al eliminar {layer_name} de GeoServer: {str(e)}")
+                return False
+
+        if not layer_names:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(layer_names)),
+                                thread_name_prefix='geoserver-delete') as executor:
+            return dict(zip(layer_names, executor.map(delete, layer_names)))
+
+    def stats(self):
+        """
+        Métricas del cliente: peticiones, errores, tiempo acumulado y uso de la caché
+
+        Returns:
+            dict: Contadores acumulados desde el inicio del proceso
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['cached_entries'] = len(self._cache)
+        stats['seconds'] = round(stats['seconds'], 3)
+        stats['avg_request_seconds'] = round(stats['seconds'] / stats['requests'], 4) if stats['requests'] else 0.0
+        return stats
+
+
+class AsyncGeoServerClient:
+    """
+    Cliente asíncrono (httpx) para la API REST de GeoServer, con las operaciones que
+    necesita la publicación de capas. Reintenta igual que la sesión del cliente síncrono
+    y comparte con él la caché del catálogo y las métricas, de modo que lo publicado
+    por una vía se ve de inmediato en la otra.
+    Está ligado al bucle de eventos en que se crea (get_async_geoserver_client).
+    """
+
+    def __init__(self, shared, config=GEOSERVER_CONFIG, client_config=GEOSERVER_CLIENT_CONFIG):
+        self.url = config['url'].rstrip('/')
+        self.workspace = config['workspace']
+        self.retries = client_config['retries']
+        self.backoff_factor = client_config['backoff_factor']
+        self.shared = shared
+
+        self.http = httpx.AsyncClient(
+            auth=(config['user'], config['password']),
+            headers={'Accept': 'application/json'},
+            timeout=client_config['timeout'],
+            limits=httpx.Limits(max_connections=client_config['pool_maxsize'],
+                                max_keepalive_connections=client_config['pool_maxsize'])
+        )
+
+    async def request(self, method, path, **kwargs):
+        """
+        Ejecuta una petición contra la API REST. Los errores de conexión y las respuestas
+        502/503/504 se reintentan con espera exponencial; los POST solo si la conexión
+        no llegó a establecerse.
+
+        Args:
+            method: Método HTTP
+            path: Ruta relativa a /rest (por ejemplo 'workspaces.json')
+
+        Returns:
+            httpx.Response: Respuesta de GeoServer
+        """
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = await self.http.request(method, f"{self.url}/rest/{path}", **kwargs)
+            except httpx.TransportError as e:
+                self.shared._count(start, error=True)
+                retriable = method in RETRY_METHODS or isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                if attempt >= self.retries or not retriable:
+                    raise
+            else:
+                self.shared._count(start, error=response.status_code >= 500)
+                if (response.status_code not in RETRY_STATUSES or method not in RETRY_METHODS
+                        or attempt >= self.retries):
+                    return response
+            attempt += 1
+            await asyncio.sleep(self.backoff_factor * 2 ** (attempt - 1))
+
+    async def _cached(self, key, loader):
+        """Devuelve un conjunto de nombres de la caché compartida o lo carga si expiró"""
+        names = self.shared._cache_get(key)
+        if names is None:
+            names = await loader()
+            self.shared._cache_put(key, names)
+        return names
+
+    async def _load(self, path, collection, item):
+        response = await self.request('GET', path)
+        if response.status_code == 404:
+            return set()
+        if response.status_code != 200:
+            raise GeoServerError(f"Error al consultar {path}: {response.status_code} - {response.text}")
+        return _names(response.json(), collection, item)
+
+    async def workspaces(self):
+        return await self._cached(('workspaces',), lambda: self._load('workspaces.json', 'workspaces', 'workspace'))
+
+    async def datastores(self, workspace=None):
+        workspace = workspace or self.workspace
+        return await self._cached(
+            ('datastores', workspace),
+            lambda: self._load(f"workspaces/{workspace}/datastores.json", 'dataStores', 'dataStore')
+        )
+
+    async def featuretypes(self, store=DATASTORE_NAME, workspace=None):
+        workspace = workspace or self.workspace
+        return await self._cached(
+            ('featuretypes', workspace, store),
+            lambda: self._load(f"workspaces/{workspace}/datastores/{store}/featuretypes.json",
+                               'featureTypes', 'featureType')
+        )
+
+    async def ensure_workspace(self, workspace=None):
+        """Igual que GeoServerClient.ensure_workspace"""
+        workspace = workspace or self.workspace
+        if workspace in await self.workspaces():
+            return False
+
+        print(f"🆕 Workspace {workspace} no existe. Creándolo...")
+        response = await self.request('POST', 'workspaces', json={"workspace": {"name": workspace}})
+        if response.status_code not in [200, 201]:
+            raise GeoServerError(f"Error al crear workspace: {response.status_code} - {response.text}")
+
+        self.shared._remember(('workspaces',), workspace)
+        return True
+
+    async def ensure_datastore(self, store=DATASTORE_NAME, workspace=None):
+        """Igual que GeoServerClient.ensure_datastore"""
+        workspace = workspace or self.workspace
+        await self.ensure_workspace(workspace)
+        if store in await self.datastores(workspace):
+            return False
+
+        print(f"🆕 El datastore '{store}' no existe. Creando nuevo datastore...")
+        response = await self.request('POST', f"workspaces/{workspace}/datastores", json=_datastore_payload(store))
+        if response.status_code not in [200, 201]:
+            raise GeoServerError(f"Error al crear DataStore: {response.status_code} - {response.text}")
+
+        self.shared._remember(('datastores', workspace), store)
+        self.shared._cache_put(('featuretypes', workspace, store), set())
+        print(f"✅ DataStore creado correctamente")
+        return True
+
+    async def publish_featuretype(self, table_name, srs=None, store=DATASTORE_NAME, workspace=None):
+        """Igual que GeoServerClient.publish_featuretype"""
+        workspace = workspace or self.workspace
+        srs = srs or f"EPSG:{UPLOAD_CONFIG['target_srid']}"
+        await self.ensure_datastore(store, workspace)
+        response = await self.request('POST', f"workspaces/{workspace}/datastores/{store}/featuretypes",
+                                      json=_featuretype_payload(table_name, srs))
+        if _already_exists(response):
+            self.shared._remember(('featuretypes', workspace, store), table_name)
+            print(f"⚠️ La capa {table_name} ya existe en GeoServer. Se mantendrá la configuración actual.")
+            return False
+        if response.status_code not in [200, 201]:
+            self.shared._cache_drop(('featuretypes', workspace, store))
+            raise GeoServerError(
+                f"Error al publicar la capa {table_name}: {response.status_code} - {response.text}"
+            )
+
+        self.shared._remember(('featuretypes', workspace, store), table_name)
+        print(f"✅ Capa {table_name} publicada en GeoServer correctamente.")
+        return True
+
+    async def publish_style(self, style_name, sld_body, workspace=None):
+        """Igual que GeoServerClient.publish_style"""
+        workspace = workspace or self.workspace
+        headers = {'Content-Type': 'application/vnd.ogc.sld+xml'}
+        body = sld_body.encode('utf-8')
+
+        response = await self.request('PUT', f"workspaces/{workspace}/styles/{style_name}",
+                                      content=body, headers=headers)
+        if response.status_code in [200, 201]:
+            return False
+        if response.status_code != 404:
+            raise GeoServerError(f"Error al actualizar el estilo {style_name}: {response.status_code} - {response.text}")
+
+        response = await self.request('POST', f"workspaces/{workspace}/styles", params={'name': style_name},
+                                      content=body, headers=headers)
+        if response.status_code not in [200, 201]:
+            raise GeoServerError(f"Error al crear el estilo {style_name}: {response.status_code} - {response.text}")
+        return True
+
+    async def set_default_style(self, layer_name, style_name, workspace=None):
+        """Igual que GeoServerClient.set_default_style"""
+        workspace = workspace or self.workspace
+        payload = {"layer": {"defaultStyle": {"name": style_name, "workspace": workspace}}}
+        response = await self.request('PUT', f"layers/{workspace}:{layer_name}", json=payload)
+        if response.status_code not in [200, 201]:
+            raise GeoServerError(
+                f"Error al asignar el estilo {style_name} a {layer_name}: {response.status_code} - {response.text}"
+            )
+
+
+_client = None
+_client_lock = threading.Lock()
+_async_client = None
+
+
+def get_geoserver_client():
+    """
+    Devuelve el cliente compartido de GeoServer, creándolo la primera vez
+
+    Returns:
+        GeoServerClient: Cliente con sesión persistente
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GeoServerClient()
+        return _client
+
+
+def get_async_geoserver_client():
+    """
+    Devuelve el cliente asíncrono compartido, creándolo la primera vez.
+    Debe llamarse desde el bucle de eventos de los trabajos (app.jobs.get_event_loop),
+    el único en que se usa.
+
+    Returns:
+        AsyncGeoServerClient: Cliente con la caché del cliente síncrono
+    """
+    global _async_client
+    shared = get_geoserver_client()
+    with _client_lock:
+        if _async_client is None:
+            _async_client = AsyncGeoServerClient(shared)
+        return _async_client
@@ -0,0 +1,184 @@
+"""
+Optimización de las tablas de PostGIS después de cada importación.
+Independientemente del camino de carga (COPY o ogr2ogr), cada capa importada pasa por:
+
+1. Índice GiST sobre la geometría (si la carga no lo creó).
+2. Índices btree sobre columnas con aspecto de clave (id, cve_*, codigo...).
+3. Índices de trigramas sobre las columnas de nombre (app.search).
+4. Columnas de geometría generalizadas por nivel de zoom (app.generalize).
+5. CLUSTER de la tabla por geohash del centro de cada geometría, de modo que
+   los elementos cercanos en el mapa queden también cercanos en disco.
+6. VACUUM ANALYZE para actualizar estadísticas y el mapa de visibilidad.
+
+Los pasos 4 y 5 reescriben la tabla con un bloqueo ACCESS EXCLUSIVE, por lo que
+se ejecutan sobre la tabla de preparación (app.loader.staging_name) antes de que
+reemplace a la capa publicada (app.loader.swap_table): los lectores de la capa
+solo esperan al renombrado final, no a la optimización.
+
+Los tiempos de cada paso se devuelven para registrarlos en el resultado de la subida.
+"""
+
+import re
+import time
+from psycopg2 import sql
+from app.config import OPTIMIZE_CONFIG, GENERALIZE_CONFIG
+from app.database import get_connection, get_autocommit_connection
+from app.generalize import generalize_table
+from app.loader import derived_name
+from app.postgis import get_layer_info
+from app.search import create_search_indexes
+
+_KEY_COLUMN_RE = re.compile(OPTIMIZE_CONFIG['key_column_pattern'], re.IGNORECASE)
+
+
+def _indexed_columns(cursor, table_name):
+    """
+    Columnas que ya encabezan algún índice de la tabla, por método de acceso
+
+    Returns:
+        set: Pares (columna, método) por ejemplo ('geom', 'gist')
+    """
+    cursor.execute("""
+        SELECT a.attname, am.amname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_am am ON am.oid = c.relam
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        WHERE i.indrelid = %s::regclass
+    """, (sql.Identifier(table_name).as_string(cursor),))
+    return set(cursor.fetchall())
+
+
+def optimize_table(table_name):
+    """
+    Crea los índices de una tabla recién importada, la reordena espacialmente y actualiza sus estadísticas.
+    Se llama con la tabla de preparación, antes de app.loader.swap_table: los índices se
+    crean con su nombre y swap_table los renombra al de la capa.
+
+    Args:
+        table_name: Nombre de la tabla en PostGIS (normalmente la tabla de preparación)
+
+    Returns:
+        dict: Índices creados, columnas generalizadas, si se reordenó la tabla y la duración de cada paso
+    """
+    report = {'indexes': [], 'clustered': False}
+    info = get_layer_info(table_name)
+    if info is None:
+        return report
+    table = sql.Identifier(table_name)
+
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            existing = _indexed_columns(cursor, table_name)
+
+            # 1. Índice espacial
+            start = time.perf_counter()
+            geometry_column = info['geometry_column']
+            if geometry_column and (geometry_column, 'gist') not in existing:
+                name = derived_name(table_name, '_geom_idx')
+                cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} USING GIST ({})").format(
+                    sql.Identifier(name), table, sql.Identifier(geometry_column)
+                ))
+                report['indexes'].append(name)
+            report['gist_seconds'] = round(time.perf_counter() - start, 3)
+
+            # 2. Índices btree en columnas con aspecto de clave
+            start = time.perf_counter()
+            for column in info['columns']:
+                name = column['name']
+                if name == info['primary_key'] or (name, 'btree') in existing:
+                    continue
+                if _KEY_COLUMN_RE.search(name):
+                    index_name = derived_name(table_name, f"_{name}_idx")
+                    cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} ({})").format(
+                        sql.Identifier(index_name), table, sql.Identifier(name)
+                    ))
+                    report['indexes'].append(index_name)
+            report['btree_seconds'] = round(time.perf_counter() - start, 3)
+
+    # 3. Índices de trigramas en las columnas de nombre
+    start = time.perf_counter()
+    report['indexes'] += [derived_name(table_name, f"_{column}_trgm_idx") for column in create_search_indexes(table_name)]
+    report['trigram_seconds'] = round(time.perf_counter() - start, 3)
+
+    # 4. Versiones simplificadas de la geometría (antes de CLUSTER: ambas reescriben la tabla)
+    start = time.perf_counter()
+    report['generalized'] = []
+    if geometry_column and GENERALIZE_CONFIG['enabled']:
+        report['generalized'] = generalize_table(table_name, info)
+    report['generalize_seconds'] = round(time.perf_counter() - start, 3)
+
+    # 5. Reordenar la tabla por geohash (reescribe la tabla: solo hasta cierto tamaño)
+    start = time.perf_counter()
+    if geometry_column and OPTIMIZE_CONFIG['cluster']:
+        report['clustered'] = _cluster_by_geohash(table_name, geometry_column)
+    report['cluster_seconds'] = round(time.perf_counter() - start, 3)
+
+    # 6. VACUUM ANALYZE (fuera de una transacción)
+    start = time.perf_counter()
+    with get_autocommit_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL("VACUUM ANALYZE {}").format(table))
+    report['vacuum_seconds'] = round(time.perf_counter() - start, 3)
+
+    report['total_seconds'] = round(sum(value for key, value in report.items() if key.endswith('_seconds')), 3)
+    print(f"✅ Tabla {table_name} optimizada en {report['total_seconds']}s "
+          f"({len(report['indexes'])} índices nuevos, cluster: {'sí' if report['clustered'] else 'no'})")
+    return report
+
+
+def _cluster_by_geohash(table_name, geometry_column):
+    """
+    Reescribe la tabla ordenada por el geohash del centro del bbox de cada geometría.
+    CLUSTER necesita un índice (no parcial): se crea uno temporal sobre la expresión
+    de geohash y se elimina al terminar. Si la expresión falla (por ejemplo SRID desconocido),
+    se ordena por el índice GiST de la geometría.
+
+    Returns:
+        bool: True si la tabla se reordenó
+    """
+    table = sql.Identifier(table_name)
+    geometry = sql.Identifier(geometry_column)
+    geohash_index = sql.Identifier(derived_name(table_name, '_geohash_tmp'))
+
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                           (table.as_string(cursor),))
+            rows = cursor.fetchone()[0]
+            if rows > OPTIMIZE_CONFIG['cluster_max_rows']:
+                print(f"⚠️ {table_name} tiene ~{rows} registros: se omite CLUSTER para no alargar la carga")
+                return False
+
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql.SQL("""
+                    CREATE INDEX {index} ON {table} ((
+                        CASE WHEN ST_IsEmpty({geometry}) THEN NULL
+                             ELSE ST_GeoHash(ST_Transform(ST_Centroid(ST_Envelope({geometry})), 4326), 12)
+                        END
+                    ))
+                """).format(index=geohash_index, table=table, geometry=geometry))
+                cursor.execute(sql.SQL("CLUSTER {} USING {}").format(table, geohash_index))
+                cursor.execute(sql.SQL("DROP INDEX {}").format(geohash_index))
+        return True
+    except Exception as e:
+        print(f"⚠️ No se pudo ordenar {table_name} por geohash ({str(e)}), se usa el índice GiST")
+
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT c.relname
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                JOIN pg_am am ON am.oid = c.relam
+                JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+                WHERE i.indrelid = %s::regclass AND am.amname = 'gist' AND a.attname = %s
+                LIMIT 1
+            """, (table.as_string(cursor), geometry_column))
+            row = cursor.fetchone()
+            if not row:
+                return False
+            cursor.execute(sql.SQL("CLUSTER {} USING {}").format(table, sql.Identifier(row[0])))
+    return True
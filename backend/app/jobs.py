@@ -0,0 +1,384 @@
+"""
+Cola de trabajos en segundo plano para GeoportalSV.
+Permite que los endpoints de subida respondan de inmediato con un identificador
+de trabajo mientras un pool local de hilos ejecuta el procesamiento pesado
+(extracción, importación a PostGIS y publicación en GeoServer).
+
+El estado de cada trabajo se guarda como JSON en disco para que cualquier
+proceso del servidor pueda consultarlo a través de /api/jobs/<id>. Cada trabajo
+registra el proceso que lo ejecuta: al arrancar, los que quedaron en cola o en
+ejecución en un proceso que ya no existe (reinicio, recarga de gunicorn, caída)
+se marcan como fallidos (recover_interrupted_jobs).
+
+Los trabajos asíncronos (submit_async_job) son corrutinas que se ejecutan en un
+único bucle de eventos en un hilo propio, de modo que muchas subidas pueden estar
+en curso a la vez sin ocupar un hilo cada una.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from app.config import JOBS_CONFIG
+from app.metrics import observe_stage
+
+JOBS_FOLDER = os.path.join(os.getcwd(), JOBS_CONFIG['folder'])
+os.makedirs(JOBS_FOLDER, exist_ok=True)
+
+_executor = None
+_executor_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+# Bucle de eventos de los trabajos asíncronos y semáforo que limita cuántos se ejecutan a la vez
+_loop = None
+_loop_lock = threading.Lock()
+_async_slots = None
+
+# Estados de un trabajo que todavía no terminó
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+def _now():
+    """Devuelve la fecha y hora actual en formato ISO 8601 (UTC)"""
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _job_path(job_id):
+    return os.path.join(JOBS_FOLDER, f"{job_id}.json")
+
+
+def _get_executor():
+    """
+    Crea el pool de hilos la primera vez que se necesita
+
+    Returns:
+        ThreadPoolExecutor: Pool compartido por todos los trabajos
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=JOBS_CONFIG['max_workers'],
+                thread_name_prefix='geoportal-job'
+            )
+        return _executor
+
+
+def get_event_loop():
+    """
+    Crea la primera vez el bucle de eventos compartido y el hilo que lo ejecuta
+
+    Returns:
+        asyncio.AbstractEventLoop: Bucle donde se ejecutan los trabajos asíncronos
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='geoportal-job-loop', daemon=True).start()
+        return _loop
+
+
+class JobError(Exception):
+    """Error controlado dentro de un trabajo; su mensaje se muestra al usuario"""
+
+
+class Job:
+    """
+    Estado de un trabajo de ingesta y utilidades para registrar su progreso.
+    Cada cambio se persiste en disco inmediatamente.
+    """
+
+    def __init__(self, job_id, filename=None):
+        self.data = {
+            'id': job_id,
+            'status': 'queued',
+            'filename': filename,
+            'created_at': _now(),
+            'started_at': None,
+            'finished_at': None,
+            'duration': None,
+            'current_stage': None,
+            'stages': [],
+            'result': None,
+            'error': None,
+            'host': socket.gethostname(),
+            'pid': os.getpid()
+        }
+
+    @property
+    def id(self):
+        return self.data['id']
+
+    def save(self):
+        """Guarda el estado del trabajo de forma atómica"""
+        path = _job_path(self.id)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with _write_lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Registra una etapa del trabajo con su duración.
+        El diccionario devuelto se guarda como detalle de la etapa
+        (por ejemplo, número de registros importados).
+
+        Args:
+            name: Nombre de la etapa (extract, import, publish...)
+        """
+        stage = {
+            'name': name,
+            'status': 'running',
+            'started_at': _now(),
+            'finished_at': None,
+            'duration': None,
+            'detail': {}
+        }
+        self.data['stages'].append(stage)
+        self.data['current_stage'] = name
+        self.save()
+
+        start = time.perf_counter()
+        try:
+            yield stage['detail']
+            stage['status'] = 'completed'
+        except Exception:
+            stage['status'] = 'failed'
+            raise
+        finally:
+            stage['finished_at'] = _now()
+            stage['duration'] = round(time.perf_counter() - start, 3)
+            self.save()
+            observe_stage(name, stage['duration'])
+
+
+def _start_job(job):
+    """Marca el trabajo como en ejecución"""
+    job.data['status'] = 'running'
+    job.data['started_at'] = _now()
+    job.save()
+    return time.perf_counter()
+
+
+def _fail_job(job, error):
+    """Registra el error de un trabajo fallido"""
+    job.data['status'] = 'failed'
+    if isinstance(error, JobError):
+        job.data['error'] = str(error)
+        print(f"❌ Trabajo {job.id} fallido: {str(error)}")
+    else:
+        job.data['error'] = f'Error en el procesamiento: {str(error)}'
+        print(f"❌ Error inesperado en el trabajo {job.id}: {str(error)}")
+        traceback.print_exception(type(error), error, error.__traceback__)
+
+
+def _end_job(job, start):
+    """Registra el final del trabajo y su duración"""
+    job.data['current_stage'] = None
+    job.data['finished_at'] = _now()
+    job.data['duration'] = round(time.perf_counter() - start, 3)
+    job.save()
+
+
+def _run_job(job, target, args, kwargs):
+    """Ejecuta la función del trabajo y registra su resultado"""
+    start = _start_job(job)
+    try:
+        job.data['result'] = target(job, *args, **kwargs)
+        job.data['status'] = 'completed'
+        print(f"✅ Trabajo {job.id} completado")
+    except Exception as e:
+        _fail_job(job, e)
+    finally:
+        _end_job(job, start)
+
+
+async def _run_async_job(job, target, args, kwargs):
+    """Ejecuta la corrutina del trabajo cuando hay un hueco libre y registra su resultado"""
+    global _async_slots
+    if _async_slots is None:
+        _async_slots = asyncio.Semaphore(JOBS_CONFIG['max_async_jobs'])
+    async with _async_slots:
+        start = _start_job(job)
+        try:
+            job.data['result'] = await target(job, *args, **kwargs)
+            job.data['status'] = 'completed'
+            print(f"✅ Trabajo {job.id} completado")
+        except Exception as e:
+            _fail_job(job, e)
+        finally:
+            _end_job(job, start)
+
+
+def submit_job(target, *args, filename=None, **kwargs):
+    """
+    Encola un trabajo para ejecutarse en el pool local.
+
+    Args:
+        target: Función a ejecutar; recibe el Job como primer argumento
+        filename: Nombre del archivo original (solo informativo)
+        *args, **kwargs: Argumentos adicionales para target
+
+    Returns:
+        str: Identificador del trabajo
+    """
+    purge_expired_jobs()
+
+    job = Job(str(uuid.uuid4()), filename=filename)
+    job.save()
+    _get_executor().submit(_run_job, job, target, args, kwargs)
+    print(f"🆕 Trabajo {job.id} encolado ({filename})")
+    return job.id
+
+
+def submit_async_job(target, *args, filename=None, **kwargs):
+    """
+    Encola un trabajo asíncrono en el bucle de eventos compartido.
+
+    Args:
+        target: Corrutina (async def) a ejecutar; recibe el Job como primer argumento
+        filename: Nombre del archivo original (solo informativo)
+        *args, **kwargs: Argumentos adicionales para target
+
+    Returns:
+        str: Identificador del trabajo
+    """
+    purge_expired_jobs()
+
+    job = Job(str(uuid.uuid4()), filename=filename)
+    job.save()
+    asyncio.run_coroutine_threadsafe(_run_async_job(job, target, args, kwargs), get_event_loop())
+    print(f"🆕 Trabajo asíncrono {job.id} encolado ({filename})")
+    return job.id
+
+
+def get_job(job_id):
+    """
+    Obtiene el estado de un trabajo
+
+    Args:
+        job_id: Identificador del trabajo
+
+    Returns:
+        dict: Estado del trabajo o None si no existe
+    """
+    try:
+        uuid.UUID(job_id)
+    except (ValueError, TypeError):
+        return None
+
+    try:
+        with open(_job_path(job_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def list_jobs(limit=50):
+    """
+    Lista los trabajos más recientes
+
+    Args:
+        limit: Número máximo de trabajos a devolver
+
+    Returns:
+        list: Estados de los trabajos, del más reciente al más antiguo
+    """
+    paths = [os.path.join(JOBS_FOLDER, name) for name in os.listdir(JOBS_FOLDER) if name.endswith('.json')]
+    paths.sort(key=os.path.getmtime, reverse=True)
+
+    jobs = []
+    for path in paths[:limit]:
+        job = get_job(os.path.splitext(os.path.basename(path))[0])
+        if job:
+            jobs.append(job)
+    return jobs
+
+
+def _process_alive(pid):
+    """
+    Indica si un proceso de esta máquina sigue en ejecución
+
+    Args:
+        pid: Identificador del proceso
+
+    Returns:
+        bool: True si el proceso existe
+    """
+    if pid == os.getpid():
+        return True
+    if os.name == 'nt':
+        # En Windows os.kill(pid, 0) envía CTRL_C_EVENT; el servidor de desarrollo es un único proceso
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Existe, pero pertenece a otro usuario
+    return True
+
+
+def recover_interrupted_jobs():
+    """
+    Marca como fallidos los trabajos en cola o en ejecución cuyo proceso ya terminó.
+    Sus hilos y su bucle de eventos murieron con el proceso: sin esto seguirían
+    apareciendo como 'running' hasta que se purgaran. Los trabajos de otros procesos
+    vivos (otros workers de gunicorn, o los anteriores durante una recarga) no se tocan,
+    como tampoco los de otras máquinas que compartan el directorio.
+
+    Returns:
+        list: Identificadores de los trabajos marcados
+    """
+    host = socket.gethostname()
+    recovered = []
+    for name in os.listdir(JOBS_FOLDER):
+        if not name.endswith('.json'):
+            continue
+        data = get_job(os.path.splitext(name)[0])
+        if not data or data['status'] not in ACTIVE_STATUSES:
+            continue
+        if data.get('host', host) != host:
+            continue
+        pid = data.get('pid')
+        if pid is not None and _process_alive(pid):
+            continue
+
+        job = Job(data['id'])
+        job.data = data
+        job.data['status'] = 'failed'
+        job.data['error'] = 'Trabajo interrumpido: el proceso que lo ejecutaba terminó antes de completarlo'
+        job.data['current_stage'] = None
+        job.data['finished_at'] = _now()
+        for stage in job.data['stages']:
+            if stage['status'] == 'running':
+                stage['status'] = 'failed'
+        job.save()
+        recovered.append(job.id)
+
+    if recovered:
+        print(f"⚠️ {len(recovered)} trabajos interrumpidos marcados como fallidos")
+    return recovered
+
+
+def purge_expired_jobs():
+    """Elimina del disco el estado de los trabajos más antiguos que la retención configurada"""
+    limit = time.time() - JOBS_CONFIG['retention_hours'] * 3600
+    for name in os.listdir(JOBS_FOLDER):
+        path = os.path.join(JOBS_FOLDER, name)
+        try:
+            if os.path.getmtime(path) < limit:
+                os.remove(path)
+        except OSError:
+            pass
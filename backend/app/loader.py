@@ -0,0 +1,762 @@
+"""
+Carga masiva de capas vectoriales en PostGIS mediante COPY.
+Los registros se envían por lotes con la geometría codificada como EWKB
+hexadecimal, en lugar de insertarse fila a fila a través de SQLAlchemy.
+Antes de codificarse, las geometrías de cada lote se reproyectan al SRID
+canónico (UPLOAD_CONFIG['target_srid']) a partir del .prj y se reparan las
+inválidas, todo de forma vectorizada sobre arreglos de shapely.
+La tabla se construye en una tabla de preparación (<tabla>__carga) y los índices
+(clave primaria y GiST) y el ANALYZE se ejecutan al final de la carga. Los pasos
+que reescriben la tabla (columnas generalizadas, CLUSTER; app.indexing) también
+se hacen sobre la tabla de preparación, y la tabla anterior solo se reemplaza en
+el último momento (swap_table), de modo que los lectores no quedan bloqueados
+durante la importación ni durante la optimización.
+
+Para actualizar una capa existente sin reemplazarla, merge_features carga los
+registros en una tabla de preparación y los fusiona por una columna clave:
+solo se insertan, actualizan o eliminan las filas que cambian.
+"""
+
+import io
+import os
+import re
+import time
+import numpy as np
+import pyogrio
+import pyproj
+import shapely
+from psycopg2 import sql
+from app.config import UPLOAD_CONFIG
+from app.database import get_connection
+from app.postgis import get_layer_info
+
+# Modos de carga incremental (merge_features)
+MERGE_MODES = ('append', 'upsert')
+
+# Sufijo de la tabla de preparación en la que se carga y optimiza una capa antes de publicarla
+STAGING_SUFFIX = '__carga'
+
+# Tipos de PostgreSQL según el tipo de columna de pandas (dtype.kind)
+PG_TYPES = {
+    'i': 'bigint',
+    'u': 'bigint',
+    'f': 'double precision',
+    'b': 'boolean',
+    'M': 'timestamp'
+}
+
+# Tipo multi al que se promueven las geometrías simples (igual que PROMOTE_TO_MULTI de ogr2ogr)
+MULTI_TYPES = {
+    'MultiPolygon': ('Polygon', shapely.multipolygons),
+    'MultiLineString': ('LineString', shapely.multilinestrings),
+    'MultiPoint': ('Point', shapely.multipoints)
+}
+
+GEOMETRY_TYPE_IDS = {
+    'Point': 0,
+    'LineString': 1,
+    'Polygon': 3
+}
+
+# Tipos de geometría admitidos en cada tipo de columna declarado (shapely.get_type_id)
+ALLOWED_TYPE_IDS = {
+    'Point': [0],
+    'MultiPoint': [0, 4],
+    'MultiLineString': [1, 5],
+    'MultiPolygon': [3, 6]
+}
+
+# Tipos enteros de PostgreSQL (format_type) que COPY no acepta con decimales ("1.0")
+_INTEGER_TYPE_RE = re.compile(r'^(smallint|integer|bigint)$')
+
+MAX_IDENTIFIER_LENGTH = 63
+
+# Posiciones de elementos inválidos que se guardan como muestra en el informe de validación
+MAX_VALIDATION_SAMPLES = 20
+
+# Coordenada que GEOS añade al motivo de invalidez ("Self-intersection[-99.1 19.4]")
+_REASON_LOCATION_RE = re.compile(r'\s*\[.*\]\s*$')
+
+# Registros del primer lote, usado para estimar el tamaño en memoria de cada registro
+PROBE_BATCH_SIZE = 1000
+
+# Copias de cada lote que conviven en memoria (GeoDataFrame, EWKB y buffer CSV)
+BATCH_MEMORY_FACTOR = 3
+
+
+def launder_column_name(name):
+    """
+    Normaliza un nombre de columna: minúsculas, solo letras, números y guiones bajos
+
+    Args:
+        name: Nombre original de la columna (por ejemplo del .dbf)
+
+    Returns:
+        str: Nombre utilizable sin comillas en SQL
+    """
+    column = re.sub(r'[^a-z0-9_]', '_', str(name).lower())
+    if not column or column[0].isdigit():
+        column = f"col_{column}"
+    return column[:MAX_IDENTIFIER_LENGTH]
+
+
+def _estimate_row_bytes(batch):
+    """Memoria aproximada por registro de un lote: atributos más 16 bytes por coordenada"""
+    if len(batch) == 0:
+        return 0
+    attributes = batch.drop(columns=batch.geometry.name).memory_usage(deep=True, index=False).sum()
+    coordinates = int(shapely.get_num_coordinates(np.asarray(batch.geometry.values)).sum())
+    return (attributes + coordinates * 16) / len(batch)
+
+
+def _fixed_dtypes(path):
+    """
+    Tipos con nulos de pandas para los campos enteros y booleanos de una capa,
+    según su definición en OGR
+
+    Returns:
+        dict: {campo: 'Int64' o 'boolean'}
+    """
+    info = pyogrio.read_info(path)
+    nullable = {'i': 'Int64', 'u': 'Int64', 'b': 'boolean'}
+    return {field: nullable[np.dtype(dtype).kind]
+            for field, dtype in zip(info['fields'], info['dtypes']) if np.dtype(dtype).kind in nullable}
+
+
+def read_batches(path, batch_size=None, memory_mb=None):
+    """
+    Lee una capa vectorial por lotes de tamaño fijo con pyogrio (skip_features/max_features),
+    sin cargar nunca la capa completa en memoria.
+    El tamaño del lote se ajusta para que cada lote ocupe como máximo memory_mb.
+    Todos los lotes tienen los mismos tipos, los de la definición de los campos en OGR:
+    pyogrio devuelve un campo entero como float64 en los lotes que tienen nulos y como
+    int64 en los demás, así que los campos enteros y booleanos se entregan siempre con
+    los tipos con nulos de pandas (Int64, boolean).
+
+    Args:
+        path: Ruta (o ruta /vsizip/) de la capa
+        batch_size: Máximo de registros por lote (UPLOAD_CONFIG['batch_size'] por defecto)
+        memory_mb: Memoria máxima por lote (UPLOAD_CONFIG['batch_memory_mb'] por defecto)
+
+    Yields:
+        GeoDataFrame: Lotes consecutivos de la capa
+    """
+    batch_size = batch_size or UPLOAD_CONFIG['batch_size']
+    memory_mb = memory_mb or UPLOAD_CONFIG['batch_memory_mb']
+    dtypes = _fixed_dtypes(path)
+
+    # El primer lote, pequeño, sirve para estimar cuánto ocupa cada registro
+    probe = pyogrio.read_dataframe(path, max_features=min(PROBE_BATCH_SIZE, batch_size)).astype(dtypes)
+    yield probe
+    offset = len(probe)
+    if offset < min(PROBE_BATCH_SIZE, batch_size):
+        return
+
+    row_bytes = _estimate_row_bytes(probe)
+    if row_bytes:
+        budget_rows = int(memory_mb * 1024 * 1024 / (row_bytes * BATCH_MEMORY_FACTOR))
+        batch_size = max(PROBE_BATCH_SIZE, min(batch_size, budget_rows))
+    print(f"Leyendo {path} en lotes de {batch_size} registros (~{row_bytes / 1024:.1f} KB por registro)")
+
+    while True:
+        batch = pyogrio.read_dataframe(path, skip_features=offset, max_features=batch_size).astype(dtypes)
+        if len(batch) == 0:
+            return
+        yield batch
+        offset += len(batch)
+        if len(batch) < batch_size:
+            return
+
+
+def _column_type(dtype):
+    """Tipo de PostgreSQL para un dtype de pandas (texto por defecto)"""
+    if dtype.kind == 'M' and getattr(dtype, 'tz', None) is not None:
+        return 'timestamptz'
+    return PG_TYPES.get(dtype.kind, 'text')
+
+
+def layer_schema(path):
+    """
+    Tipo de PostgreSQL de cada campo de una capa según su definición en OGR.
+    No depende del contenido: un campo entero es entero aunque tenga nulos (que pandas
+    leería como float64) en unos lotes y no en otros.
+
+    Args:
+        path: Ruta (o ruta /vsizip/) de la capa
+
+    Returns:
+        dict: Tipo de PostgreSQL por nombre de campo
+    """
+    info = pyogrio.read_info(path)
+    return {field: _column_type(np.dtype(dtype)) for field, dtype in zip(info['fields'], info['dtypes'])}
+
+
+def _geometry_type(batch):
+    """
+    Tipo de la columna de geometría deducido del primer lote.
+    Las geometrías simples y multi de una misma familia se declaran como multi.
+    """
+    types = set(batch.geometry.geom_type.dropna().unique())
+    if not types:
+        return 'Geometry'
+    if types <= {'Polygon', 'MultiPolygon'}:
+        return 'MultiPolygon'
+    if types <= {'LineString', 'MultiLineString'}:
+        return 'MultiLineString'
+    if types == {'Point'}:
+        return 'Point'
+    if types <= {'Point', 'MultiPoint'}:
+        return 'MultiPoint'
+    return 'Geometry'
+
+
+def _to_ewkb(geometries, geometry_type, srid):
+    """
+    Codifica un arreglo de geometrías como EWKB hexadecimal de forma vectorizada
+
+    Args:
+        geometries: Arreglo de geometrías shapely (None para valores nulos)
+        geometry_type: Tipo declarado de la columna
+        srid: SRID que se incrusta en cada geometría
+
+    Returns:
+        numpy.ndarray: Cadenas EWKB (None para geometrías nulas)
+    """
+    geometries = np.array(geometries, dtype=object)
+
+    if geometry_type in MULTI_TYPES:
+        single_type, build_multi = MULTI_TYPES[geometry_type]
+        mask = shapely.get_type_id(geometries) == GEOMETRY_TYPE_IDS[single_type]
+        if mask.any():
+            geometries[mask] = build_multi(geometries[mask], indices=np.arange(mask.sum()))
+
+    geometries = shapely.set_srid(geometries, srid)
+    return shapely.to_wkb(geometries, hex=True, include_srid=True)
+
+
+def build_transformer(crs, target_srid):
+    """
+    Transformador del CRS de una capa al SRID canónico
+
+    Args:
+        crs: CRS leído del .prj (None si la capa no tiene)
+        target_srid: SRID en el que se almacenará la capa
+
+    Returns:
+        pyproj.Transformer: Transformador (x, y), o None si la capa ya está en el SRID canónico
+    """
+    if crs is None:
+        source = pyproj.CRS.from_epsg(UPLOAD_CONFIG['default_source_srid'])
+    else:
+        source = pyproj.CRS.from_user_input(crs)
+    target = pyproj.CRS.from_epsg(target_srid)
+    if source.equals(target, ignore_axis_order=True):
+        return None
+    return pyproj.Transformer.from_crs(source, target, always_xy=True)
+
+
+def new_validation_report():
+    """
+    Informe de validación vacío, que se va completando lote a lote
+
+    Returns:
+        dict: Contadores, motivos de invalidez, bbox y muestra de los elementos inválidos
+    """
+    return {
+        'features': 0,     # Elementos revisados
+        'null': 0,         # Sin geometría
+        'empty': 0,        # Geometría vacía
+        'invalid': 0,      # Inválidas según GEOS
+        'repaired': 0,     # Inválidas reparadas con make_valid
+        'dropped': 0,      # Inválidas que se anularon al no poder repararse con su tipo
+        'reasons': {},     # Motivo de GEOS (sin la coordenada) -> número de elementos
+        'bbox': None,      # Extensión de los elementos inválidos [minx, miny, maxx, maxy]
+        'samples': []      # Posiciones (desde 0) de los primeros elementos inválidos
+    }
+
+
+def validate_geometries(geometries, report):
+    """
+    Valida un lote de geometrías con las funciones vectorizadas de shapely y acumula el
+    resultado en el informe. El motivo y el bbox solo se calculan para las inválidas.
+
+    Args:
+        geometries: Arreglo de geometrías shapely (None para valores nulos)
+        report: Informe de new_validation_report (se modifica)
+
+    Returns:
+        numpy.ndarray: Máscara de las geometrías inválidas del lote
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    offset = report['features']
+    missing = shapely.is_missing(geometries)
+    invalid = ~missing & ~shapely.is_valid(geometries)
+    report['features'] += len(geometries)
+    report['null'] += int(missing.sum())
+    report['empty'] += int((~missing & shapely.is_empty(geometries)).sum())
+
+    count = int(invalid.sum())
+    if not count:
+        return invalid
+    report['invalid'] += count
+
+    offenders = geometries[invalid]
+    reasons, totals = np.unique(
+        [_REASON_LOCATION_RE.sub('', reason) for reason in shapely.is_valid_reason(offenders)],
+        return_counts=True
+    )
+    for reason, total in zip(reasons, totals):
+        report['reasons'][reason] = report['reasons'].get(reason, 0) + int(total)
+
+    bounds = shapely.bounds(offenders)
+    box = [np.nanmin(bounds[:, 0]), np.nanmin(bounds[:, 1]), np.nanmax(bounds[:, 2]), np.nanmax(bounds[:, 3])]
+    if not np.isnan(box).any():
+        if report['bbox']:
+            box = [min(report['bbox'][0], box[0]), min(report['bbox'][1], box[1]),
+                   max(report['bbox'][2], box[2]), max(report['bbox'][3], box[3])]
+        report['bbox'] = [float(value) for value in box]
+
+    room = MAX_VALIDATION_SAMPLES - len(report['samples'])
+    if room > 0:
+        report['samples'] += [int(index) + offset for index in np.flatnonzero(invalid)[:room]]
+    return invalid
+
+
+def normalize_geometries(geometries, geometry_type, transformer=None, report=None):
+    """
+    Reproyecta, valida y (si UPLOAD_CONFIG['make_valid']) repara un arreglo de geometrías
+    de forma vectorizada
+
+    Args:
+        geometries: Arreglo de geometrías shapely (None para valores nulos)
+        geometry_type: Tipo declarado de la columna
+        transformer: Transformador de build_transformer (None para no reproyectar)
+        report: Informe de validación que se completa (uno nuevo si no se indica)
+
+    Returns:
+        numpy.ndarray: Geometrías normalizadas
+    """
+    geometries = np.array(geometries, dtype=object)
+    if transformer is not None:
+        geometries = shapely.transform(
+            geometries, lambda coords: np.column_stack(transformer.transform(coords[:, 0], coords[:, 1]))
+        )
+
+    # La validación se hace en el SRID de destino: el bbox del informe queda en las unidades de la tabla
+    invalid = validate_geometries(geometries, report if report is not None else new_validation_report())
+    if not UPLOAD_CONFIG['make_valid'] or not invalid.any():
+        return geometries
+
+    # Para polígonos, el método 'structure' devuelve siempre polígonos y descarta las partes degeneradas
+    if geometry_type == 'MultiPolygon':
+        repaired = shapely.make_valid(geometries[invalid], method='structure', keep_collapsed=False)
+    else:
+        repaired = shapely.make_valid(geometries[invalid])
+
+    # Lo que tras la reparación ya no es del tipo de la columna (por ejemplo una línea reducida a un punto) se anula
+    dropped = 0
+    if geometry_type in ALLOWED_TYPE_IDS:
+        mismatch = ~np.isin(shapely.get_type_id(repaired), ALLOWED_TYPE_IDS[geometry_type])
+        repaired[mismatch] = None
+        dropped = int(mismatch.sum())
+    geometries[invalid] = repaired
+    if report is not None:
+        report['repaired'] += int(invalid.sum()) - dropped
+        report['dropped'] += dropped
+    return geometries
+
+
+def derived_name(table_name, suffix):
+    """Nombre de un objeto derivado de una tabla, recortado al límite de identificadores de PostgreSQL"""
+    return f"{table_name[:MAX_IDENTIFIER_LENGTH - len(suffix)]}{suffix}"
+
+
+def staging_name(table_name):
+    """Tabla de preparación de una capa (swap_table la renombra al nombre definitivo)"""
+    return derived_name(table_name, STAGING_SUFFIX)
+
+
+def is_staging_table(table_name):
+    """True si la tabla es una tabla de preparación que todavía no reemplazó a su capa"""
+    return table_name.endswith(STAGING_SUFFIX)
+
+
+def swap_table(temp_table, table_name):
+    """
+    Reemplaza una capa por su tabla de preparación en una transacción corta: elimina la
+    tabla anterior y renombra la nueva, sus índices (con ellos, la clave primaria) y sus
+    secuencias al nombre definitivo. Es el único paso de la importación que bloquea a los lectores
+    de la capa (ACCESS EXCLUSIVE), y solo mientras duran el DROP y los renombrados.
+
+    Args:
+        temp_table: Tabla de preparación ya cargada, indexada y optimizada
+        table_name: Nombre definitivo de la capa
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT c.relname
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE i.indrelid = %s::regclass
+            """, (sql.Identifier(temp_table).as_string(cursor),))
+            indexes = [row[0] for row in cursor.fetchall()]
+            # Secuencias propias de la tabla (gid de ogr2ogr o columna IDENTITY)
+            cursor.execute("""
+                SELECT c.relname
+                FROM pg_depend d
+                JOIN pg_class c ON c.oid = d.objid AND c.relkind = 'S'
+                WHERE d.refobjid = %s::regclass AND d.deptype IN ('a', 'i')
+            """, (sql.Identifier(temp_table).as_string(cursor),))
+            sequences = [row[0] for row in cursor.fetchall()]
+
+            cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(table_name)))
+            cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(
+                sql.Identifier(temp_table), sql.Identifier(table_name)
+            ))
+            for kind, names in (('INDEX', indexes), ('SEQUENCE', sequences)):
+                for name in names:
+                    # derived_name(temp_table, sufijo) pasa a derived_name(table_name, sufijo)
+                    suffix = name[len(os.path.commonprefix([temp_table, name])):]
+                    cursor.execute(sql.SQL("ALTER {} {} RENAME TO {}").format(
+                        sql.SQL(kind), sql.Identifier(name),
+                        sql.Identifier(derived_name(table_name, suffix or f"_{kind.lower()}"))
+                    ))
+
+
+def _attribute_columns(batch, geometry_column):
+    """
+    Columnas de atributos de un lote y su nombre normalizado en PostGIS;
+    'gid' se reserva para la clave primaria
+
+    Returns:
+        tuple: (columnas de origen, columnas de destino)
+    """
+    source_columns = [column for column in batch.columns if column != batch.geometry.name]
+    used = {'gid', geometry_column}
+    target_columns = []
+    for column in source_columns:
+        name = launder_column_name(column)
+        base, suffix = name, 1
+        while name in used:
+            name = f"{base[:MAX_IDENTIFIER_LENGTH - 4]}_{suffix}"
+            suffix += 1
+        used.add(name)
+        target_columns.append(name)
+    return source_columns, target_columns
+
+
+def copy_features(table_name, batches, srid=None, geometry_column='geometry', prepare=None, schema=None):
+    """
+    Carga lotes de GeoDataFrame en una tabla de PostGIS usando COPY.
+    Si la tabla existe se reemplaza al final de la carga.
+
+    Args:
+        table_name: Nombre de la tabla destino
+        batches: Iterable de GeoDataFrames con las mismas columnas (por ejemplo read_batches)
+        srid: SRID en el que se almacena la capa (UPLOAD_CONFIG['target_srid'] por defecto);
+              las geometrías se reproyectan desde el CRS del primer lote
+        geometry_column: Nombre de la columna de geometría en PostGIS
+        prepare: Función prepare(tabla de preparación) que se ejecuta antes del reemplazo,
+                 por ejemplo app.indexing.optimize_table; su resultado se guarda en 'optimize'
+        schema: Tipo de PostgreSQL de cada campo de origen (layer_schema); sin él los tipos
+                se deducen del primer lote
+
+    Returns:
+        dict: Registros cargados, tipo de geometría, reproyección, informe de validación y tiempos de cada fase
+    """
+    batches = iter(batches)
+    first = next(batches, None)
+    if first is None:
+        raise ValueError(f'La capa {table_name} no contiene datos')
+
+    # Sin .prj se supone UPLOAD_CONFIG['default_source_srid']
+    srid = srid or UPLOAD_CONFIG['target_srid']
+    transformer = build_transformer(first.crs, srid)
+
+    temp_table = staging_name(table_name)
+
+    source_columns, target_columns = _attribute_columns(first, geometry_column)
+    schema = schema or {}
+    column_types = {name: schema.get(column) or _column_type(first[column].dtype)
+                    for column, name in zip(source_columns, target_columns)}
+
+    geometry_type = _geometry_type(first)
+    report = {
+        'rows': 0, 'batches': 0, 'geometry_type': geometry_type, 'srid': srid,
+        'source_crs': first.crs.to_string() if first.crs else f"EPSG:{UPLOAD_CONFIG['default_source_srid']}",
+        'reprojected': transformer is not None, 'validation': new_validation_report()
+    }
+
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            # 1. Crear la tabla temporal sin índices
+            columns_sql = [sql.SQL("gid bigint GENERATED BY DEFAULT AS IDENTITY")]
+            columns_sql += [
+                sql.SQL("{} {}").format(sql.Identifier(name), sql.SQL(column_types[name]))
+                for name in target_columns
+            ]
+            columns_sql.append(sql.SQL("{} geometry({}, {})").format(
+                sql.Identifier(geometry_column), sql.SQL(geometry_type), sql.Literal(int(srid))
+            ))
+            cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(temp_table)))
+            cursor.execute(sql.SQL("CREATE TABLE {} ({})").format(
+                sql.Identifier(temp_table), sql.SQL(', ').join(columns_sql)
+            ))
+
+            copy_sql = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL '\\N')").format(
+                sql.Identifier(temp_table),
+                sql.SQL(', ').join(sql.Identifier(name) for name in target_columns + [geometry_column])
+            ).as_string(cursor)
+
+            # 2. Enviar los lotes por COPY (read_seconds: parte del tiempo dedicada a leer el shapefile)
+            start = time.perf_counter()
+            read_seconds = 0.0
+            batch = first
+            while batch is not None:
+                frame = batch[source_columns].copy()
+                frame.columns = target_columns
+                cast_integer_columns(frame, column_types)
+                geometries = normalize_geometries(batch.geometry.values, geometry_type, transformer, report['validation'])
+                frame[geometry_column] = _to_ewkb(geometries, geometry_type, srid)
+
+                buffer = io.StringIO()
+                frame.to_csv(buffer, header=False, index=False, na_rep='\\N')
+                buffer.seek(0)
+                cursor.copy_expert(copy_sql, buffer)
+
+                report['rows'] += len(frame)
+                report['batches'] += 1
+                read_start = time.perf_counter()
+                batch = next(batches, None)
+                read_seconds += time.perf_counter() - read_start
+            report['copy_seconds'] = round(time.perf_counter() - start, 3)
+            report['read_seconds'] = round(read_seconds, 3)
+
+            # 3. Índices después de la carga
+            start = time.perf_counter()
+            cursor.execute(sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} PRIMARY KEY (gid)").format(
+                sql.Identifier(temp_table), sql.Identifier(derived_name(temp_table, '_pkey'))
+            ))
+            cursor.execute(sql.SQL("CREATE INDEX {} ON {} USING GIST ({})").format(
+                sql.Identifier(derived_name(temp_table, '_geom_idx')),
+                sql.Identifier(temp_table),
+                sql.Identifier(geometry_column)
+            ))
+            report['index_seconds'] = round(time.perf_counter() - start, 3)
+
+            start = time.perf_counter()
+            cursor.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(temp_table)))
+            report['analyze_seconds'] = round(time.perf_counter() - start, 3)
+
+    # 4. Optimizar la tabla de preparación (ya confirmada: nadie la lee todavía)
+    if prepare is not None:
+        try:
+            report['optimize'] = prepare(temp_table)
+        except Exception as e:
+            # La capa ya está cargada: un fallo aquí no debe impedir publicarla
+            print(f"⚠️ No se pudo optimizar la tabla {table_name}: {str(e)}")
+            report['optimize'] = {'error': str(e)}
+
+    # 5. Reemplazar la tabla anterior (bloqueo breve)
+    swap_table(temp_table, table_name)
+
+    print(f"✅ {report['rows']} registros cargados con COPY en {table_name} "
+          f"(copy {report['copy_seconds']}s, índices {report['index_seconds']}s)")
+    if report['reprojected']:
+        print(f"🔄 {table_name} reproyectada de {report['source_crs']} a EPSG:{srid}")
+    return report
+
+
+def cast_integer_columns(frame, column_types):
+    """
+    Prepara un lote para enviarlo por COPY a columnas enteras. pandas convierte
+    a float las columnas enteras con nulos, que en el CSV se escribirían como "1.0" y COPY
+    rechazaría; se convierten al tipo entero con nulos de pandas (Int64).
+    Las columnas con decimales reales se dejan como están (COPY informará del error).
+
+    Args:
+        frame: DataFrame con los nombres de columna de PostGIS
+        column_types: Tipo de PostgreSQL de cada columna {columna: tipo}
+
+    Returns:
+        DataFrame: El mismo frame, con las columnas enteras convertidas
+    """
+    for column in frame.columns:
+        if frame[column].dtype.kind != 'f' or not _INTEGER_TYPE_RE.match(column_types.get(column, '')):
+            continue
+        values = frame[column].dropna()
+        if (values % 1 == 0).all():
+            frame[column] = frame[column].astype('Int64')
+    return frame
+
+
+def merge_statements(table_name, stage_name, key, columns, mode='upsert', delete_missing=False):
+    """
+    Sentencias que fusionan la tabla de preparación de merge_features con la tabla destino,
+    en el orden en que se ejecutan: 'delete' (con delete_missing), 'update' (modo upsert;
+    solo las filas cuyos valores cambian) e 'insert' (claves que no existen)
+
+    Args:
+        table_name: Tabla destino
+        stage_name: Tabla de preparación con los registros de la carga
+        key: Columna clave (nombre en PostGIS)
+        columns: Columnas que se copian, incluida la geometría
+        mode: 'append' o 'upsert'
+        delete_missing: Eliminar los registros cuya clave no viene en la carga
+
+    Returns:
+        list: Tuplas (acción, sentencia SQL compuesta)
+    """
+    column_list = sql.SQL(', ').join(sql.Identifier(name) for name in columns)
+    source_list = sql.SQL(', ').join(sql.SQL("s.{}").format(sql.Identifier(name)) for name in columns)
+    target_list = sql.SQL(', ').join(sql.SQL("t.{}").format(sql.Identifier(name)) for name in columns)
+    table = sql.Identifier(table_name)
+    stage = sql.Identifier(stage_name)
+    key_sql = sql.Identifier(key)
+
+    statements = []
+    if delete_missing:
+        statements.append(('delete', sql.SQL("""
+            DELETE FROM {table} AS t WHERE NOT EXISTS (SELECT 1 FROM {stage} AS s WHERE s.{key} = t.{key})
+        """).format(table=table, stage=stage, key=key_sql)))
+    if mode == 'upsert':
+        statements.append(('update', sql.SQL("""
+            UPDATE {table} AS t SET ({columns}) = ({source})
+            FROM {stage} AS s
+            WHERE t.{key} = s.{key} AND ({target}) IS DISTINCT FROM ({source})
+        """).format(table=table, columns=column_list, source=source_list, stage=stage,
+                    key=key_sql, target=target_list)))
+    statements.append(('insert', sql.SQL("""
+        INSERT INTO {table} ({columns})
+        SELECT {source} FROM {stage} AS s
+        WHERE NOT EXISTS (SELECT 1 FROM {table} AS t WHERE t.{key} = s.{key})
+    """).format(table=table, columns=column_list, source=source_list, stage=stage, key=key_sql)))
+    return statements
+
+
+def merge_features(table_name, batches, key_column, mode='upsert', delete_missing=False):
+    """
+    Fusiona lotes de GeoDataFrame con una tabla existente en lugar de reemplazarla.
+    Los registros se envían con COPY a una tabla de preparación temporal y se combinan
+    con la tabla en una sola transacción, emparejándolos por key_column:
+    - 'append': solo se insertan los registros cuya clave no existe.
+    - 'upsert': además se actualizan los registros existentes cuyos valores cambiaron.
+    Con delete_missing se eliminan los registros cuya clave no aparece en la carga.
+    Solo se escriben las filas que cambian; la tabla conserva sus índices, sus columnas
+    generalizadas (se recalculan solas) y su capa en GeoServer.
+
+    Args:
+        table_name: Tabla existente
+        batches: Iterable de GeoDataFrames con las mismas columnas (por ejemplo read_batches)
+        key_column: Columna que identifica cada registro (nombre en el shapefile o en PostGIS)
+        mode: 'append' o 'upsert'
+        delete_missing: Eliminar los registros que no vienen en la carga
+
+    Returns:
+        dict: Registros recibidos, insertados, actualizados, eliminados y sin cambios, con los tiempos de cada fase
+
+    Raises:
+        ValueError: Si la tabla o la clave no existen, si la carga trae columnas nuevas
+                    o si hay claves nulas o repetidas
+    """
+    if mode not in MERGE_MODES:
+        raise ValueError(f"Modo de carga no válido: {mode} (se admite {', '.join(MERGE_MODES)})")
+    info = get_layer_info(table_name)
+    if info is None or not info['geometry_column']:
+        raise ValueError(f'La tabla {table_name} no existe o no tiene geometría')
+
+    batches = iter(batches)
+    first = next(batches, None)
+    if first is None:
+        raise ValueError(f'La capa {table_name} no contiene datos')
+
+    geometry_column = info['geometry_column']
+    geometry_type = info['geometry_type']
+    srid = info['srid'] or UPLOAD_CONFIG['target_srid']
+    transformer = build_transformer(first.crs, srid)
+
+    source_columns, target_columns = _attribute_columns(first, geometry_column)
+    existing = {column['name'] for column in info['columns']}
+    unknown = [name for name in target_columns if name not in existing]
+    if unknown:
+        raise ValueError(f"La carga trae columnas que no existen en {table_name} ({', '.join(unknown)}); "
+                         f"use una importación completa")
+    key = key_column if key_column in target_columns else launder_column_name(key_column)
+    if key not in target_columns:
+        raise ValueError(f'La columna clave {key_column} no existe en la capa')
+
+    columns = target_columns + [geometry_column]
+    column_list = sql.SQL(', ').join(sql.Identifier(name) for name in columns)
+    column_types = {column['name']: column['type'] for column in info['columns']}
+    table = sql.Identifier(table_name)
+    stage_name = derived_name(table_name, '__merge')
+    stage = sql.Identifier(stage_name)
+    key_sql = sql.Identifier(key)
+
+    report = {
+        'mode': mode, 'key_column': key, 'rows': 0, 'batches': 0,
+        'inserted': 0, 'updated': 0, 'deleted': 0,
+        'source_crs': first.crs.to_string() if first.crs else f"EPSG:{UPLOAD_CONFIG['default_source_srid']}",
+        'reprojected': transformer is not None, 'validation': new_validation_report()
+    }
+
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            # 1. Tabla de preparación con los tipos de la tabla destino
+            cursor.execute(sql.SQL("CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA").format(
+                stage, column_list, table
+            ))
+            copy_sql = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL '\\N')").format(
+                stage, column_list
+            ).as_string(cursor)
+
+            # 2. Enviar los lotes por COPY
+            start = time.perf_counter()
+            batch = first
+            while batch is not None:
+                frame = batch[source_columns].copy()
+                frame.columns = target_columns
+                cast_integer_columns(frame, column_types)
+                geometries = normalize_geometries(batch.geometry.values, geometry_type, transformer, report['validation'])
+                frame[geometry_column] = _to_ewkb(geometries, geometry_type, srid)
+
+                buffer = io.StringIO()
+                frame.to_csv(buffer, header=False, index=False, na_rep='\\N')
+                buffer.seek(0)
+                cursor.copy_expert(copy_sql, buffer)
+
+                report['rows'] += len(frame)
+                report['batches'] += 1
+                batch = next(batches, None)
+            report['copy_seconds'] = round(time.perf_counter() - start, 3)
+
+            cursor.execute(sql.SQL("SELECT count(*) - count({key}), count({key}) - count(DISTINCT {key}) FROM {stage}").format(
+                key=key_sql, stage=stage
+            ))
+            nulls, duplicates = cursor.fetchone()
+            if nulls or duplicates:
+                raise ValueError(f'La columna clave {key} tiene {nulls} valores nulos y {duplicates} repetidos en la carga')
+
+            # 3. Índices para emparejar por la clave
+            cursor.execute(sql.SQL("CREATE INDEX ON {} ({})").format(stage, key_sql))
+            cursor.execute(sql.SQL("ANALYZE {}").format(stage))
+            cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} ({})").format(
+                sql.Identifier(derived_name(table_name, f"_{key}_idx")), table, key_sql
+            ))
+
+            # 4. Fusionar en la misma transacción: los lectores ven el estado anterior hasta el commit
+            start = time.perf_counter()
+            counts = {'delete': 'deleted', 'update': 'updated', 'insert': 'inserted'}
+            for action, statement in merge_statements(table_name, stage_name, key, columns, mode, delete_missing):
+                cursor.execute(statement)
+                report[counts[action]] = cursor.rowcount
+            report['merge_seconds'] = round(time.perf_counter() - start, 3)
+
+            report['unchanged'] = report['rows'] - report['inserted'] - report['updated']
+            if report['inserted'] or report['updated'] or report['deleted']:
+                cursor.execute(sql.SQL("ANALYZE {}").format(table))
+
+    print(f"✅ {table_name} fusionada por {key} ({mode}): {report['inserted']} insertados, "
+          f"{report['updated']} actualizados, {report['deleted']} eliminados, {report['unchanged']} sin cambios")
+    return report
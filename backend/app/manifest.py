@@ -0,0 +1,359 @@
+"""
+Manifiesto de cargas: evita repetir importaciones de archivos ya cargados.
+Cada ZIP se resume con SHA-256 mientras se recibe, y cada shapefile con dos
+huellas: la de su geometría (.shp, .shx, .prj) y la de sus atributos (.dbf,
+.cpg). La tabla geoportal_upload_manifest guarda, por capa, las huellas de la
+última carga y un número de versión.
+
+Con eso cada capa de una nueva subida se clasifica como:
+- 'unchanged': mismas huellas que la última carga; no se importa nada.
+- 'attributes': misma geometría y distintos atributos; solo se actualizan
+  (con un diff por gid) las filas cuyos atributos cambiaron.
+- 'full': capa nueva o geometría distinta; importación completa.
+"""
+
+import glob
+import hashlib
+import io
+import os
+import re
+import threading
+import zipfile
+import pyogrio
+from psycopg2 import sql
+from app.config import UPLOAD_CONFIG
+from app.database import get_connection
+from app.loader import launder_column_name, derived_name
+from app.postgis import get_layer_info
+
+MANIFEST_TABLE = 'geoportal_upload_manifest'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Componentes del shapefile que determinan cada huella
+GEOMETRY_EXTENSIONS = ('.shp', '.shx', '.prj')
+ATTRIBUTE_EXTENSIONS = ('.dbf', '.cpg')
+
+_VSIZIP_RE = re.compile(r'^/vsizip/(.+?\.zip)/(.+)$', re.IGNORECASE)
+
+_table_ready = False
+_table_lock = threading.Lock()
+
+
+class ManifestMismatch(Exception):
+    """La capa no admite una actualización incremental (se importa completa)"""
+
+
+def save_and_hash(file_storage, path):
+    """
+    Guarda un archivo subido en disco calculando su SHA-256 a medida que se escribe
+
+    Args:
+        file_storage: Archivo de la petición (werkzeug FileStorage)
+        path: Ruta de destino
+
+    Returns:
+        str: SHA-256 hexadecimal del contenido
+    """
+    digest = hashlib.sha256()
+    with open(path, 'wb') as output:
+        while True:
+            chunk = file_storage.stream.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            output.write(chunk)
+    return digest.hexdigest()
+
+
+def hash_file(path):
+    """SHA-256 hexadecimal de un archivo en disco (leído por bloques)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _ensure_table():
+    """Crea la tabla del manifiesto la primera vez que se usa en el proceso"""
+    global _table_ready
+    with _table_lock:
+        if _table_ready:
+            return
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql.SQL("""
+                    CREATE TABLE IF NOT EXISTS {} (
+                        table_name text PRIMARY KEY,
+                        archive_hash text NOT NULL,
+                        archive_layers integer NOT NULL DEFAULT 1,
+                        source_hash text NOT NULL,
+                        geometry_hash text NOT NULL,
+                        attributes_hash text NOT NULL,
+                        version integer NOT NULL DEFAULT 1,
+                        rows bigint,
+                        updated_at timestamptz NOT NULL DEFAULT now()
+                    )
+                """).format(sql.Identifier(MANIFEST_TABLE)))
+                cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} (archive_hash)").format(
+                    sql.Identifier(derived_name(MANIFEST_TABLE, '_archive_idx')), sql.Identifier(MANIFEST_TABLE)
+                ))
+        _table_ready = True
+
+
+def layer_fingerprint(shapefile_path):
+    """
+    Huellas de un shapefile a partir del contenido de sus componentes.
+    Funciona tanto con rutas en disco como con rutas /vsizip/ (se lee el ZIP sin extraerlo).
+
+    Args:
+        shapefile_path: Ruta (o ruta /vsizip/) del archivo .shp
+
+    Returns:
+        dict: {source_hash, geometry_hash, attributes_hash}
+    """
+    geometry = hashlib.sha256()
+    attributes = hashlib.sha256()
+    base = os.path.splitext(shapefile_path)[0]
+
+    # El contenido se resume igual desde el ZIP que desde disco, para que ambas formas de lectura coincidan
+    match = _VSIZIP_RE.match(base)
+    zip_ref = zipfile.ZipFile(match.group(1)) if match else None
+    try:
+        if zip_ref:
+            members = {name.lower(): name for name in zip_ref.namelist()}
+            components = {ext: members.get(f"{match.group(2)}{ext}".lower())
+                          for ext in GEOMETRY_EXTENSIONS + ATTRIBUTE_EXTENSIONS}
+        else:
+            siblings = {os.path.splitext(path)[1].lower(): path for path in glob.glob(f"{glob.escape(base)}.*")}
+            components = {ext: siblings.get(ext) for ext in GEOMETRY_EXTENSIONS + ATTRIBUTE_EXTENSIONS}
+
+        for extensions, digest in ((GEOMETRY_EXTENSIONS, geometry), (ATTRIBUTE_EXTENSIONS, attributes)):
+            for extension in extensions:
+                if not components[extension]:
+                    continue
+                digest.update(extension.encode())
+                with (zip_ref.open(components[extension]) if zip_ref else open(components[extension], 'rb')) as source:
+                    for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b''):
+                        digest.update(chunk)
+    finally:
+        if zip_ref:
+            zip_ref.close()
+
+    geometry_hash = geometry.hexdigest()
+    attributes_hash = attributes.hexdigest()
+    return {
+        'source_hash': hashlib.sha256(f"{geometry_hash}:{attributes_hash}".encode()).hexdigest(),
+        'geometry_hash': geometry_hash,
+        'attributes_hash': attributes_hash
+    }
+
+
+def _existing_tables(cursor, table_names):
+    cursor.execute("""
+        SELECT c.relname FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relname = ANY(%s)
+    """, (list(table_names),))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def find_archive(archive_hash):
+    """
+    Capas cargadas desde un ZIP idéntico, si todas siguen existiendo
+
+    Args:
+        archive_hash: SHA-256 del ZIP
+
+    Returns:
+        list: Registros del manifiesto {table_name, version, rows} (vacía si no hay coincidencia completa)
+    """
+    _ensure_table()
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL("""
+                SELECT table_name, version, rows, archive_layers FROM {} WHERE archive_hash = %s ORDER BY table_name
+            """).format(sql.Identifier(MANIFEST_TABLE)), (archive_hash,))
+            rows = cursor.fetchall()
+            existing = _existing_tables(cursor, [row[0] for row in rows])
+
+    # Todas las capas del ZIP deben seguir en el manifiesto con este ZIP como origen y existir en PostGIS
+    if not rows or any(row[3] != len(rows) or row[0] not in existing for row in rows):
+        return []
+    return [{'table_name': name, 'version': version, 'rows': count} for name, version, count, _ in rows]
+
+
+def plan_layers(layers):
+    """
+    Decide cómo cargar cada capa comparando sus huellas con las del manifiesto
+
+    Args:
+        layers: Tuplas (ruta del shapefile, nombre de tabla)
+
+    Returns:
+        list: Un plan por capa {action, fingerprint, version, rows}; action es 'unchanged', 'attributes' o 'full'
+    """
+    fingerprints = [layer_fingerprint(path) for path, _ in layers]
+    table_names = [table_name for _, table_name in layers]
+
+    _ensure_table()
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL("""
+                SELECT table_name, source_hash, geometry_hash, version, rows FROM {} WHERE table_name = ANY(%s)
+            """).format(sql.Identifier(MANIFEST_TABLE)), (table_names,))
+            known = {row[0]: row[1:] for row in cursor.fetchall()}
+            existing = _existing_tables(cursor, table_names)
+
+    plans = []
+    for table_name, fingerprint in zip(table_names, fingerprints):
+        plan = {'action': 'full', 'fingerprint': fingerprint, 'version': None, 'rows': None}
+        if table_name in known and table_name in existing:
+            source_hash, geometry_hash, version, rows = known[table_name]
+            plan['version'], plan['rows'] = version, rows
+            if source_hash == fingerprint['source_hash']:
+                plan['action'] = 'unchanged'
+            elif geometry_hash == fingerprint['geometry_hash']:
+                plan['action'] = 'attributes'
+        print(f"👉 {table_name}: {plan['action']}")
+        plans.append(plan)
+    return plans
+
+
+def update_attributes(table_name, shapefile_path):
+    """
+    Actualiza solo los atributos de una capa cuya geometría no cambió.
+    Los atributos se leen sin geometría, por lotes, y se cargan con COPY en una tabla
+    temporal; después un único UPDATE modifica las filas (por gid, que sigue el orden
+    de los elementos del shapefile) cuyos valores son distintos.
+
+    Args:
+        table_name: Tabla existente
+        shapefile_path: Ruta (o ruta /vsizip/) del shapefile nuevo
+
+    Returns:
+        dict: {rows, updated}
+
+    Raises:
+        ManifestMismatch: Si cambiaron las columnas o el número de elementos
+    """
+    info = get_layer_info(table_name)
+    if info is None or info['primary_key'] != 'gid':
+        raise ManifestMismatch(f"La tabla {table_name} no tiene la clave gid")
+    columns = [column['name'] for column in info['columns'] if column['name'] != 'gid']
+    temp_table = derived_name(table_name, '__attrs')
+    batch_size = UPLOAD_CONFIG['batch_size']
+
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL("""
+                CREATE TEMP TABLE {temp} ON COMMIT DROP AS SELECT gid, {columns} FROM {table} WITH NO DATA
+            """).format(
+                temp=sql.Identifier(temp_table),
+                columns=sql.SQL(', ').join(sql.Identifier(column) for column in columns),
+                table=sql.Identifier(table_name)
+            ))
+            copy_sql = sql.SQL("COPY {} (gid, {}) FROM STDIN WITH (FORMAT csv, NULL '\\N')").format(
+                sql.Identifier(temp_table), sql.SQL(', ').join(sql.Identifier(column) for column in columns)
+            ).as_string(cursor)
+
+            rows = 0
+            while True:
+                batch = pyogrio.read_dataframe(shapefile_path, read_geometry=False,
+                                               skip_features=rows, max_features=batch_size)
+                names = [launder_column_name(column) for column in batch.columns]
+                if sorted(names) != sorted(columns):
+                    raise ManifestMismatch(f"Las columnas de {table_name} cambiaron")
+                batch.columns = names
+                batch = batch[columns]
+                batch.insert(0, 'gid', range(rows + 1, rows + len(batch) + 1))
+
+                buffer = io.StringIO()
+                batch.to_csv(buffer, header=False, index=False, na_rep='\\N')
+                buffer.seek(0)
+                cursor.copy_expert(copy_sql, buffer)
+                rows += len(batch)
+                if len(batch) < batch_size:
+                    break
+
+            cursor.execute(sql.SQL("SELECT count(*), max(gid) FROM {}").format(sql.Identifier(table_name)))
+            if tuple(cursor.fetchone()) != (rows, rows or None):
+                raise ManifestMismatch(f"El número de elementos de {table_name} cambió")
+
+            target = sql.SQL(', ').join(sql.SQL("t.{}").format(sql.Identifier(column)) for column in columns)
+            source = sql.SQL(', ').join(sql.SQL("s.{}").format(sql.Identifier(column)) for column in columns)
+            cursor.execute(sql.SQL("""
+                UPDATE {table} AS t SET ({columns}) = ({source})
+                FROM {temp} AS s
+                WHERE t.gid = s.gid AND ({target}) IS DISTINCT FROM ({source})
+            """).format(
+                table=sql.Identifier(table_name),
+                columns=sql.SQL(', ').join(sql.Identifier(column) for column in columns),
+                source=source,
+                temp=sql.Identifier(temp_table),
+                target=target
+            ))
+            updated = cursor.rowcount
+            if updated:
+                cursor.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(table_name)))
+
+    print(f"✅ {table_name}: atributos actualizados en {updated} de {rows} elementos")
+    return {'rows': rows, 'updated': updated}
+
+
+def record_layers(layer_results, archive_hash):
+    """
+    Registra en el manifiesto las capas cargadas correctamente, aumentando su versión si cambiaron
+
+    Args:
+        layer_results: Resultados por capa con 'table_name', 'success', 'action', 'fingerprint' y 'rows'
+        archive_hash: SHA-256 del ZIP del que proceden (None si no se conoce)
+    """
+    entries = [layer for layer in layer_results if layer['success'] and layer.get('fingerprint')]
+    if not entries:
+        return
+    _ensure_table()
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            for layer in entries:
+                fingerprint = layer['fingerprint']
+                cursor.execute(sql.SQL("""
+                    INSERT INTO {table} (table_name, archive_hash, archive_layers, source_hash,
+                                         geometry_hash, attributes_hash, rows)
+                    VALUES (%(table_name)s, %(archive_hash)s, %(archive_layers)s, %(source_hash)s,
+                            %(geometry_hash)s, %(attributes_hash)s, %(rows)s)
+                    ON CONFLICT (table_name) DO UPDATE SET
+                        archive_hash = EXCLUDED.archive_hash,
+                        archive_layers = EXCLUDED.archive_layers,
+                        source_hash = EXCLUDED.source_hash,
+                        geometry_hash = EXCLUDED.geometry_hash,
+                        attributes_hash = EXCLUDED.attributes_hash,
+                        rows = COALESCE(EXCLUDED.rows, {table}.rows),
+                        version = {table}.version + CASE WHEN {table}.source_hash = EXCLUDED.source_hash THEN 0 ELSE 1 END,
+                        updated_at = now()
+                    RETURNING version
+                """).format(table=sql.Identifier(MANIFEST_TABLE)), {
+                    'table_name': layer['table_name'],
+                    'archive_hash': archive_hash or fingerprint['source_hash'],
+                    'archive_layers': len(layer_results),
+                    'rows': layer.get('rows'),
+                    **fingerprint
+                })
+                layer['version'] = cursor.fetchone()[0]
+
+
+def forget_layers(table_names):
+    """
+    Elimina del manifiesto las capas modificadas fuera de una carga completa
+    (por ejemplo con una fusión incremental): sus huellas ya no describen la tabla
+
+    Args:
+        table_names: Nombres de las tablas
+    """
+    if not table_names:
+        return
+    _ensure_table()
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL("DELETE FROM {} WHERE table_name = ANY(%s)").format(sql.Identifier(MANIFEST_TABLE)),
+                           (list(table_names),))
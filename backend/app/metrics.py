@@ -0,0 +1,230 @@
+"""
+Métricas del backend en el formato de texto de Prometheus (/api/metrics).
+
+- Latencia de cada petición HTTP por endpoint (regla de Flask), método y código.
+- Duración de las etapas de importación: guardado del ZIP (save), etapas del
+  trabajo (scan/extract, dedupe, validate, import, optimize, swap, publish) y, por
+  capa, lectura del shapefile (read), carga en PostGIS (load) e índices (index).
+- Bytes procesados (ZIP recibidos, exportaciones enviadas) y registros importados.
+- Estado del pool de conexiones, del cliente de GeoServer y de la caché de capas.
+
+Los contadores se llevan en memoria, sin dependencias externas. Con gunicorn
+cada proceso tiene los suyos: /api/metrics devuelve los del proceso que
+atiende la petición.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request
+from app.cache import cache_stats
+from app.config import METRICS_CONFIG
+from app.database import pool_status
+from app.geoserver import get_geoserver_client
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _labels(labels):
+    """Etiquetas en la sintaxis de Prometheus: {clave="valor",...}"""
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + '}'
+
+
+class Counter:
+    """Contador acumulado por combinación de etiquetas"""
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def lines(self):
+        with self._lock:
+            values = dict(self._values)
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} counter"
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_labels(dict(key))} {value}"
+
+
+class Histogram:
+    """Histograma de duraciones por combinación de etiquetas, con límites fijos"""
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = sorted(float(bucket) for bucket in buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = next((i for i, bucket in enumerate(self.buckets) if value <= bucket), len(self.buckets))
+        with self._lock:
+            series = self._series.setdefault(key, {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0})
+            series['counts'][index] += 1
+            series['sum'] += value
+
+    def lines(self):
+        with self._lock:
+            series = {key: {'counts': list(value['counts']), 'sum': value['sum']}
+                      for key, value in self._series.items()}
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} histogram"
+        for key, value in sorted(series.items()):
+            labels = dict(key)
+            cumulative = 0
+            for bucket, count in zip(self.buckets + [float('inf')], value['counts']):
+                cumulative += count
+                le = '+Inf' if bucket == float('inf') else repr(bucket)
+                yield f"{self.name}_bucket{_labels({**labels, 'le': le})} {cumulative}"
+            yield f"{self.name}_sum{_labels(labels)} {round(value['sum'], 6)}"
+            yield f"{self.name}_count{_labels(labels)} {cumulative}"
+
+
+REQUEST_SECONDS = Histogram('geoportal_http_request_duration_seconds',
+                            'Duración de las peticiones HTTP por endpoint, método y código de respuesta',
+                            METRICS_CONFIG['request_buckets'])
+STAGE_SECONDS = Histogram('geoportal_import_stage_seconds',
+                          'Duración de cada etapa de importación (por trabajo o, en read/load/index, por capa)',
+                          METRICS_CONFIG['stage_buckets'])
+BYTES = Counter('geoportal_bytes_processed_total', 'Bytes procesados por tipo (upload, export)')
+ROWS = Counter('geoportal_rows_imported_total', 'Registros importados por tipo de carga (full, attributes, merge)')
+
+
+def observe_stage(stage, seconds):
+    """Registra la duración de una etapa de importación"""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+@contextmanager
+def stage_timer(stage):
+    """
+    Mide la duración del bloque como una etapa de importación
+
+    Uso:
+        with stage_timer('save'):
+            guardar_archivo()
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def add_bytes(kind, count):
+    """Suma bytes procesados de un tipo (upload, export)"""
+    BYTES.inc(count, kind=kind)
+
+
+def count_bytes(chunks, kind):
+    """
+    Cuenta los bytes de un flujo de bloques a medida que se envían
+
+    Yields:
+        bytes: Los mismos bloques
+    """
+    for chunk in chunks:
+        BYTES.inc(len(chunk), kind=kind)
+        yield chunk
+
+
+def observe_layer(layer):
+    """
+    Registra las fases de la importación de una capa a partir de su resultado
+    (app.utils.import_layers_parallel y variantes). Con la carga por COPY el tiempo
+    se reparte entre lectura (read_seconds), carga e índices (index_seconds); con
+    ogr2ogr, las fusiones y los diffs de atributos toda la duración cuenta como carga.
+
+    Args:
+        layer: Resultado de la importación de una capa
+    """
+    if not layer['success'] or layer['action'] == 'unchanged':
+        return
+    if 'copy_seconds' in layer:
+        read = layer.get('read_seconds', 0.0)
+        observe_stage('read', read)
+        observe_stage('load', max(layer['copy_seconds'] - read, 0.0))
+    elif layer['duration'] is not None:
+        observe_stage('load', layer['duration'])
+    if 'index_seconds' in layer:
+        observe_stage('index', layer['index_seconds'])
+    if layer['rows']:
+        ROWS.inc(layer['rows'], action=layer['action'])
+
+
+def instrument_app(app):
+    """
+    Mide la latencia de todas las peticiones de la aplicación.
+    En las respuestas en streaming (exportaciones) se mide hasta el primer byte.
+
+    Args:
+        app: Aplicación Flask
+    """
+    if not METRICS_CONFIG['enabled']:
+        return
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint,
+                                    method=request.method, status=response.status_code)
+        return response
+
+
+def _snapshot(prefix, description, values, kinds):
+    """
+    Líneas de un conjunto de valores leídos de las métricas de otro módulo.
+    Los acumulados (kind 'counter') llevan el sufijo _total, como pide Prometheus;
+    los valores instantáneos se exponen como gauge.
+    """
+    for key, kind in kinds.items():
+        if values.get(key) is None:
+            continue
+        name = f"{prefix}_{key}_total" if kind == 'counter' else f"{prefix}_{key}"
+        yield f"# HELP {name} {description}: {key}"
+        yield f"# TYPE {name} {kind}"
+        yield f"{name} {float(values[key])}"
+
+
+def render():
+    """
+    Todas las métricas en el formato de texto de Prometheus
+
+    Returns:
+        str: Documento de texto para /api/metrics
+    """
+    lines = []
+    for metric in (REQUEST_SECONDS, STAGE_SECONDS, BYTES, ROWS):
+        lines += metric.lines()
+
+    lines += _snapshot('geoportal_db_pool', 'Pool de conexiones a PostgreSQL', pool_status(), {
+        'pool_size': 'gauge', 'checked_out': 'gauge', 'checked_in': 'gauge', 'overflow': 'gauge',
+        'connections_created': 'counter', 'checkouts': 'counter', 'checkout_wait_seconds': 'counter',
+        'max_checkout_wait_seconds': 'gauge', 'errors': 'counter'
+    })
+    lines += _snapshot('geoportal_geoserver_client', 'Cliente REST de GeoServer', get_geoserver_client().stats(), {
+        'requests': 'counter', 'errors': 'counter', 'seconds': 'counter',
+        'cache_hits': 'counter', 'cache_misses': 'counter', 'cached_entries': 'gauge'
+    })
+    lines += _snapshot('geoportal_layer_cache', 'Caché de resultados por capa', cache_stats(), {
+        'hits': 'counter', 'misses': 'counter', 'invalidations': 'counter', 'entries': 'gauge'
+    })
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,165 @@
+"""
+Etapas asíncronas del flujo de subida (UPLOAD_CONFIG['async_pipeline']).
+Se ejecutan en el bucle de eventos de app.jobs: cada importación con ogr2ogr es
+un subproceso asíncrono, de modo que varias capas (y varios trabajos) se importan
+a la vez sin ocupar un hilo ni un proceso del pool por capa, y las peticiones a
+GeoServer de un lote se lanzan en paralelo en lugar de una tras otra.
+
+Las peticiones a GeoServer usan el cliente asíncrono (httpx) de app.geoserver,
+que reintenta igual que el síncrono y comparte con él la caché del catálogo.
+"""
+
+import asyncio
+import functools
+import time
+from app.config import UPLOAD_CONFIG
+from app.geoserver import GeoServerError, get_async_geoserver_client
+from app.generalize import publish_styles_async
+from app.jobs import JobError
+from app.manifest import update_attributes, forget_layers
+from app.postgis import get_layer_info
+from app.utils import get_import_pool, merge_layer
+
+
+async def run_command(command):
+    """
+    Ejecuta un comando como subproceso asíncrono
+
+    Args:
+        command: Argumentos del comando
+
+    Returns:
+        str: Salida estándar del comando
+
+    Raises:
+        JobError: Si el comando termina con error
+    """
+    process = await asyncio.create_subprocess_exec(
+        *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise JobError(stderr.decode('utf-8', 'replace'))
+    return stdout.decode('utf-8', 'replace')
+
+
+async def _timed(coroutine):
+    """Espera una corrutina y mide su duración"""
+    start = time.perf_counter()
+    value = await coroutine
+    return value, round(time.perf_counter() - start, 3)
+
+
+async def import_layers_async(layers, plans, build_command, key_column=None, mode=None, delete_missing=False):
+    """
+    Importa las capas de un ZIP; equivalente asíncrono de app.utils.import_planned_layers
+    (modo 'replace', con plans) y de app.utils.import_merged_layers (modos append/upsert).
+    Como mucho UPLOAD_CONFIG['import_workers'] capas se importan a la vez.
+
+    Args:
+        layers: Tuplas (ruta del shapefile, nombre de tabla)
+        plans: Un plan del manifiesto por capa, o None en los modos append/upsert
+        build_command: build_command(ruta, tabla) devuelve el comando ogr2ogr de la importación completa
+        key_column, mode, delete_missing: Igual que en app.utils.import_merged_layers
+
+    Returns:
+        list: Un resultado por capa, en el mismo orden y con el mismo formato que las versiones síncronas
+    """
+    semaphore = asyncio.Semaphore(UPLOAD_CONFIG['import_workers'])
+    loop = asyncio.get_running_loop()
+    merging = plans is None
+
+    async def full_import(path, table_name):
+        print(f"Ejecutando ogr2ogr para la tabla {table_name}")
+        try:
+            await run_command(build_command(path, table_name))
+        except JobError as e:
+            print(f"Error en ogr2ogr: {str(e)}")
+            raise JobError(f'Error al importar a PostGIS: {str(e)}')
+
+    async def merge(path, table_name):
+        # La fusión lee el shapefile y compara en PostgreSQL: se ejecuta en el pool de procesos
+        return await loop.run_in_executor(
+            get_import_pool(),
+            functools.partial(merge_layer, path, table_name, key_column, mode, delete_missing)
+        )
+
+    async def attributes(path, table_name):
+        try:
+            return await asyncio.to_thread(update_attributes, table_name, path), 'attributes'
+        except Exception as e:
+            print(f"⚠️ No se pudo actualizar {table_name} de forma incremental ({str(e)}), se importará completa")
+            return await full_import(path, table_name), 'full'
+
+    async def run(index):
+        path, table_name = layers[index]
+        plan = plans[index] if plans else None
+        result = {'source': path, 'table_name': table_name, 'success': False, 'rows': None,
+                  'duration': None, 'error': None, 'action': 'full'}
+        if plan and plan['action'] == 'unchanged':
+            print(f"👉 Capa {table_name} sin cambios desde la versión {plan['version']}: no se importa")
+            result.update(success=True, rows=plan['rows'], duration=0.0, action='unchanged')
+            return result
+
+        async with semaphore:
+            try:
+                if merging and await asyncio.to_thread(get_layer_info, table_name) is not None:
+                    result['action'] = 'merge'
+                    value, result['duration'] = await _timed(merge(path, table_name))
+                elif plan and plan['action'] == 'attributes':
+                    result['rows'] = plan['rows']
+                    (value, result['action']), result['duration'] = await _timed(attributes(path, table_name))
+                else:
+                    value, result['duration'] = await _timed(full_import(path, table_name))
+            except Exception as e:
+                result['error'] = str(e)
+                print(f"❌ Error al importar la capa {table_name}: {str(e)}")
+                return result
+
+        if isinstance(value, dict):
+            result.update(value)
+        result['success'] = True
+        print(f"✅ Capa {table_name} importada en {result['duration']}s")
+        return result
+
+    results = await asyncio.gather(*(run(index) for index in range(len(layers))))
+    if merging:
+        forget_layers([result['table_name'] for result in results if result['success']])
+    else:
+        for result, plan in zip(results, plans):
+            result['fingerprint'] = plan['fingerprint']
+    return list(results)
+
+
+async def publish_async(table_names):
+    """
+    Publica un lote de tablas en GeoServer; equivalente asíncrono de
+    app.upload.publish_to_geoserver. El catálogo (workspaces, datastores y
+    featuretypes) se consulta en paralelo, y después se publican todas las capas
+    y sus estilos a la vez.
+
+    Args:
+        table_names: Nombres de las tablas en PostGIS
+
+    Returns:
+        dict: Para cada tabla, True si la capa se creó y False si ya existía
+
+    Raises:
+        JobError: Si GeoServer rechaza la publicación de alguna capa
+    """
+    print(f"Publicando {len(table_names)} capa(s) en GeoServer...")
+    client = get_async_geoserver_client()
+    try:
+        # Llenar la caché del cliente con una petición simultánea por colección;
+        # un fallo aquí (datastore aún inexistente) se resuelve en ensure_datastore
+        await asyncio.gather(client.workspaces(), client.datastores(), client.featuretypes(),
+                             return_exceptions=True)
+        await client.ensure_datastore()
+
+        created = await asyncio.gather(*(client.publish_featuretype(name) for name in table_names))
+    except GeoServerError as e:
+        print(f"Error al publicar en GeoServer: {str(e)}")
+        raise JobError(f'Error al publicar en GeoServer: {str(e)}')
+
+    await publish_styles_async(table_names, client)
+    return dict(zip(table_names, created))
@@ -0,0 +1,262 @@
+"""
+Consultas de solo lectura sobre las capas almacenadas en PostGIS.
+Incluye la descripción de una capa (columnas, geometría, SRID y clave primaria)
+y la construcción segura de consultas con proyección de columnas, filtro
+espacial por bbox, filtros de atributos y paginación por clave (keyset).
+"""
+
+import datetime
+import decimal
+import re
+from psycopg2 import sql
+from app.database import get_connection
+from app.cache import cached_for_layer
+
+# Operadores admitidos en los filtros de atributos (columna:operador:valor)
+FILTER_OPERATORS = {
+    'eq': '=',
+    'ne': '<>',
+    'lt': '<',
+    'lte': '<=',
+    'gt': '>',
+    'gte': '>=',
+    'like': 'ILIKE',
+    'in': 'IN',
+    'null': 'IS NULL',
+    'notnull': 'IS NOT NULL'
+}
+
+_GEOMETRY_TYPE_RE = re.compile(r'^geometry(?:\((\w+)(?:,\s*(\d+))?\))?$', re.IGNORECASE)
+_GENERALIZED_RE = re.compile(r'_z(\d+)$')
+
+
+class LayerQueryError(ValueError):
+    """Parámetros de consulta inválidos para una capa (se responde con 400)"""
+
+
+def json_value(value):
+    """Convierte los tipos de psycopg2 (Decimal, fechas) en valores serializables a JSON"""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def get_layer_info(layer_name):
+    """
+    Describe una tabla de PostGIS en una sola consulta al catálogo
+
+    Args:
+        layer_name: Nombre de la tabla en el esquema public
+
+    Returns:
+        dict: Columnas, columna de geometría, tipo, SRID y clave primaria (None si no tiene
+              o si es compuesta: no identifica una fila con una sola columna), o None si no existe
+    """
+    query = """
+        SELECT a.attname,
+               format_type(a.atttypid, a.atttypmod),
+               COALESCE(a.attnum = ANY(i.indkey), false) AS is_pk
+        FROM pg_attribute a
+        JOIN pg_class c ON c.oid = a.attrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        LEFT JOIN pg_index i ON i.indrelid = c.oid AND i.indisprimary
+        WHERE n.nspname = 'public'
+          AND c.relname = %s
+          AND c.relkind IN ('r', 'v', 'm', 'p')
+          AND a.attnum > 0
+          AND NOT a.attisdropped
+        ORDER BY a.attnum
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, (layer_name,))
+            rows = cursor.fetchall()
+
+            if not rows:
+                return None
+
+            info = {
+                'name': layer_name,
+                'columns': [],
+                'geometry_column': None,
+                'geometry_type': None,
+                'srid': None,
+                'primary_key': None,
+                'generalized': []
+            }
+            primary_key = []
+            for name, column_type, is_pk in rows:
+                match = _GEOMETRY_TYPE_RE.match(column_type)
+                if match and info['geometry_column'] is None:
+                    info['geometry_column'] = name
+                    info['geometry_type'] = match.group(1) or 'Geometry'
+                    info['srid'] = int(match.group(2)) if match.group(2) else None
+                    continue
+                # Versiones simplificadas de la geometría (app.generalize): no son atributos
+                level = _generalized_level(info['geometry_column'], name) if match else None
+                if level is not None:
+                    info['generalized'].append((level, name))
+                    continue
+                info['columns'].append({'name': name, 'type': column_type})
+                if is_pk:
+                    primary_key.append(name)
+
+            info['primary_key'] = primary_key[0] if len(primary_key) == 1 else None
+            info['generalized'].sort()
+
+            # Columnas de geometría sin tipo declarado: consultar el SRID
+            if info['geometry_column'] and info['srid'] is None:
+                cursor.execute("SELECT Find_SRID('public', %s, %s)", (layer_name, info['geometry_column']))
+                info['srid'] = cursor.fetchone()[0] or 4326
+
+    return info
+
+
+def _generalized_level(geometry_column, column_name):
+    """Nivel de zoom de una columna generalizada (<geometría>_z<nivel>) o None"""
+    match = _GENERALIZED_RE.search(column_name)
+    # El nombre de la geometría puede venir recortado para no superar 63 caracteres
+    prefix = column_name[:match.start()] if match else ''
+    if prefix and geometry_column and geometry_column.startswith(prefix):
+        return int(match.group(1))
+    return None
+
+
+def generalized_column(info, zoom):
+    """
+    Columna de geometría que conviene leer para un zoom: la versión generalizada
+    de menor nivel que todavía cubre ese zoom, o la geometría completa
+
+    Args:
+        info: Descripción de la capa (get_layer_info)
+        zoom: Nivel de zoom solicitado (None para la geometría completa)
+
+    Returns:
+        str: Nombre de la columna
+    """
+    if zoom is not None:
+        for level, column in info.get('generalized') or []:
+            if zoom <= level:
+                return column
+    return info['geometry_column']
+
+
+def get_layer_info_cached(layer_name):
+    """
+    Igual que get_layer_info, pero reutiliza la descripción mientras la tabla no cambie.
+    Pensado para endpoints muy frecuentes (teselas, consulta de elementos).
+
+    Returns:
+        dict: Descripción de la capa o None si no existe
+    """
+    info, _ = cached_for_layer(layer_name, 'info', lambda: get_layer_info(layer_name))
+    return info
+
+
+def parse_columns(value, info):
+    """
+    Valida la lista de columnas solicitada (?columns=a,b,c)
+
+    Returns:
+        list: Columnas de atributos a devolver (todas si no se indicó ninguna)
+    """
+    available = [column['name'] for column in info['columns']]
+    if not value:
+        return available
+
+    columns = [column.strip() for column in value.split(',') if column.strip()]
+    unknown = [column for column in columns if column not in available]
+    if unknown:
+        raise LayerQueryError(f"Columnas desconocidas: {', '.join(unknown)}")
+    return columns
+
+
+def parse_bbox(value):
+    """
+    Interpreta un bbox con el formato minx,miny,maxx,maxy[,srid]
+
+    Returns:
+        tuple: (minx, miny, maxx, maxy, srid) o None si no se indicó
+    """
+    if not value:
+        return None
+    parts = value.split(',')
+    if len(parts) not in (4, 5):
+        raise LayerQueryError("El bbox debe tener el formato minx,miny,maxx,maxy[,srid]")
+    try:
+        minx, miny, maxx, maxy = (float(part) for part in parts[:4])
+        srid = int(parts[4]) if len(parts) == 5 else 4326
+    except ValueError:
+        raise LayerQueryError("El bbox contiene valores no numéricos")
+    if minx > maxx or miny > maxy:
+        raise LayerQueryError("El bbox es inválido (min mayor que max)")
+    return minx, miny, maxx, maxy, srid
+
+
+def parse_filters(values, info):
+    """
+    Interpreta filtros de atributos con el formato columna:operador:valor
+    (por ejemplo nombre:like:San%, poblacion:gte:1000, region:in:Norte|Sur, fecha:null)
+
+    Returns:
+        list: Tuplas (columna, operador SQL, valor)
+    """
+    available = {column['name'] for column in info['columns']}
+    filters = []
+    for raw in values:
+        parts = raw.split(':', 2)
+        if len(parts) < 2:
+            raise LayerQueryError(f"Filtro inválido '{raw}', use columna:operador:valor")
+        column, operator = parts[0], parts[1].lower()
+        if column not in available:
+            raise LayerQueryError(f"Columna desconocida en el filtro: {column}")
+        if operator not in FILTER_OPERATORS:
+            raise LayerQueryError(f"Operador desconocido en el filtro: {operator}")
+        if operator in ('null', 'notnull'):
+            filters.append((column, FILTER_OPERATORS[operator], None))
+            continue
+        if len(parts) != 3:
+            raise LayerQueryError(f"Falta el valor en el filtro '{raw}'")
+        value = parts[2].split('|') if operator == 'in' else parts[2]
+        filters.append((column, FILTER_OPERATORS[operator], value))
+    return filters
+
+
+def build_where(info, bbox=None, filters=None):
+    """
+    Construye la cláusula WHERE para un bbox y filtros de atributos.
+    Los valores se pasan siempre como parámetros; las columnas como identificadores.
+
+    Returns:
+        tuple: (lista de condiciones sql.Composable, lista de parámetros)
+    """
+    conditions = []
+    params = []
+
+    if bbox:
+        if not info['geometry_column']:
+            raise LayerQueryError("La capa no tiene columna de geometría")
+        # && usa el índice GiST de la geometría
+        conditions.append(sql.SQL("{} && ST_Transform(ST_MakeEnvelope(%s, %s, %s, %s, %s), %s)").format(
+            sql.Identifier(info['geometry_column'])
+        ))
+        params.extend(list(bbox) + [info['srid']])
+
+    for column, operator, value in filters or []:
+        if value is None:
+            conditions.append(sql.SQL("{} " + operator).format(sql.Identifier(column)))
+        elif operator == 'IN':
+            conditions.append(sql.SQL("{}::text = ANY(%s)").format(sql.Identifier(column)))
+            params.append(value)
+        elif operator == 'ILIKE':
+            conditions.append(sql.SQL("{}::text ILIKE %s").format(sql.Identifier(column)))
+            params.append(value)
+        else:
+            # Comparar como texto convertido al tipo de la columna
+            column_type = next(c['type'] for c in info['columns'] if c['name'] == column)
+            conditions.append(sql.SQL("{} " + operator + " %s::" + column_type).format(sql.Identifier(column)))
+            params.append(value)
+
+    return conditions, params
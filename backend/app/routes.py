@@ -2,18 +2,15 @@ from flask import Blueprint, request, jsonify
 import os
 import uuid
 import zipfile
-import shutil
-from .utils import save_and_import_file, process_shapefile_zip
+from .utils import save_and_import_file, process_shapefile_zip, find_shapefiles_in_zip
 from db import get_data_from_db
 
 main = Blueprint('main', __name__)
 
 UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads')
-SHAPEFILE_FOLDER = os.path.join(os.getcwd(), 'shapefiles')
 
 # Crear directorios si no existen
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(SHAPEFILE_FOLDER, exist_ok=True)
 
 @main.route('/api/health', methods=['GET'])
 def health_check():
@@ -58,33 +55,17 @@ def upload_shapefile():
         # Guardar el archivo ZIP
         file.save(zip_path)
         
-        # Crear directorio para extraer el shapefile
-        extract_dir = os.path.join(SHAPEFILE_FOLDER, str(uuid.uuid4()))
-        os.makedirs(extract_dir, exist_ok=True)
-        
-        # Extraer el archivo ZIP
+        # Verificar que contiene archivos shapefile (.shp) sin extraer el ZIP
         try:
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
-            
-            # Verificar que contiene archivos shapefile (.shp)
-            has_shapefile = False
-            for root, _, files in os.walk(extract_dir):
-                for file in files:
-                    if file.lower().endswith('.shp'):
-                        has_shapefile = True
-                        break
-                if has_shapefile:
-                    break
+            has_shapefile = bool(find_shapefiles_in_zip(zip_path))
             
             if not has_shapefile:
                 # Limpieza si no hay shapefiles
-                shutil.rmtree(extract_dir, ignore_errors=True)
                 os.remove(zip_path)
                 return jsonify({'error': 'El archivo ZIP no contiene ningún shapefile (.shp)'}), 400
             
-            # Procesar el shapefile y publicar en GeoServer
-            result = process_shapefile_zip(extract_dir)
+            # Procesar el shapefile leyéndolo directamente del ZIP y publicar en GeoServer
+            result = process_shapefile_zip(zip_path)
             
             # Limpiar archivo ZIP original
             os.remove(zip_path)
@@ -96,10 +77,6 @@ def upload_shapefile():
                     'table_name': result.get('table_name', '')
                 }
                 
-                # Solo incluir la ruta si el directorio no se eliminó
-                if not result.get('cleaned_directory', False):
-                    response_data['filepath'] = extract_dir
-                
                 # Agregar información de GeoServer si está disponible
                 if 'geoserver_urls' in result:
                     response_data['geoserver'] = result['geoserver_urls']
@@ -0,0 +1,70 @@
+from flask import Blueprint, request, jsonify
+import time
+from ..utils import format_response
+from ..postgis import parse_bbox, LayerQueryError
+from ..featureinfo import query_layers, search_window
+from ..generalize import zoom_for_resolution
+from ..config import FEATURE_INFO_CONFIG
+
+feature_info_bp = Blueprint('feature_info', __name__)
+
+@feature_info_bp.route('/', methods=['GET'])
+def get_feature_info():
+    """
+    Elementos de varias capas en un punto (o bbox) con una sola petición.
+    Cada capa se consulta en paralelo con su índice espacial.
+    
+    Parámetros de consulta:
+        layers: Capas a consultar separadas por comas
+        x, y: Coordenadas del clic en el SRID del mapa
+        resolution: Unidades del mapa por píxel en el zoom actual
+        srid: SRID del mapa (3857 por defecto)
+        tolerance: Píxeles de tolerancia alrededor del clic
+        bbox: Alternativa a x/y: minx,miny,maxx,maxy[,srid]
+        limit: Máximo de elementos por capa
+        geometry: 'true' para incluir la geometría como GeoJSON en EPSG:4326
+        zoom: Zoom del mapa para elegir la geometría generalizada (se deduce de resolution en EPSG:3857)
+        
+    Returns:
+        JSON: Resultados por capa en el orden solicitado
+    """
+    try:
+        start = time.perf_counter()
+        layers = [layer for layer in request.args.get('layers', '').split(',') if layer]
+        if not layers:
+            raise LayerQueryError("Debe indicar al menos una capa en 'layers'")
+        if len(layers) > FEATURE_INFO_CONFIG['max_layers']:
+            raise LayerQueryError(f"Se pueden consultar como máximo {FEATURE_INFO_CONFIG['max_layers']} capas")
+        
+        limit = request.args.get('limit', FEATURE_INFO_CONFIG['default_limit'], type=int)
+        if not 1 <= limit <= FEATURE_INFO_CONFIG['max_limit']:
+            raise LayerQueryError(f"'limit' debe estar entre 1 y {FEATURE_INFO_CONFIG['max_limit']}")
+        
+        bbox = parse_bbox(request.args.get('bbox'))
+        if bbox:
+            window, srid = bbox[:4], bbox[4]
+        else:
+            x = request.args.get('x', type=float)
+            y = request.args.get('y', type=float)
+            resolution = request.args.get('resolution', type=float)
+            if x is None or y is None or resolution is None or resolution <= 0:
+                raise LayerQueryError("Debe indicar x, y y resolution (o un bbox)")
+            tolerance = request.args.get('tolerance', FEATURE_INFO_CONFIG['tolerance'], type=float)
+            window = search_window(x, y, resolution, tolerance)
+            srid = request.args.get('srid', 3857, type=int)
+        
+        include_geometry = request.args.get('geometry', 'false').lower() == 'true'
+        zoom = request.args.get('zoom', type=int)
+        if zoom is None and not bbox and srid == 3857:
+            zoom = zoom_for_resolution(resolution)
+        results = query_layers(layers, window, srid, limit, include_geometry, zoom)
+        
+        return jsonify(format_response({
+            'layers': results,
+            'total_features': sum(len(result['features']) for result in results),
+            'took_ms': round((time.perf_counter() - start) * 1000, 1)
+        }, True, "Consulta de elementos completada"))
+    except LayerQueryError as e:
+        return jsonify(format_response(None, False, str(e))), 400
+    except Exception as e:
+        return jsonify(format_response(None, False, f"Error al consultar los elementos: {str(e)}")), 500
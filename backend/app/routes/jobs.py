@@ -0,0 +1,39 @@
+from flask import Blueprint, request, jsonify
+from ..utils import format_response
+from ..jobs import get_job, list_jobs
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """
+    Obtiene el estado de un trabajo de ingesta: etapa actual, duración
+    de cada etapa, registros importados y resultado final.
+    
+    Args:
+        job_id: Identificador devuelto por /api/upload-shapefile
+        
+    Returns:
+        JSON: Estado del trabajo
+    """
+    job = get_job(job_id)
+    if job is None:
+        return jsonify(format_response(None, False, f"Trabajo '{job_id}' no encontrado")), 404
+    
+    return jsonify(format_response(job, True, f"Estado del trabajo: {job['status']}"))
+
+@jobs_bp.route('/', methods=['GET'])
+def get_jobs():
+    """
+    Lista los trabajos de ingesta más recientes
+    
+    Returns:
+        JSON: Lista de trabajos
+    """
+    try:
+        limit = min(int(request.args.get('limit', 50)), 500)
+        return jsonify(format_response({"jobs": list_jobs(limit)}, True, "Lista de trabajos obtenida correctamente"))
+    except ValueError:
+        return jsonify(format_response(None, False, "Parámetro 'limit' inválido")), 400
+    except Exception as e:
+        return jsonify(format_response(None, False, f"Error al obtener la lista de trabajos: {str(e)}")), 500
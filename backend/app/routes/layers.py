@@ -1,15 +1,31 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 import os
+import json
+import uuid
+import fnmatch
 import psycopg2
-import requests
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor
 from ..utils import format_response
-from ..config import DB_CONFIG
+from ..database import get_connection
+from ..geoserver import get_geoserver_client
+from ..cache import invalidate_layer
+from ..loader import is_staging_table
+from ..manifest import forget_layers
+from ..generalize import style_name
+from ..catalog import get_catalog
+from ..postgis import (get_layer_info, generalized_column, parse_columns, parse_bbox, parse_filters,
+                       build_where, LayerQueryError)
+from ..export import EXPORT_FORMATS, COMPRESSED_FORMATS, export_layer, gzip_chunks
+from ..metrics import count_bytes
 
-# Configuración de GeoServer
-GEOSERVER_URL = "http://31.97.8.51:8082/geoserver"
-GEOSERVER_USER = "admin"
-GEOSERVER_PASSWORD = "geoserver"
-WORKSPACE = "sembrando"
+# Paginación de /<layer_name>/data
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 100000
+STREAM_CHUNK_SIZE = 2000  # Filas que el cursor del servidor envía en cada bloque
+
+# Máximo de capas por petición de borrado masivo
+MAX_BULK_DELETE = 1000
 
 layers_bp = Blueprint('layers', __name__)
 
@@ -34,6 +50,7 @@ def delete_layer(layer_name):
         
         # 2. Eliminar la tabla de PostGIS
         postgis_success = delete_from_postgis(layer_name)
+        invalidate_layer(layer_name)
         
         if geoserver_success and postgis_success:
             return jsonify(format_response(None, True, f"Capa '{layer_name}' eliminada correctamente de GeoServer y PostGIS"))
@@ -49,7 +66,8 @@ def delete_layer(layer_name):
 
 def delete_from_geoserver(layer_name):
     """
-    Elimina una capa de GeoServer usando su API REST
+    Elimina una capa de GeoServer usando su API REST, junto con su estilo por escalas
+    (app.generalize) si lo tiene
     
     Args:
         layer_name: Nombre de la capa a eliminar
@@ -58,26 +76,14 @@ def delete_from_geoserver(layer_name):
         bool: True si se eliminó correctamente, False en caso contrario
     """
     try:
-        # Headers comunes para las solicitudes
-        headers = {'Content-type': 'application/json'}
-        auth = (GEOSERVER_USER, GEOSERVER_PASSWORD)
-        
-        # 1. Eliminar la capa
-        layer_url = f"{GEOSERVER_URL}/rest/layers/{WORKSPACE}:{layer_name}"
-        layer_response = requests.delete(layer_url, auth=auth, headers=headers)
-        
-        # 2. Eliminar el featuretype
-        featuretype_url = f"{GEOSERVER_URL}/rest/workspaces/{WORKSPACE}/datastores/postgis_store/featuretypes/{layer_name}"
-        featuretype_response = requests.delete(featuretype_url, auth=auth, headers=headers)
-        
-        # Comprobar si las eliminaciones fueron exitosas (códigos 200 o 404 significan que ya no existe)
-        if (layer_response.status_code in [200, 204, 404] and 
-            featuretype_response.status_code in [200, 204, 404]):
+        # Una sola petición elimina el featuretype y su capa (recurse=true)
+        client = get_geoserver_client()
+        if client.delete_layer(layer_name):
             print(f"✅ Capa {layer_name} eliminada correctamente de GeoServer")
+            # El estilo del workspace no se elimina con la capa; 404 si la capa no lo tenía
+            client.delete_style(style_name(layer_name))
             return True
-        else:
-            print(f"❌ Error al eliminar capa de GeoServer: Layer: {layer_response.status_code}, Featuretype: {featuretype_response.status_code}")
-            return False
+        return False
             
     except Exception as e:
         print(f"❌ Excepción al eliminar de GeoServer: {str(e)}")
@@ -94,32 +100,13 @@ def delete_from_postgis(layer_name):
         bool: True si se eliminó correctamente, False en caso contrario
     """
     try:
-        # Importar directamente la configuración para evitar problemas de ruta
-        from app.config import DB_CONFIG
-        
-        # Conectar a la base de datos
-        conn = psycopg2.connect(
-            host=DB_CONFIG['host'],
-            port=DB_CONFIG['port'],
-            dbname=DB_CONFIG['dbname'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password']
-        )
-        
-        # Para depuración
-        print(f"Conectando a PostgreSQL con: host={DB_CONFIG['host']}, port={DB_CONFIG['port']}, dbname={DB_CONFIG['dbname']}, user={DB_CONFIG['user']}")
-        
-        # Crear un cursor y ejecutar la eliminación
-        with conn.cursor() as cursor:
-            # Usar parámetros para evitar SQL injection
-            sql = "DROP TABLE IF EXISTS %s"
-            # No podemos usar parámetros directos para nombres de tabla, debemos escaparlos manualmente
-            # Esto es seguro ya que layer_name ha sido validado anteriormente
-            table_name = psycopg2.extensions.AsIs(layer_name)
-            cursor.execute(sql, (table_name,))
-            conn.commit()
-            
-        conn.close()
+        # Obtener una conexión del pool compartido; el commit se hace al salir del bloque
+        with get_connection() as conn:
+            # Crear un cursor y ejecutar la eliminación
+            with conn.cursor() as cursor:
+                # No podemos usar parámetros directos para nombres de tabla, se escapan como identificador
+                cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(layer_name)))
+        
         print(f"✅ Tabla {layer_name} eliminada correctamente de PostgreSQL/PostGIS")
         return True
             
@@ -127,18 +114,315 @@ def delete_from_postgis(layer_name):
         print(f"❌ Error al eliminar tabla de PostgreSQL/PostGIS: {str(e)}")
         return False
 
+@layers_bp.route('/bulk-delete', methods=['POST'])
+def bulk_delete_layers():
+    """
+    Elimina varias capas en una sola petición, de PostGIS y de GeoServer.
+    Primero se eliminan las tablas con un único DROP TABLE dentro de una transacción
+    (o se eliminan todas o ninguna); solo después de confirmarla se eliminan las capas
+    de GeoServer con peticiones concurrentes, de modo que un fallo en PostGIS no deja
+    capas publicadas sin tabla ni tablas sin capa. Se descartan en una sola pasada las
+    teselas, estadísticas y demás resultados cacheados de cada capa.
+    
+    Cuerpo JSON:
+        layers: Lista de nombres de capa
+        pattern: Patrón de nombres con comodines (por ejemplo 'prueba_*'); se puede combinar con layers
+        dry_run: true para devolver las capas que se eliminarían sin eliminarlas
+        
+    Returns:
+        JSON: Capas eliminadas y resultado en PostGIS y GeoServer
+    """
+    payload = request.get_json(silent=True) or {}
+    names = payload.get('layers') or []
+    pattern = payload.get('pattern')
+    if not isinstance(names, list) or not all(isinstance(name, str) and name for name in names):
+        return jsonify(format_response(None, False, "'layers' debe ser una lista de nombres de capa")), 400
+    if not names and not pattern:
+        return jsonify(format_response(None, False, "Indique 'layers' o 'pattern'")), 400
+    
+    try:
+        existing = list_layer_tables()
+        selected = [name for name in dict.fromkeys(names) if name in existing]
+        not_found = [name for name in dict.fromkeys(names) if name not in existing]
+        if pattern:
+            selected += [name for name in sorted(existing) if fnmatch.fnmatchcase(name, pattern) and name not in selected]
+        if len(selected) > MAX_BULK_DELETE:
+            return jsonify(format_response(None, False, f"Se pueden eliminar como máximo {MAX_BULK_DELETE} capas por petición")), 400
+        if not selected:
+            return jsonify(format_response({'deleted': [], 'not_found': not_found}, False, "Ninguna capa coincide")), 404
+        if payload.get('dry_run'):
+            return jsonify(format_response({'layers': selected, 'not_found': not_found}, True,
+                                           f"Se eliminarían {len(selected)} capas"))
+        
+        # 1. Eliminar las tablas (todas o ninguna); si falla, GeoServer no se toca
+        try:
+            drop_tables(selected)
+        except Exception as e:
+            print(f"❌ Error al eliminar las tablas de PostgreSQL/PostGIS: {str(e)}")
+            data = {'deleted': [], 'not_found': not_found, 'postgis': False,
+                    'geoserver_deleted': [], 'geoserver_failed': []}
+            return jsonify(format_response(data, False, f"No se pudieron eliminar las tablas de PostGIS ({str(e)}); "
+                                                        f"no se eliminó ninguna capa")), 500
+        for name in selected:
+            invalidate_layer(name)
+        forget_layers(selected)
+        
+        # 2. Eliminar las capas y sus estilos de GeoServer con peticiones concurrentes
+        styles = {name: style_name(name) for name in selected}
+        try:
+            geoserver = get_geoserver_client().delete_layers(selected, styles)
+        except Exception as e:
+            # Las tablas ya no existen: se informa de las capas que quedan en GeoServer
+            print(f"❌ Error al eliminar las capas de GeoServer: {str(e)}")
+            geoserver = {}
+        
+        failed = [name for name in selected if not geoserver.get(name)]
+        data = {'deleted': selected, 'not_found': not_found, 'postgis': True,
+                'geoserver_deleted': [name for name in selected if geoserver.get(name)],
+                'geoserver_failed': failed}
+        if not failed:
+            return jsonify(format_response(data, True, f"{len(selected)} capas eliminadas de GeoServer y PostGIS"))
+        return jsonify(format_response(data, True, f"{len(selected)} capas eliminadas de PostGIS; "
+                                                   f"{len(failed)} no se pudieron eliminar de GeoServer"))
+    
+    except Exception as e:
+        return jsonify(format_response(None, False, f"Error al eliminar las capas: {str(e)}")), 500
+
+def list_layer_tables():
+    """
+    Tablas con geometría del esquema public, sin las tablas de preparación de las importaciones en curso
+    
+    Returns:
+        set: Nombres de las tablas
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT DISTINCT f_table_name FROM geometry_columns WHERE f_table_schema = 'public'")
+            return {row[0] for row in cursor.fetchall() if not is_staging_table(row[0])}
+
+def drop_tables(layer_names):
+    """
+    Elimina varias tablas con un solo DROP TABLE en una transacción
+    
+    Args:
+        layer_names: Nombres de las tablas a eliminar
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            # No esperar indefinidamente a que terminen las lecturas en curso
+            cursor.execute("SET LOCAL lock_timeout = '30s'")
+            cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(
+                sql.SQL(', ').join(sql.Identifier(name) for name in layer_names)
+            ))
+    print(f"✅ {len(layer_names)} tablas eliminadas de PostgreSQL/PostGIS")
+
 # Añadir una ruta para obtener la lista de capas
 @layers_bp.route('/', methods=['GET'])
 def get_layers():
     """
-    Obtiene la lista de capas disponibles
+    Obtiene la lista de capas disponibles desde el catálogo en memoria
+    (PostGIS + estado de publicación en GeoServer).
+    Responde 304 si el cliente envía un If-None-Match con el ETag vigente.
+    
+    Parámetros de consulta:
+        refresh: 'true' para recargar todas las capas desde PostGIS
     
     Returns:
         JSON: Lista de capas
     """
     try:
-        # Aquí se implementaría la lógica para obtener las capas
-        # Por ahora devuelve una lista vacía
-        return jsonify(format_response({"layers": []}, True, "Lista de capas obtenida correctamente"))
+        body, etag = get_catalog(force=request.args.get('refresh', 'false').lower() == 'true')
+        
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         return jsonify(format_response(None, False, f"Error al obtener la lista de capas: {str(e)}")), 500
+
+@layers_bp.route('/<layer_name>/data', methods=['GET'])
+def get_layer_data(layer_name):
+    """
+    Devuelve los registros de una capa con paginación por clave (keyset) y en streaming,
+    usando un cursor del lado del servidor para mantener constante la memoria.
+    
+    Parámetros de consulta:
+        columns: Columnas a devolver separadas por comas (todas por defecto)
+        limit: Registros por página (por defecto 100, máximo 100000)
+        after: Valor de la clave de la última fila de la página anterior
+        bbox: minx,miny,maxx,maxy[,srid] (srid 4326 por defecto)
+        filter: columna:operador:valor, se puede repetir (eq, ne, lt, lte, gt, gte, like, in, null, notnull)
+        geometry: 'true' para incluir la geometría como GeoJSON en EPSG:4326
+        zoom: Nivel de zoom del mapa; con geometry=true se devuelve la versión generalizada adecuada
+        format: 'json' (por defecto) o 'ndjson' (un registro por línea)
+        
+    Returns:
+        Response: JSON fragmentado o NDJSON con los registros de la página
+    """
+    try:
+        info = get_layer_info(layer_name)
+        if info is None:
+            return jsonify(format_response(None, False, f"La capa '{layer_name}' no existe")), 404
+        
+        columns = parse_columns(request.args.get('columns'), info)
+        bbox = parse_bbox(request.args.get('bbox'))
+        filters = parse_filters(request.args.getlist('filter'), info)
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            raise LayerQueryError(f"'limit' debe estar entre 1 y {MAX_PAGE_SIZE}")
+        output_format = request.args.get('format', 'json')
+        if output_format not in ('json', 'ndjson'):
+            raise LayerQueryError("'format' debe ser json o ndjson")
+        include_geometry = request.args.get('geometry', 'false').lower() == 'true'
+        after = request.args.get('after')
+        zoom = request.args.get('zoom', type=int)
+    except (LayerQueryError, ValueError) as e:
+        return jsonify(format_response(None, False, str(e))), 400
+    except Exception as e:
+        return jsonify(format_response(None, False, f"Error al consultar la capa: {str(e)}")), 500
+    
+    # Clave de paginación: la clave primaria o, si la tabla no tiene o es compuesta, el ctid
+    key_column = info['primary_key']
+    key_sql = sql.Identifier(key_column) if key_column else sql.SQL("ctid")
+    key_cast = sql.SQL("") if key_column else sql.SQL("::tid")
+    
+    select_list = [sql.SQL("{} AS _cursor").format(key_sql) if not key_column else key_sql]
+    select_list += [sql.Identifier(column) for column in columns if column != key_column]
+    if include_geometry and info['geometry_column']:
+        select_list.append(sql.SQL("ST_AsGeoJSON(ST_Transform({}, 4326), 6)::json AS geometry").format(
+            sql.Identifier(generalized_column(info, zoom))
+        ))
+    
+    conditions, params = build_where(info, bbox, filters)
+    if after is not None:
+        conditions.append(sql.SQL("{} > %s{}").format(key_sql, key_cast))
+        params.append(after)
+    
+    query = sql.SQL("SELECT {} FROM {} {} ORDER BY {} LIMIT %s").format(
+        sql.SQL(', ').join(select_list),
+        sql.Identifier(layer_name),
+        sql.SQL("WHERE ") + sql.SQL(" AND ").join(conditions) if conditions else sql.SQL(""),
+        key_sql
+    )
+    params.append(limit)
+    cursor_field = key_column or '_cursor'
+    
+    def generate_rows():
+        with get_connection() as conn:
+            # Cursor con nombre: PostgreSQL envía las filas por bloques en lugar de todas a la vez
+            with conn.cursor(name=f"layer_data_{uuid.uuid4().hex}", cursor_factory=RealDictCursor) as cursor:
+                cursor.itersize = STREAM_CHUNK_SIZE
+                cursor.execute(query, params)
+                for row in cursor:
+                    yield row
+    
+    # Ejecutar la consulta antes de enviar la cabecera 200: un 'after' o un filtro con un
+    # valor que no se puede convertir al tipo de su columna se responde con un 400
+    rows = generate_rows()
+    try:
+        first = next(rows, None)
+    except psycopg2.DataError as e:
+        return jsonify(format_response(None, False, f"Valor no válido para la consulta: {str(e).strip()}")), 400
+    except Exception as e:
+        return jsonify(format_response(None, False, f"Error al consultar la capa: {str(e)}")), 500
+    
+    def page_rows():
+        try:
+            if first is not None:
+                yield first
+                yield from rows
+        finally:
+            rows.close()
+    
+    def generate_ndjson():
+        for row in page_rows():
+            yield json.dumps(row, default=str, ensure_ascii=False) + '\n'
+    
+    def generate_json():
+        yield '{"success": true, "layer": %s, "key": %s, "data": [' % (json.dumps(layer_name), json.dumps(cursor_field))
+        count = 0
+        last_key = None
+        for row in page_rows():
+            yield (',' if count else '') + json.dumps(row, default=str, ensure_ascii=False)
+            count += 1
+            last_key = row[cursor_field]
+        next_cursor = last_key if count == limit else None
+        yield '], "count": %d, "next_cursor": %s}' % (count, json.dumps(next_cursor, default=str))
+    
+    if output_format == 'ndjson':
+        response = Response(stream_with_context(generate_ndjson()), mimetype='application/x-ndjson')
+    else:
+        response = Response(stream_with_context(generate_json()), mimetype='application/json')
+    response.headers['X-Cursor-Column'] = cursor_field
+    return response
+
+@layers_bp.route('/<layer_name>/export', methods=['GET'])
+def export_layer_data(layer_name):
+    """
+    Descarga una capa completa (o filtrada) en streaming desde PostGIS, sin pasar por WFS.
+    Las filas se leen con un cursor del lado del servidor y se envían por fragmentos
+    (transferencia chunked), así que la memoria usada no depende del tamaño de la capa.
+    
+    Parámetros de consulta:
+        format: geojson (por defecto), csv, parquet (GeoParquet) o fgb (FlatGeobuf)
+        columns: Columnas a exportar separadas por comas (todas por defecto)
+        bbox: minx,miny,maxx,maxy[,srid] (srid 4326 por defecto)
+        filter: columna:operador:valor, se puede repetir (igual que en /data)
+        gzip: 'false' para no comprimir aunque el cliente acepte gzip
+        
+    Returns:
+        Response: Archivo adjunto en el formato pedido, con geometrías en EPSG:4326
+    """
+    try:
+        info = get_layer_info(layer_name)
+        if info is None:
+            return jsonify(format_response(None, False, f"La capa '{layer_name}' no existe")), 404
+        
+        output_format = request.args.get('format', 'geojson')
+        if output_format not in EXPORT_FORMATS:
+            raise LayerQueryError(f"'format' debe ser uno de: {', '.join(EXPORT_FORMATS)}")
+        columns = parse_columns(request.args.get('columns'), info)
+        bbox = parse_bbox(request.args.get('bbox'))
+        filters = parse_filters(request.args.getlist('filter'), info)
+    except (LayerQueryError, ValueError) as e:
+        return jsonify(format_response(None, False, str(e))), 400
+    except Exception as e:
+        return jsonify(format_response(None, False, f"Error al exportar la capa: {str(e)}")), 500
+    
+    # Leer el primer bloque antes de enviar la cabecera 200, igual que en /data: un filtro con
+    # un valor que no se puede convertir al tipo de su columna se responde con un 400
+    pieces = export_layer(info, output_format, columns, bbox, filters)
+    try:
+        first = next(pieces, None)
+    except psycopg2.DataError as e:
+        return jsonify(format_response(None, False, f"Valor no válido para la consulta: {str(e).strip()}")), 400
+    except Exception as e:
+        return jsonify(format_response(None, False, f"Error al exportar la capa: {str(e)}")), 500
+    
+    def export_chunks():
+        try:
+            if first is not None:
+                yield first
+                yield from pieces
+        finally:
+            pieces.close()
+    
+    chunks = export_chunks()
+    use_gzip = (output_format not in COMPRESSED_FORMATS
+                and request.args.get('gzip', 'true').lower() != 'false'
+                and 'gzip' in request.accept_encodings)
+    if use_gzip:
+        chunks = gzip_chunks(chunks)
+    chunks = count_bytes(chunks, 'export')
+    
+    mimetype, extension = EXPORT_FORMATS[output_format]
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{layer_name}.{extension}"'
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['X-Accel-Buffering'] = 'no'  # Que un proxy nginx no acumule la respuesta
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
@@ -0,0 +1,15 @@
+from flask import Blueprint, Response
+from ..metrics import render, CONTENT_TYPE
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('', methods=['GET'])
+def get_metrics():
+    """
+    Métricas del proceso en el formato de texto de Prometheus
+    
+    Returns:
+        text/plain: Latencias por endpoint, etapas de importación, bytes procesados,
+                    pool de conexiones, cliente de GeoServer y caché de capas
+    """
+    return Response(render(), content_type=CONTENT_TYPE)
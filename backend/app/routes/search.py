@@ -0,0 +1,34 @@
+from flask import Blueprint, request, jsonify
+import time
+from ..utils import format_response
+from ..search import search, SearchError
+
+search_bp = Blueprint('search', __name__)
+
+@search_bp.route('/', methods=['GET'])
+def search_features():
+    """
+    Busca elementos por nombre en las capas publicadas usando índices de trigramas
+    
+    Parámetros de consulta:
+        q: Texto a buscar (coincidencia por subcadena o aproximada)
+        layers: Capas en las que buscar separadas por comas (todas por defecto)
+        limit: Máximo de resultados
+        
+    Returns:
+        JSON: Resultados ordenados por relevancia con capa, id, nombre y bbox (EPSG:4326)
+    """
+    try:
+        start = time.perf_counter()
+        layers = [layer for layer in request.args.get('layers', '').split(',') if layer]
+        results = search(request.args.get('q'), layers=layers or None,
+                         limit=request.args.get('limit', type=int))
+        return jsonify(format_response({
+            'results': results,
+            'count': len(results),
+            'took_ms': round((time.perf_counter() - start) * 1000, 1)
+        }, True, "Búsqueda completada"))
+    except SearchError as e:
+        return jsonify(format_response(None, False, str(e))), 400
+    except Exception as e:
+        return jsonify(format_response(None, False, f"Error en la búsqueda: {str(e)}")), 500
@@ -0,0 +1,119 @@
+from flask import Blueprint, request, jsonify
+import psycopg2
+from ..utils import format_response
+from ..postgis import get_layer_info, parse_columns, parse_bbox, parse_filters, build_where, LayerQueryError
+from ..stats import summarize_layer, aggregate_layer, parse_aggregates
+from ..cache import cached_for_layer
+from ..config import STATS_CONFIG
+
+stats_bp = Blueprint('stats', __name__)
+
+def _parse_common(layer_name):
+    """
+    Interpreta los parámetros comunes a los endpoints de estadísticas
+    (columnas, bbox, filtros y muestreo)
+
+    Returns:
+        tuple: (info de la capa, columnas, condiciones, parámetros, porcentaje de muestreo)
+    """
+    info = get_layer_info(layer_name)
+    if info is None:
+        return None, None, None, None, None
+
+    columns = parse_columns(request.args.get('columns'), info)
+    conditions, params = build_where(
+        info,
+        parse_bbox(request.args.get('bbox')),
+        parse_filters(request.args.getlist('filter'), info)
+    )
+    sample = request.args.get('sample', type=float)
+    if sample is not None and not 0 < sample <= 100:
+        raise LayerQueryError("'sample' debe ser un porcentaje entre 0 y 100")
+    return info, columns, conditions, params, sample
+
+def _cache_key(kind):
+    """Clave de caché a partir del tipo de consulta y de sus parámetros normalizados"""
+    return (kind,) + tuple(sorted((key, tuple(request.args.getlist(key))) for key in request.args))
+
+@stats_bp.route('/<layer_name>', methods=['GET'])
+def get_layer_stats(layer_name):
+    """
+    Resumen estadístico por columna de una capa completa
+    (conteo, nulos, mínimo/máximo, media, desviación, percentiles, histograma y valores más frecuentes)
+
+    Parámetros de consulta:
+        columns: Columnas a resumir separadas por comas (todas por defecto)
+        bins: Intervalos de los histogramas
+        top: Número de valores más frecuentes por columna de texto
+        bbox, filter: Mismo formato que /api/layers/<layer_name>/data
+        sample: Porcentaje de la tabla a muestrear para capas muy grandes
+
+    Returns:
+        JSON: Resumen de la capa
+    """
+    try:
+        info, columns, conditions, params, sample = _parse_common(layer_name)
+        if info is None:
+            return jsonify(format_response(None, False, f"La capa '{layer_name}' no existe")), 404
+
+        bins = request.args.get('bins', STATS_CONFIG['histogram_bins'], type=int)
+        top_k = request.args.get('top', STATS_CONFIG['top_k'], type=int)
+        if not 1 <= bins <= STATS_CONFIG['max_bins']:
+            raise LayerQueryError(f"'bins' debe estar entre 1 y {STATS_CONFIG['max_bins']}")
+        if not 1 <= top_k <= STATS_CONFIG['max_top_k']:
+            raise LayerQueryError(f"'top' debe estar entre 1 y {STATS_CONFIG['max_top_k']}")
+
+        summary, cached = cached_for_layer(
+            layer_name, _cache_key('summary'),
+            lambda: summarize_layer(info, columns, conditions, params, bins, top_k, sample)
+        )
+        response = jsonify(format_response(summary, True, "Estadísticas de la capa"))
+        response.headers['X-Cache'] = 'HIT' if cached else 'MISS'
+        return response
+    except LayerQueryError as e:
+        return jsonify(format_response(None, False, str(e))), 400
+    except psycopg2.DataError as e:
+        # Un filtro con un valor que no se puede convertir al tipo de su columna
+        return jsonify(format_response(None, False, f"Valor no válido para la consulta: {str(e).strip()}")), 400
+    except Exception as e:
+        return jsonify(format_response(None, False, f"Error al calcular las estadísticas: {str(e)}")), 500
+
+@stats_bp.route('/<layer_name>/aggregate', methods=['GET'])
+def get_layer_aggregate(layer_name):
+    """
+    Agregados por grupo sobre una capa
+
+    Parámetros de consulta:
+        group_by: Columnas de agrupación separadas por comas
+        agg: función[:columna], se puede repetir (count, sum, avg, min, max, stddev)
+        limit: Máximo de grupos devueltos
+        bbox, filter, sample: Igual que en el resumen
+
+    Returns:
+        JSON: Lista de grupos con sus agregados
+    """
+    try:
+        info, _, conditions, params, sample = _parse_common(layer_name)
+        if info is None:
+            return jsonify(format_response(None, False, f"La capa '{layer_name}' no existe")), 404
+
+        group_by = parse_columns(request.args.get('group_by'), info) if request.args.get('group_by') else []
+        aggregates = parse_aggregates(request.args.getlist('agg'), info)
+        limit = request.args.get('limit', STATS_CONFIG['max_groups'], type=int)
+        if not 1 <= limit <= STATS_CONFIG['max_groups']:
+            raise LayerQueryError(f"'limit' debe estar entre 1 y {STATS_CONFIG['max_groups']}")
+
+        groups, cached = cached_for_layer(
+            layer_name, _cache_key('aggregate'),
+            lambda: aggregate_layer(info, group_by, aggregates, conditions, params, limit, sample)
+        )
+        response = jsonify(format_response({'layer': layer_name, 'groups': groups}, True, "Agregados de la capa"))
+        response.headers['X-Cache'] = 'HIT' if cached else 'MISS'
+        return response
+    except LayerQueryError as e:
+        return jsonify(format_response(None, False, str(e))), 400
+    except psycopg2.DataError as e:
+        # Un filtro con un valor que no se puede convertir al tipo de su columna
+        return jsonify(format_response(None, False, f"Valor no válido para la consulta: {str(e).strip()}")), 400
+    except Exception as e:
+        return jsonify(format_response(None, False, f"Error al calcular los agregados: {str(e)}")), 500
@@ -0,0 +1,50 @@
+from flask import Blueprint, jsonify
+from ..utils import format_response
+from ..database import pool_status
+from ..geoserver import get_geoserver_client
+from ..cache import cache_stats
+from ..catalog import catalog_stats
+from ..tilecache import tile_cache_stats
+
+status_bp = Blueprint('status', __name__)
+
+@status_bp.route('/db', methods=['GET'])
+def get_db_pool_status():
+    """
+    Métricas del pool de conexiones a PostgreSQL/PostGIS
+    
+    Returns:
+        JSON: Conexiones en uso, libres, desbordamiento y contadores acumulados
+    """
+    try:
+        return jsonify(format_response(pool_status(), True, "Estado del pool de conexiones"))
+    except Exception as e:
+        return jsonify(format_response(None, False, f"Error al obtener el estado del pool: {str(e)}")), 500
+
+@status_bp.route('/geoserver', methods=['GET'])
+def get_geoserver_client_status():
+    """
+    Métricas del cliente REST de GeoServer
+    
+    Returns:
+        JSON: Peticiones realizadas, errores, tiempo acumulado y uso de la caché del catálogo
+    """
+    try:
+        return jsonify(format_response(get_geoserver_client().stats(), True, "Estado del cliente de GeoServer"))
+    except Exception as e:
+        return jsonify(format_response(None, False, f"Error al obtener el estado del cliente de GeoServer: {str(e)}")), 500
+
+@status_bp.route('/cache', methods=['GET'])
+def get_cache_status():
+    """
+    Métricas de la caché de resultados por capa, del índice del catálogo y de la caché de teselas
+    
+    Returns:
+        JSON: Entradas, aciertos, fallos, invalidaciones, estado del catálogo y de la caché de teselas
+    """
+    try:
+        return jsonify(format_response({'layers': cache_stats(), 'catalog': catalog_stats(),
+                                        'tiles': tile_cache_stats()}, True,
+                                       "Estado de las cachés de capas, catálogo y teselas"))
+    except Exception as e:
+        return jsonify(format_response(None, False, f"Error al obtener el estado de la caché: {str(e)}")), 500
@@ -0,0 +1,59 @@
+from flask import Blueprint, request, jsonify, Response
+from ..utils import format_response
+from ..postgis import get_layer_info_cached, parse_columns, LayerQueryError
+from ..tiles import build_tile, validate_tile, TileRequestError
+from ..cache import layer_version
+from ..tilecache import get_or_build_tile, columns_variant
+from ..config import TILES_CONFIG, TILE_CACHE_CONFIG
+
+MVT_MIMETYPE = 'application/vnd.mapbox-vector-tile'
+
+tiles_bp = Blueprint('tiles', __name__)
+
+@tiles_bp.route('/<layer_name>/<int:z>/<int:x>/<int:y>.pbf', methods=['GET'])
+def get_tile(layer_name, z, x, y):
+    """
+    Devuelve una tesela vectorial (MVT) de una capa generada con ST_AsMVT
+
+    Parámetros de consulta:
+        columns: Columnas de atributos a incluir separadas por comas
+                 (por defecto solo la clave primaria, para mantener las teselas ligeras)
+
+    Returns:
+        Response: Tesela MVT, 204 si la tesela está vacía
+    """
+    try:
+        validate_tile(z, x, y)
+
+        info = get_layer_info_cached(layer_name)
+        if info is None:
+            return jsonify(format_response(None, False, f"La capa '{layer_name}' no existe")), 404
+        if not info['geometry_column']:
+            return jsonify(format_response(None, False, f"La capa '{layer_name}' no tiene geometría")), 400
+
+        if request.args.get('columns'):
+            columns = parse_columns(request.args.get('columns'), info)
+        else:
+            columns = [info['primary_key']] if info['primary_key'] else []
+
+        # La versión de la tabla identifica el contenido de la tesela
+        version = layer_version(layer_name)
+        variant = columns_variant(columns)
+        etag = f"{'-'.join(str(part) for part in version or ())}-{variant}-{z}-{x}-{y}"
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            if TILE_CACHE_CONFIG['enabled']:
+                tile, cached = get_or_build_tile(layer_name, version, variant, z, x, y,
+                                                 lambda: build_tile(info, z, x, y, columns))
+            else:
+                tile, cached = build_tile(info, z, x, y, columns), False
+            response = Response(tile, status=200 if tile else 204, mimetype=MVT_MIMETYPE)
+            response.headers['X-Cache'] = 'HIT' if cached else 'MISS'
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = f"public, max-age={TILES_CONFIG['cache_max_age']}"
+        return response
+    except (TileRequestError, LayerQueryError) as e:
+        return jsonify(format_response(None, False, str(e))), 400
+    except Exception as e:
+        return jsonify(format_response(None, False, f"Error al generar la tesela: {str(e)}")), 500
@@ -0,0 +1,205 @@
+"""
+Búsqueda de elementos por nombre en las capas de PostGIS.
+Reemplaza las consultas WFS con CQL_FILTER ILIKE '%texto%' (que recorren la
+tabla completa y devuelven geometrías completas) por consultas apoyadas en
+índices GIN de trigramas (pg_trgm) sobre lower(columna). Así se resuelven con
+índice tanto las búsquedas por subcadena como las aproximadas (tolerantes a
+errores de escritura), y solo se devuelven id, nombre, puntuación y bbox.
+"""
+
+import threading
+import time
+from psycopg2 import sql
+from app.cache import subscribe
+from app.config import SEARCH_CONFIG
+from app.database import get_connection
+from app.loader import derived_name, is_staging_table
+
+_lock = threading.Lock()
+_targets = {'loaded_at': 0.0, 'items': None}
+
+
+class SearchError(ValueError):
+    """Parámetros de búsqueda inválidos (se responde con 400)"""
+
+
+def _reset_targets(layer_name=None):
+    """Suscriptor de app.cache: las columnas buscables se recalculan en la siguiente búsqueda"""
+    with _lock:
+        _targets['items'] = None
+
+
+subscribe(_reset_targets)
+
+
+def search_targets():
+    """
+    Capas y columnas de nombre sobre las que se busca.
+    Son las columnas de texto cuyo nombre está en SEARCH_CONFIG['name_columns'],
+    en tablas con geometría; se obtienen con una sola consulta al catálogo y se
+    reutilizan durante SEARCH_CONFIG['targets_ttl'] segundos.
+
+    Returns:
+        list: Tuplas (capa, columna de nombre, columna de geometría, SRID, clave primaria)
+    """
+    with _lock:
+        if _targets['items'] is not None and time.monotonic() - _targets['loaded_at'] < SEARCH_CONFIG['targets_ttl']:
+            return _targets['items']
+
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT col.table_name, col.column_name, g.f_geometry_column, g.srid,
+                       (SELECT a.attname
+                        FROM pg_index i
+                        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+                        WHERE i.indrelid = format('%%I.%%I', col.table_schema, col.table_name)::regclass
+                          AND i.indisprimary) AS primary_key
+                FROM information_schema.columns col
+                JOIN geometry_columns g ON g.f_table_schema = col.table_schema AND g.f_table_name = col.table_name
+                WHERE col.table_schema = 'public'
+                  AND col.column_name::text = ANY(%s)
+                  AND col.data_type IN ('text', 'character varying', 'character')
+                ORDER BY col.table_name, array_position(%s, col.column_name::text), g.f_geometry_column
+            """, (SEARCH_CONFIG['name_columns'], SEARCH_CONFIG['name_columns']))
+            rows = cursor.fetchall()
+
+    # Una sola columna de nombre por capa: la de mayor prioridad en la configuración
+    items = []
+    seen = set()
+    for table, column, geometry_column, srid, primary_key in rows:
+        if table not in seen and not is_staging_table(table):
+            seen.add(table)
+            items.append((table, column, geometry_column, srid or 4326, primary_key))
+
+    with _lock:
+        _targets['items'] = items
+        _targets['loaded_at'] = time.monotonic()
+    return items
+
+
+def create_search_indexes(table_name):
+    """
+    Crea los índices de trigramas sobre las columnas de nombre de una tabla.
+    Se llama tras importar una capa; si pg_trgm no está disponible la búsqueda
+    sigue funcionando, pero sin índice.
+
+    Args:
+        table_name: Nombre de la tabla importada
+
+    Returns:
+        list: Columnas indexadas
+    """
+    indexed = []
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                cursor.execute("""
+                    SELECT column_name FROM information_schema.columns
+                    WHERE table_schema = 'public' AND table_name = %s
+                      AND column_name::text = ANY(%s)
+                      AND data_type IN ('text', 'character varying', 'character')
+                """, (table_name, SEARCH_CONFIG['name_columns']))
+                for (column,) in cursor.fetchall():
+                    cursor.execute(sql.SQL(
+                        "CREATE INDEX IF NOT EXISTS {} ON {} USING GIN (lower({}) gin_trgm_ops)"
+                    ).format(
+                        sql.Identifier(derived_name(table_name, f"_{column}_trgm_idx")),
+                        sql.Identifier(table_name),
+                        sql.Identifier(column)
+                    ))
+                    indexed.append(column)
+        if indexed:
+            print(f"✅ Índices de búsqueda creados en {table_name}: {', '.join(indexed)}")
+    except Exception as e:
+        print(f"⚠️ No se pudieron crear los índices de búsqueda en {table_name}: {str(e)}")
+    return indexed
+
+
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search(query, layers=None, limit=None):
+    """
+    Busca elementos por nombre en todas las capas con columnas de nombre
+
+    Args:
+        query: Texto a buscar (se ignoran mayúsculas y minúsculas)
+        layers: Restringir la búsqueda a estas capas (todas por defecto)
+        limit: Máximo de resultados
+
+    Returns:
+        list: Resultados ordenados por relevancia {layer, id, name, score, bbox}
+    """
+    text = (query or '').strip().lower()
+    if len(text) < SEARCH_CONFIG['min_length']:
+        raise SearchError(f"La búsqueda debe tener al menos {SEARCH_CONFIG['min_length']} caracteres")
+    limit = limit or SEARCH_CONFIG['default_limit']
+    if not 1 <= limit <= SEARCH_CONFIG['max_limit']:
+        raise SearchError(f"'limit' debe estar entre 1 y {SEARCH_CONFIG['max_limit']}")
+
+    targets = search_targets()
+    if layers:
+        targets = [target for target in targets if target[0] in layers]
+    if not targets:
+        return []
+
+    # Una subconsulta por capa, todas en un único UNION ALL (un solo viaje a la base de datos).
+    # Coincidencia por subcadena (LIKE) o aproximada (operador % de pg_trgm); ambas usan el índice GIN.
+    parts = []
+    for table, column, geometry_column, srid, primary_key in targets:
+        name = sql.SQL("lower({})").format(sql.Identifier(column))
+        parts.append(sql.SQL("""
+            (SELECT {layer} AS layer,
+                    {key}::text AS id,
+                    {column} AS name,
+                    similarity({name}, %(text)s) + CASE WHEN {name} LIKE %(prefix)s THEN 1 ELSE 0 END AS score,
+                    ST_Transform(ST_Envelope({geometry}), 4326) AS box
+             FROM {table}
+             WHERE {name} LIKE %(contains)s OR {name} %% %(text)s
+             ORDER BY score DESC
+             LIMIT %(limit)s)
+        """).format(
+            layer=sql.Literal(table),
+            key=sql.Identifier(primary_key) if primary_key else sql.SQL("ctid"),
+            column=sql.Identifier(column),
+            name=name,
+            geometry=sql.Identifier(geometry_column),
+            table=sql.Identifier(table)
+        ))
+
+    statement = sql.SQL("""
+        SELECT layer, id, name, score, ST_XMin(box), ST_YMin(box), ST_XMax(box), ST_YMax(box)
+        FROM ({}) AS results
+        ORDER BY score DESC, name
+        LIMIT %(limit)s
+    """).format(sql.SQL(" UNION ALL ").join(parts))
+
+    escaped = _escape_like(text)
+    params = {
+        'text': text,
+        'prefix': f"{escaped}%",
+        'contains': f"%{escaped}%",
+        'limit': limit
+    }
+
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            # Umbral de similitud de pg_trgm solo para esta transacción
+            cursor.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)",
+                           (str(SEARCH_CONFIG['similarity_threshold']),))
+            cursor.execute(statement, params)
+            rows = cursor.fetchall()
+
+    return [
+        {
+            'layer': layer,
+            'id': feature_id,
+            'name': name,
+            'score': round(float(score), 3),
+            'bbox': [minx, miny, maxx, maxy] if minx is not None else None
+        }
+        for layer, feature_id, name, score, minx, miny, maxx, maxy in rows
+    ]
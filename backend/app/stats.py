@@ -0,0 +1,280 @@
+"""
+Estadísticas y agregaciones de las capas calculadas en PostgreSQL.
+En lugar de enviar todos los registros al navegador para analizarlos allí,
+cada resumen (conteos, mínimos/máximos, media, percentiles, histogramas,
+valores más frecuentes y agregados por grupo) se resuelve con SQL sobre la
+capa completa y solo viaja el resultado.
+"""
+
+import re
+from psycopg2 import sql
+from app.config import STATS_CONFIG
+from app.database import get_connection
+from app.postgis import LayerQueryError, json_value
+
+_NUMERIC_TYPE_RE = re.compile(r'^(smallint|integer|bigint|real|double precision|numeric.*)$')
+_TEMPORAL_TYPE_RE = re.compile(r'^(date|timestamp.*|time.*)$')
+
+# Funciones de agregación admitidas en /aggregate (función:columna)
+AGGREGATE_FUNCTIONS = {
+    'count': 'count',
+    'sum': 'sum',
+    'avg': 'avg',
+    'min': 'min',
+    'max': 'max',
+    'stddev': 'stddev_samp'
+}
+
+PERCENTILES = (0.25, 0.5, 0.75)
+
+
+def column_kind(column_type):
+    """
+    Clasifica un tipo de PostgreSQL para decidir qué estadísticas calcular
+
+    Args:
+        column_type: Tipo tal como lo devuelve format_type (por ejemplo 'double precision')
+
+    Returns:
+        str: 'numeric', 'temporal', 'boolean' o 'text'
+    """
+    if _NUMERIC_TYPE_RE.match(column_type):
+        return 'numeric'
+    if _TEMPORAL_TYPE_RE.match(column_type):
+        return 'temporal'
+    if column_type == 'boolean':
+        return 'boolean'
+    return 'text'
+
+
+def _source(info, sample):
+    """Tabla de origen, opcionalmente muestreada por bloques (TABLESAMPLE SYSTEM)"""
+    table = sql.Identifier(info['name'])
+    if sample:
+        return sql.SQL("{} TABLESAMPLE SYSTEM ({})").format(table, sql.Literal(float(sample)))
+    return table
+
+
+def _where(conditions):
+    if not conditions:
+        return sql.SQL("")
+    return sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions)
+
+
+def summarize_layer(info, columns, conditions=None, params=None, bins=None, top_k=None, sample=None):
+    """
+    Resumen estadístico de las columnas de una capa.
+    Todas las medidas básicas se calculan en un único recorrido de la tabla;
+    los histogramas y los valores más frecuentes requieren una consulta por columna.
+
+    Args:
+        info: Descripción de la capa (app.postgis.get_layer_info)
+        columns: Columnas a resumir
+        conditions, params: Filtros de app.postgis.build_where
+        bins: Intervalos de los histogramas numéricos
+        top_k: Número de valores más frecuentes por columna de texto
+        sample: Porcentaje de la tabla a muestrear (None para la tabla completa)
+
+    Returns:
+        dict: Número de registros y resumen por columna
+    """
+    bins = bins or STATS_CONFIG['histogram_bins']
+    top_k = top_k or STATS_CONFIG['top_k']
+    conditions = conditions or []
+    params = params or []
+    types = {column['name']: column['type'] for column in info['columns']}
+
+    # 1. Medidas básicas de todas las columnas en una sola consulta
+    select_list = [sql.SQL("count(*)")]
+    layout = []
+    for column in columns:
+        kind = column_kind(types[column])
+        identifier = sql.Identifier(column)
+        if kind == 'numeric':
+            select_list += [
+                sql.SQL("count({})").format(identifier),
+                sql.SQL("min({})").format(identifier),
+                sql.SQL("max({})").format(identifier),
+                sql.SQL("avg({})").format(identifier),
+                sql.SQL("stddev_samp({})").format(identifier),
+                sql.SQL("percentile_cont({}) WITHIN GROUP (ORDER BY {})").format(
+                    sql.Literal(list(PERCENTILES)), identifier
+                )
+            ]
+            layout.append((column, kind, ['count', 'min', 'max', 'mean', 'stddev', 'percentiles']))
+        elif kind == 'temporal':
+            select_list += [
+                sql.SQL("count({})").format(identifier),
+                sql.SQL("min({})").format(identifier),
+                sql.SQL("max({})").format(identifier)
+            ]
+            layout.append((column, kind, ['count', 'min', 'max']))
+        else:
+            select_list += [
+                sql.SQL("count({})").format(identifier),
+                sql.SQL("count(DISTINCT {})").format(identifier)
+            ]
+            layout.append((column, kind, ['count', 'distinct']))
+
+    query = sql.SQL("SELECT {} FROM {}{}").format(
+        sql.SQL(', ').join(select_list), _source(info, sample), _where(conditions)
+    )
+
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            row = list(cursor.fetchone())
+
+            total = row.pop(0)
+            summary = {}
+            for column, kind, fields in layout:
+                values = [row.pop(0) for _ in fields]
+                stats = {'type': types[column], 'kind': kind}
+                for field, value in zip(fields, values):
+                    if field == 'percentiles':
+                        stats['percentiles'] = {
+                            f"p{int(p * 100)}": json_value(v) for p, v in zip(PERCENTILES, value or [None] * len(PERCENTILES))
+                        }
+                    else:
+                        stats[field] = json_value(value)
+                stats['nulls'] = total - stats['count']
+                summary[column] = stats
+
+            # 2. Histogramas (numéricas) y valores más frecuentes (texto y booleanas)
+            for column, kind, _ in layout:
+                stats = summary[column]
+                if kind == 'numeric' and stats['count']:
+                    stats['histogram'] = _histogram(
+                        cursor, info, column, stats['min'], stats['max'], stats['count'], bins, conditions, params, sample
+                    )
+                elif kind in ('text', 'boolean') and stats['count']:
+                    stats['top'] = _top_values(cursor, info, column, top_k, conditions, params, sample)
+
+    return {
+        'layer': info['name'],
+        'rows': total,
+        'sample_percent': sample,
+        'columns': summary
+    }
+
+
+def _histogram(cursor, info, column, minimum, maximum, count, bins, conditions, params, sample):
+    """
+    Histograma de una columna numérica con width_bucket
+
+    Returns:
+        list: Intervalos {from, to, count}
+    """
+    # Todos los valores iguales: un único intervalo con todos los valores no nulos
+    if minimum == maximum:
+        return [{'from': minimum, 'to': maximum, 'count': count}]
+
+    # width_bucket asigna el máximo al intervalo bins + 1; se agrega al último
+    conditions = conditions + [sql.SQL("{} IS NOT NULL").format(sql.Identifier(column))]
+    query = sql.SQL("""
+        SELECT LEAST(width_bucket({col}::double precision, %s, %s, %s), %s) AS bucket, count(*)
+        FROM {source}{where}
+        GROUP BY bucket
+        ORDER BY bucket
+    """).format(col=sql.Identifier(column), source=_source(info, sample), where=_where(conditions))
+    cursor.execute(query, [minimum, maximum, bins, bins] + params)
+    counts = dict(cursor.fetchall())
+
+    width = (maximum - minimum) / bins
+    histogram = []
+    for bucket in range(1, bins + 1):
+        histogram.append({
+            'from': minimum + (bucket - 1) * width,
+            'to': minimum + bucket * width,
+            'count': counts.get(bucket, 0)
+        })
+    return histogram
+
+
+def _top_values(cursor, info, column, top_k, conditions, params, sample):
+    """
+    Valores más frecuentes de una columna
+
+    Returns:
+        list: Pares {value, count} ordenados por frecuencia
+    """
+    conditions = conditions + [sql.SQL("{} IS NOT NULL").format(sql.Identifier(column))]
+    query = sql.SQL("""
+        SELECT {col} AS value, count(*) AS total
+        FROM {source}{where}
+        GROUP BY {col}
+        ORDER BY total DESC, value
+        LIMIT %s
+    """).format(col=sql.Identifier(column), source=_source(info, sample), where=_where(conditions))
+    cursor.execute(query, params + [top_k])
+    return [{'value': json_value(value), 'count': count} for value, count in cursor.fetchall()]
+
+
+def parse_aggregates(values, info):
+    """
+    Interpreta las agregaciones solicitadas con el formato función[:columna]
+    (por ejemplo count, sum:poblacion, avg:area)
+
+    Returns:
+        list: Tuplas (función SQL, columna o None, alias)
+    """
+    available = {column['name']: column['type'] for column in info['columns']}
+    aggregates = []
+    for raw in values or ['count']:
+        function, _, column = raw.partition(':')
+        function = function.lower()
+        if function not in AGGREGATE_FUNCTIONS:
+            raise LayerQueryError(f"Función de agregación desconocida: {function}")
+        if column:
+            if column not in available:
+                raise LayerQueryError(f"Columna desconocida en la agregación: {column}")
+            if function in ('sum', 'avg', 'stddev') and column_kind(available[column]) != 'numeric':
+                raise LayerQueryError(f"La función {function} requiere una columna numérica ({column})")
+        elif function != 'count':
+            raise LayerQueryError(f"La función {function} requiere una columna")
+        aggregates.append((AGGREGATE_FUNCTIONS[function], column or None, f"{function}_{column}" if column else function))
+    return aggregates
+
+
+def aggregate_layer(info, group_by, aggregates, conditions=None, params=None, limit=None, sample=None):
+    """
+    Agregados por grupo (GROUP BY) sobre una capa
+
+    Args:
+        info: Descripción de la capa (app.postgis.get_layer_info)
+        group_by: Columnas de agrupación (puede estar vacía para un total general)
+        aggregates: Resultado de parse_aggregates
+        conditions, params: Filtros de app.postgis.build_where
+        limit: Máximo de grupos devueltos (ordenados por el primer agregado, de mayor a menor)
+        sample: Porcentaje de la tabla a muestrear
+
+    Returns:
+        list: Un diccionario por grupo con las columnas de agrupación y los agregados
+    """
+    limit = limit or STATS_CONFIG['max_groups']
+    conditions = conditions or []
+    params = params or []
+
+    select_list = [sql.Identifier(column) for column in group_by]
+    for function, column, alias in aggregates:
+        argument = sql.Identifier(column) if column else sql.SQL("*")
+        select_list.append(sql.SQL("{}({}) AS {}").format(sql.SQL(function), argument, sql.Identifier(alias)))
+
+    query = sql.SQL("SELECT {} FROM {}{}").format(
+        sql.SQL(', ').join(select_list), _source(info, sample), _where(conditions)
+    )
+    if group_by:
+        query += sql.SQL(" GROUP BY {} ORDER BY {} DESC NULLS LAST LIMIT %s").format(
+            sql.SQL(', ').join(sql.Identifier(column) for column in group_by),
+            sql.Identifier(aggregates[0][2])
+        )
+        params = params + [limit]
+
+    names = list(group_by) + [alias for _, _, alias in aggregates]
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            return [
+                {name: json_value(value) for name, value in zip(names, row)}
+                for row in cursor.fetchall()
+            ]
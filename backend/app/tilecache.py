@@ -0,0 +1,296 @@
+"""
+Caché en disco de teselas vectoriales (MVT).
+Las teselas se guardan en un árbol de archivos:
+
+    <carpeta>/<capa>/<versión de la tabla>/<variante de columnas>/<z>/<x>/<y>.pbf
+
+La versión de la tabla (app.cache.layer_version) forma parte de la ruta, de modo
+que una capa reimportada nunca sirve teselas antiguas, ni siquiera en procesos
+que no recibieron la invalidación. Al subir o eliminar una capa se borran todas
+sus teselas, y cuando la caché supera el tamaño configurado se eliminan las
+teselas usadas hace más tiempo (LRU según la fecha de modificación, que se
+actualiza en cada acierto).
+
+El tamaño ocupado se lleva en un contador que se actualiza en cada escritura; el
+árbol solo se recorre en un hilo en segundo plano, una vez al arrancar para
+conocer el tamaño inicial y cada vez que el contador supera el máximo.
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.cache import subscribe, layer_version
+from app.config import TILE_CACHE_CONFIG
+from app.tiles import build_tile, tiles_for_bbox, layer_extent
+
+TILE_CACHE_FOLDER = os.path.join(os.getcwd(), TILE_CACHE_CONFIG['folder'])
+
+_lock = threading.Lock()
+_evict_lock = threading.Lock()
+_state = {
+    'size': None,        # Bytes ocupados (se calcula en segundo plano al primer uso)
+    'hits': 0,
+    'misses': 0,
+    'evicted': 0,
+    'purged_layers': 0
+}
+
+
+def _is_safe_name(layer_name):
+    """Evita que un nombre de capa recibido en la URL salga de la carpeta de la caché"""
+    return bool(layer_name) and layer_name not in ('.', '..') and os.path.basename(layer_name) == layer_name
+
+
+def _version_key(version):
+    return '_'.join(str(part) for part in version) if version else 'none'
+
+
+def columns_variant(columns):
+    """
+    Identificador corto del conjunto de columnas de una tesela
+
+    Args:
+        columns: Columnas de atributos incluidas en la tesela
+
+    Returns:
+        str: Hash de 12 caracteres
+    """
+    return hashlib.sha1(','.join(columns).encode('utf-8')).hexdigest()[:12]
+
+
+def _tile_path(layer_name, version, variant, z, x, y):
+    if not _is_safe_name(layer_name):
+        raise ValueError(f"Nombre de capa inválido para la caché de teselas: {layer_name}")
+    return os.path.join(TILE_CACHE_FOLDER, layer_name, _version_key(version), variant,
+                        str(z), str(x), f"{y}.pbf")
+
+
+def _folder_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def get_cached_tile(layer_name, version, variant, z, x, y):
+    """
+    Lee una tesela de la caché
+
+    Returns:
+        bytes: Contenido de la tesela (b'' para teselas vacías) o None si no está en caché
+    """
+    path = _tile_path(layer_name, version, variant, z, x, y)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        os.utime(path)  # Marca de uso para la expulsión LRU
+    except OSError:
+        with _lock:
+            _state['misses'] += 1
+        return None
+
+    with _lock:
+        _state['hits'] += 1
+    return data
+
+
+def store_tile(layer_name, version, variant, z, x, y, data):
+    """
+    Guarda una tesela en la caché de forma atómica.
+    Las teselas vacías también se guardan (archivo de 0 bytes) para no volver a consultarlas.
+    """
+    path = _tile_path(layer_name, version, variant, z, x, y)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+    with _lock:
+        known = _state['size'] is not None
+        if known:
+            _state['size'] += len(data)
+        over_limit = known and _state['size'] > TILE_CACHE_CONFIG['max_size_mb'] * 1024 * 1024
+    if not known or over_limit:
+        schedule_evict()
+
+
+def get_or_build_tile(layer_name, version, variant, z, x, y, builder):
+    """
+    Devuelve una tesela de la caché o la genera con builder() y la guarda
+
+    Args:
+        layer_name: Nombre de la capa
+        version: Versión de la tabla (app.cache.layer_version)
+        variant: Variante de columnas (columns_variant)
+        z, x, y: Coordenadas de la tesela
+        builder: Función sin argumentos que genera la tesela
+
+    Returns:
+        tuple: (bytes de la tesela, True si vino de la caché)
+    """
+    data = get_cached_tile(layer_name, version, variant, z, x, y)
+    if data is not None:
+        return data, True
+
+    data = builder()
+    try:
+        store_tile(layer_name, version, variant, z, x, y, data)
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar la tesela {layer_name}/{z}/{x}/{y} en la caché: {str(e)}")
+    return data, False
+
+
+def schedule_evict():
+    """
+    Lanza evict() en un hilo en segundo plano, salvo que ya haya un recorrido en curso
+    """
+    if not _evict_lock.acquire(blocking=False):
+        return  # Otro recorrido ya está en curso
+
+    def run():
+        try:
+            evict()
+        except Exception as e:
+            print(f"⚠️ Error al expulsar teselas de la caché: {str(e)}")
+        finally:
+            _evict_lock.release()
+
+    threading.Thread(target=run, name='geoportal-tile-evict', daemon=True).start()
+
+
+def evict():
+    """
+    Recorre la caché y elimina las teselas usadas hace más tiempo hasta dejarla por debajo
+    de TILE_CACHE_CONFIG['evict_to'] veces el tamaño máximo. Si aún no se conocía el tamaño
+    ocupado, lo calcula. Se ejecuta en segundo plano con _evict_lock adquirido (schedule_evict).
+    """
+    with _lock:
+        counted = _state['size']
+    files = []
+    for root, _, names in os.walk(TILE_CACHE_FOLDER):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    target = TILE_CACHE_CONFIG['max_size_mb'] * 1024 * 1024 * TILE_CACHE_CONFIG['evict_to']
+    removed = 0
+    removed_bytes = 0
+    for _, size, path in sorted(files):
+        if total - removed_bytes <= target:
+            break
+        try:
+            os.remove(path)
+            removed_bytes += size
+            removed += 1
+        except OSError:
+            pass
+
+    with _lock:
+        # El contador se ajusta al tamaño medido, más lo escrito mientras duraba el recorrido
+        written = _state['size'] - counted if counted is not None and _state['size'] is not None else 0
+        _state['size'] = max(total - removed_bytes + written, 0)
+        _state['evicted'] += removed
+        size = _state['size']
+    if removed:
+        print(f"🧹 Caché de teselas: {removed} teselas expulsadas ({size / 1024 / 1024:.1f} MB en uso)")
+
+
+def purge_layer(layer_name):
+    """
+    Elimina todas las teselas cacheadas de una capa (todas sus versiones).
+    Se registra como suscriptor de app.cache, por lo que se ejecuta al subir o eliminar la capa.
+
+    Args:
+        layer_name: Nombre de la capa
+    """
+    if not _is_safe_name(layer_name):
+        return
+    path = os.path.join(TILE_CACHE_FOLDER, layer_name)
+    if not os.path.isdir(path):
+        return
+    size = _folder_size(path)
+    shutil.rmtree(path, ignore_errors=True)
+    with _lock:
+        if _state['size'] is not None:
+            _state['size'] = max(_state['size'] - size, 0)
+        _state['purged_layers'] += 1
+    print(f"🧹 Teselas de la capa {layer_name} eliminadas de la caché")
+
+
+subscribe(purge_layer)
+
+
+def seed_layer(info, min_zoom, max_zoom, columns, bbox=None, workers=4):
+    """
+    Genera por adelantado las teselas de una capa para un rango de zooms.
+    Las teselas que ya están en la caché para la versión actual se omiten.
+
+    Args:
+        info: Descripción de la capa (app.postgis.get_layer_info)
+        min_zoom, max_zoom: Rango de zooms (incluidos)
+        columns: Columnas de atributos de las teselas
+        bbox: (minx, miny, maxx, maxy) en EPSG:4326; por defecto la extensión de la capa
+        workers: Teselas que se generan a la vez (cada una usa una conexión del pool)
+
+    Returns:
+        dict: Teselas generadas, ya cacheadas y vacías por zoom, y duración total
+    """
+    layer_name = info['name']
+    bbox = bbox or layer_extent(info)
+    report = {'layer': layer_name, 'bbox': bbox, 'zooms': {}, 'duration': None}
+    if bbox is None:
+        return report
+
+    version = layer_version(layer_name)
+    variant = columns_variant(columns)
+    start = time.perf_counter()
+
+    def seed_tile(z, x, y):
+        data, cached = get_or_build_tile(layer_name, version, variant, z, x, y,
+                                         lambda: build_tile(info, z, x, y, columns))
+        return 'cached' if cached else ('built' if data else 'empty')
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for z in range(min_zoom, max_zoom + 1):
+            x0, y0, x1, y1 = tiles_for_bbox(bbox, z)
+            futures = [executor.submit(seed_tile, z, x, y)
+                       for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+            counts = {'built': 0, 'cached': 0, 'empty': 0}
+            for future in futures:
+                counts[future.result()] += 1
+            report['zooms'][z] = counts
+            print(f"📍 Zoom {z}: {len(futures)} teselas ({counts['built']} generadas, "
+                  f"{counts['cached']} ya en caché, {counts['empty']} vacías)")
+
+    report['duration'] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def tile_cache_stats():
+    """
+    Estado de la caché de teselas
+
+    Returns:
+        dict: Tamaño ocupado, límite, aciertos, fallos y expulsiones
+    """
+    with _lock:
+        size = _state['size']
+        stats = {key: value for key, value in _state.items() if key != 'size'}
+    if size is None:
+        schedule_evict()  # Calcular el tamaño en segundo plano
+    stats['size_mb'] = round(size / 1024 / 1024, 2) if size is not None else None
+    stats['max_size_mb'] = TILE_CACHE_CONFIG['max_size_mb']
+    return stats
@@ -0,0 +1,153 @@
+"""
+Generación de teselas vectoriales Mapbox (MVT) directamente desde PostGIS.
+Cada tesela se construye con ST_AsMVT/ST_AsMVTGeom sobre la tabla de la capa,
+filtrando por el índice GiST con la envolvente de la tesela, simplificando
+las geometrías según el zoom y enviando solo las columnas solicitadas.
+"""
+
+import math
+from psycopg2 import sql
+from app.config import TILES_CONFIG
+from app.database import get_connection
+from app.postgis import generalized_column
+
+# Ancho del mundo en EPSG:3857 (metros)
+WEB_MERCATOR_WIDTH = 2 * 20037508.342789244
+
+
+class TileRequestError(ValueError):
+    """Coordenadas de tesela inválidas (se responde con 400)"""
+
+
+def validate_tile(z, x, y):
+    """
+    Comprueba que z/x/y sean coordenadas válidas del esquema XYZ
+
+    Raises:
+        TileRequestError: Si el zoom o las coordenadas están fuera de rango
+    """
+    if not 0 <= z <= TILES_CONFIG['max_zoom']:
+        raise TileRequestError(f"El zoom debe estar entre 0 y {TILES_CONFIG['max_zoom']}")
+    limit = 2 ** z
+    if not (0 <= x < limit and 0 <= y < limit):
+        raise TileRequestError(f"Coordenadas de tesela fuera de rango para el zoom {z}")
+
+
+def tiles_for_bbox(bbox, z):
+    """
+    Rango de teselas XYZ que cubren un bbox en EPSG:4326
+
+    Args:
+        bbox: (minx, miny, maxx, maxy) en grados
+        z: Nivel de zoom
+
+    Returns:
+        tuple: (x mínimo, y mínimo, x máximo, y máximo), extremos incluidos
+    """
+    def tile_xy(lon, lat):
+        lat = max(min(lat, 85.0511287798), -85.0511287798)
+        n = 2 ** z
+        x = int((lon + 180.0) / 360.0 * n)
+        y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+        return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+    minx, miny, maxx, maxy = bbox
+    x0, y0 = tile_xy(minx, maxy)  # Esquina superior izquierda
+    x1, y1 = tile_xy(maxx, miny)  # Esquina inferior derecha
+    return x0, y0, x1, y1
+
+
+def layer_extent(info):
+    """
+    Extensión real de una capa en EPSG:4326
+
+    Returns:
+        tuple: (minx, miny, maxx, maxy) o None si la capa está vacía
+    """
+    query = sql.SQL("""
+        SELECT ST_XMin(e), ST_YMin(e), ST_XMax(e), ST_YMax(e)
+        FROM (SELECT ST_Transform(ST_SetSRID(ST_Extent({geometry}), %s), 4326) AS e FROM {table}) AS extent
+    """).format(geometry=sql.Identifier(info['geometry_column']), table=sql.Identifier(info['name']))
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, (info['srid'] or 4326,))
+            row = cursor.fetchone()
+    return tuple(row) if row and row[0] is not None else None
+
+
+def simplify_tolerance(z):
+    """
+    Tolerancia de simplificación (metros en EPSG:3857) para un zoom.
+    Equivale a una fracción del tamaño de una celda de la tesela; a partir de
+    simplify_max_zoom se devuelve 0 y las geometrías se envían sin simplificar.
+
+    Args:
+        z: Nivel de zoom
+
+    Returns:
+        float: Tolerancia en metros
+    """
+    if z >= TILES_CONFIG['simplify_max_zoom']:
+        return 0.0
+    cell = WEB_MERCATOR_WIDTH / (2 ** z * TILES_CONFIG['extent'])
+    return cell * TILES_CONFIG['simplify_factor']
+
+
+def build_tile(info, z, x, y, columns):
+    """
+    Genera una tesela MVT de una capa
+
+    Args:
+        info: Descripción de la capa (app.postgis.get_layer_info)
+        z, x, y: Coordenadas de la tesela (esquema XYZ)
+        columns: Columnas de atributos que se incluyen en cada elemento
+
+    Returns:
+        bytes: Tesela MVT (vacía si no hay elementos en la tesela)
+    """
+    geometry = sql.Identifier(info['geometry_column'])
+    srid = info['srid'] or 4326
+
+    # Se parte de la versión generalizada adecuada al zoom (si la capa la tiene); el filtro
+    # espacial usa siempre la geometría completa, que es la que tiene índice GiST.
+    # La geometría se transforma a 3857 y, en zooms bajos, se simplifica antes de recortarla
+    source = sql.Identifier(generalized_column(info, z))
+    projected = sql.SQL("ST_Transform({}, 3857)").format(source)
+    tolerance = simplify_tolerance(z)
+    if tolerance and 'point' not in (info['geometry_type'] or '').lower():
+        projected = sql.SQL("ST_Simplify({}, {}, true)").format(projected, sql.Literal(tolerance))
+
+    attributes = [sql.Identifier(column) for column in columns]
+    query = sql.SQL("""
+        WITH bounds AS (
+            SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS envelope
+        ),
+        features AS (
+            SELECT ST_AsMVTGeom({projected}, bounds.envelope, %(extent)s, %(buffer)s, true) AS mvt_geom{attributes}
+            FROM {table}, bounds
+            WHERE {geometry} && ST_Transform(bounds.envelope, %(srid)s)
+            LIMIT %(max_features)s
+        )
+        SELECT ST_AsMVT(features.*, %(layer)s, %(extent)s, 'mvt_geom')
+        FROM features
+        WHERE mvt_geom IS NOT NULL
+    """).format(
+        projected=projected,
+        attributes=sql.SQL('').join(sql.SQL(', ') + attribute for attribute in attributes),
+        table=sql.Identifier(info['name']),
+        geometry=geometry
+    )
+    params = {
+        'z': z, 'x': x, 'y': y,
+        'extent': TILES_CONFIG['extent'],
+        'buffer': TILES_CONFIG['buffer'],
+        'srid': srid,
+        'max_features': TILES_CONFIG['max_features'],
+        'layer': info['name']
+    }
+
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            row = cursor.fetchone()
+    return bytes(row[0]) if row and row[0] is not None else b''
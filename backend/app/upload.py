@@ -1,13 +1,26 @@
 from flask import Blueprint, request, jsonify
+import asyncio
 import os
+import re
 import uuid
 import zipfile
 import shutil
 import subprocess
-import requests
-import glob
 import tempfile
-from app.config import DB_CONFIG, GEOSERVER_CONFIG
+from psycopg2 import sql
+from app.config import DB_CONFIG, GEOSERVER_CONFIG, UPLOAD_CONFIG, OPTIMIZE_CONFIG
+from app.database import get_connection
+from app.geoserver import get_geoserver_client, GeoServerError
+from app.jobs import submit_job, submit_async_job, JobError
+from app.cache import invalidate_layer
+from app.indexing import optimize_table
+from app.generalize import publish_styles
+from app.loader import MERGE_MODES, staging_name, swap_table
+from app.metrics import stage_timer, add_bytes, observe_layer, observe_stage
+from app.manifest import save_and_hash, find_archive, plan_layers, record_layers
+from app.pipeline import import_layers_async, publish_async
+from app.utils import (find_shapefiles_in_zip, find_shapefiles_in_dir, vsizip_path,
+                       assign_table_names, import_planned_layers, import_merged_layers, validate_layers)
 
 upload_bp = Blueprint('upload', __name__)
 
@@ -15,11 +28,19 @@ upload_bp = Blueprint('upload', __name__)
 def upload_shapefile():
     """
     Endpoint para subir archivos shapefile (ZIP), procesarlos y publicarlos automáticamente.
-    1. Recibe un archivo ZIP
-    2. Lo descomprime para acceder a los archivos .shp, .shx, .dbf, .prj
-    3. Sube el shapefile a PostgreSQL/PostGIS usando ogr2ogr
-    4. Publica la capa en GeoServer usando su API REST
-    5. Devuelve información de éxito o error
+    1. Recibe un archivo ZIP y valida que contenga un shapefile
+       (si un ZIP idéntico ya se cargó y sus capas siguen publicadas, responde sin reimportar)
+    2. Encola un trabajo en segundo plano y responde con su identificador (202)
+    3. El trabajo lee los archivos .shp, .shx, .dbf, .prj directamente del ZIP (/vsizip/)
+    4. Sube el shapefile a PostgreSQL/PostGIS usando ogr2ogr
+    5. Publica la capa en GeoServer usando su API REST
+    El progreso de cada etapa se consulta en /api/jobs/<job_id>
+
+    Parámetros opcionales del formulario:
+        mode: 'replace' (por defecto) recrea cada tabla; 'append' inserta los registros
+              con claves nuevas y 'upsert' además actualiza los que cambiaron
+        key_column: Columna que identifica cada registro (obligatoria en append/upsert)
+        delete_missing: 'true' para eliminar los registros que no vienen en el archivo (solo upsert)
     """
     # Manejar preflight OPTIONS
     if request.method == 'OPTIONS':
@@ -42,208 +63,528 @@ def upload_shapefile():
     if not file.filename.lower().endswith('.zip'):
         return jsonify({'success': False, 'error': 'El archivo debe ser un ZIP que contenga los archivos shapefile'}), 400
 
+    mode = request.form.get('mode', 'replace')
+    key_column = request.form.get('key_column') or None
+    delete_missing = request.form.get('delete_missing', 'false').lower() in ('true', '1', 'yes')
+    if mode != 'replace' and mode not in MERGE_MODES:
+        return jsonify({'success': False, 'error': f'Modo de carga no válido: {mode}'}), 400
+    if mode != 'replace' and not key_column:
+        return jsonify({'success': False, 'error': f'El modo {mode} necesita una columna clave (key_column)'}), 400
+    if delete_missing and mode != 'upsert':
+        return jsonify({'success': False, 'error': 'delete_missing solo se admite en el modo upsert'}), 400
+
     try:
-        # Crear directorios temporales para el procesamiento
+        # Crear directorio temporal para el procesamiento
         temp_dir = tempfile.mkdtemp(prefix="geoportal_")
         zip_path = os.path.join(temp_dir, "uploaded.zip")
-        extract_dir = os.path.join(temp_dir, "extracted")
-        os.makedirs(extract_dir, exist_ok=True)
-        
+
         print(f"Directorio temporal creado: {temp_dir}")
         print(f"Guardando archivo ZIP en: {zip_path}")
-        
-        # Guardar el archivo ZIP
-        file.save(zip_path)
-        
-        # Descomprimir el ZIP
+
+        # Guardar el archivo ZIP calculando su hash; el resto del procesamiento se hace en segundo plano
+        with stage_timer('save'):
+            archive_hash = save_and_hash(file, zip_path)
+        add_bytes('upload', os.path.getsize(zip_path))
+
+        # Validar el ZIP antes de encolar (solo lee el directorio central del archivo)
         try:
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
-            print(f"Archivo ZIP descomprimido en: {extract_dir}")
+            members = find_shapefiles_in_zip(zip_path)
         except zipfile.BadZipFile:
+            shutil.rmtree(temp_dir, ignore_errors=True)
             return jsonify({'success': False, 'error': 'El archivo ZIP es inválido o está corrupto'}), 400
-        
-        # Buscar archivos shapefile en el directorio extraído
-        shapefile_paths = glob.glob(os.path.join(extract_dir, "**/*.shp"), recursive=True)
-        if not shapefile_paths:
+
+        if not members:
+            shutil.rmtree(temp_dir, ignore_errors=True)
             return jsonify({'success': False, 'error': 'No se encontraron archivos shapefile (.shp) en el ZIP'}), 400
-        
-        # Tomar el primer shapefile encontrado
-        shapefile_path = shapefile_paths[0]
-        shapefile_name = os.path.splitext(os.path.basename(shapefile_path))[0]
-        table_name = shapefile_name.lower()  # Nombre de la tabla en PostgreSQL
-        
-        print(f"Shapefile encontrado: {shapefile_path}")
-        print(f"Nombre de tabla a crear: {table_name}")
-        
-        # Subir a PostgreSQL/PostGIS usando ogr2ogr
-        try:
-            # Construir la cadena de conexión PostgreSQL
-            pg_conn_string = f"PG:host={DB_CONFIG['host']} port={DB_CONFIG['port']} dbname={DB_CONFIG['dbname']} user={DB_CONFIG['user']} password={DB_CONFIG['password']}"
-            
-            # Comando ogr2ogr para importar a PostGIS
-            ogr_cmd = [
-                'ogr2ogr',
-                '-f', 'PostgreSQL',
-                '-overwrite',  # Sobrescribir si ya existe
-                '-lco', 'GEOMETRY_NAME=geom',  # Nombre de la columna de geometría
-                '-lco', 'FID=gid',  # Nombre de la columna de ID
-                '-a_srs', 'EPSG:4326',  # Asignar SRS si no está definido
-                '-nlt', 'PROMOTE_TO_MULTI',  # Promover a geometrías multi para consistencia
-                pg_conn_string,
-                shapefile_path
-            ]
-            
-            print(f"Ejecutando ogr2ogr: {' '.join(ogr_cmd)}")
-            result = subprocess.run(ogr_cmd, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                print(f"Error en ogr2ogr: {result.stderr}")
-                return jsonify({
-                    'success': False, 
-                    'error': f'Error al importar a PostGIS: {result.stderr}'
-                }), 500
-                
-            print("Shapefile importado correctamente a PostGIS")
-            
-        except Exception as e:
-            print(f"Error al ejecutar ogr2ogr: {str(e)}")
-            return jsonify({'success': False, 'error': f'Error al importar a PostGIS: {str(e)}'}), 500
-        
-        # Publicar en GeoServer
-        try:
-            # 1. Verificar si el workspace existe
-            workspace_url = f"{GEOSERVER_CONFIG['url']}/rest/workspaces/{GEOSERVER_CONFIG['workspace']}"
-            auth = (GEOSERVER_CONFIG['user'], GEOSERVER_CONFIG['password'])
-            headers = {'Content-Type': 'application/json'}
-            
-            workspace_response = requests.get(workspace_url, auth=auth)
-            
-            if workspace_response.status_code != 200:
-                # Crear workspace si no existe
-                print(f"Workspace {GEOSERVER_CONFIG['workspace']} no existe. Creándolo...")
-                workspace_data = {
-                    "workspace": {
-                        "name": GEOSERVER_CONFIG['workspace']
-                    }
-                }
-                requests.post(
-                    f"{GEOSERVER_CONFIG['url']}/rest/workspaces",
-                    json=workspace_data,
-                    headers=headers,
-                    auth=auth
-                )
-            
-            # 2. Verificar/crear datastore
-            datastore_url = f"{workspace_url}/datastores/postgis_store"
-            datastore_response = requests.get(datastore_url, auth=auth)
-            
-            if datastore_response.status_code != 200:
-                # Crear datastore PostGIS si no existe
-                print("Datastore 'postgis_store' no existe. Creándolo...")
-                datastore_data = {
-                    "dataStore": {
-                        "name": "postgis_store",
-                        "connectionParameters": {
-                            "entry": [
-                                {"@key": "host", "$": DB_CONFIG['host']},
-                                {"@key": "port", "$": str(DB_CONFIG['port'])},
-                                {"@key": "database", "$": DB_CONFIG['dbname']},
-                                {"@key": "user", "$": DB_CONFIG['user']},
-                                {"@key": "passwd", "$": DB_CONFIG['password']},
-                                {"@key": "dbtype", "$": "postgis"},
-                                {"@key": "schema", "$": "public"}
-                            ]
-                        }
-                    }
-                }
-                
-                create_ds_response = requests.post(
-                    f"{workspace_url}/datastores",
-                    json=datastore_data,
-                    headers=headers,
-                    auth=auth
-                )
-                
-                if create_ds_response.status_code not in [201, 200]:
-                    print(f"Error al crear datastore: {create_ds_response.text}")
-                    return jsonify({
-                        'success': False, 
-                        'error': f'Error al crear datastore en GeoServer: {create_ds_response.text}'
-                    }), 500
-            
-            # 3. Publicar la capa como feature type
-            print(f"Publicando capa {table_name} en GeoServer...")
-            featuretype_url = f"{datastore_url}/featuretypes"
-            
-            # Primero verificar si ya existe
-            check_layer = requests.get(
-                f"{featuretype_url}/{table_name}",
-                auth=auth
-            )
-            
-            if check_layer.status_code == 200:
-                print(f"La capa {table_name} ya existe en GeoServer")
-            else:
-                # Crear la capa
-                layer_data = {
-                    "featureType": {
-                        "name": table_name,
-                        "nativeName": table_name,
-                        "title": table_name.replace("_", " ").title(),
-                        "srs": "EPSG:4326",
-                        "enabled": True
-                    }
-                }
-                
-                publish_response = requests.post(
-                    featuretype_url,
-                    json=layer_data,
-                    headers=headers,
-                    auth=auth
-                )
-                
-                if publish_response.status_code not in [201, 200]:
-                    print(f"Error al publicar capa: {publish_response.text}")
-                    return jsonify({
-                        'success': False, 
-                        'error': f'Error al publicar capa en GeoServer: {publish_response.text}'
-                    }), 500
-                
-                print(f"Capa {table_name} publicada correctamente en GeoServer")
-                
-            # URLs para acceder a la capa
-            wms_url = f"{GEOSERVER_CONFIG['url']}/{GEOSERVER_CONFIG['workspace']}/wms?service=WMS&version=1.1.1&request=GetMap&layers={GEOSERVER_CONFIG['workspace']}:{table_name}"
-            wfs_url = f"{GEOSERVER_CONFIG['url']}/{GEOSERVER_CONFIG['workspace']}/wfs?service=WFS&version=1.0.0&request=GetFeature&typeName={GEOSERVER_CONFIG['workspace']}:{table_name}"
-            preview_url = f"{GEOSERVER_CONFIG['url']}/{GEOSERVER_CONFIG['workspace']}/wms?service=WMS&version=1.1.1&request=GetMap&layers={GEOSERVER_CONFIG['workspace']}:{table_name}&width=800&height=600&srs=EPSG:4326&bbox=-180,-90,180,90&format=application/openlayers"
-            
-            # Devolver respuesta exitosa
-            response_data = {
+
+        # El mismo ZIP ya se cargó completo: sus capas siguen publicadas, no hay nada que importar
+        entries = find_archive(archive_hash) if mode == 'replace' else []
+        if entries:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            print(f"👉 {file.filename} ya se cargó ({archive_hash[:12]}): {', '.join(e['table_name'] for e in entries)}")
+            return jsonify({
                 'success': True,
-                'message': f'Archivo {file.filename} procesado correctamente. Capa {table_name} publicada.',
-                'layer_name': table_name,
-                'workspace': GEOSERVER_CONFIG['workspace'],
-                'full_layer_name': f"{GEOSERVER_CONFIG['workspace']}:{table_name}",
-                'urls': {
-                    'wms': wms_url,
-                    'wfs': wfs_url,
-                    'preview': preview_url
-                }
-            }
-            
-            # Limpiar archivos temporales
+                'duplicate': True,
+                'message': f'El archivo {file.filename} ya estaba cargado. Las capas publicadas no cambian.',
+                **build_layer_info(entries[0]['table_name']),
+                'layers': [{**entry, **build_layer_info(entry['table_name'])} for entry in entries]
+            }), 200
+
+        if UPLOAD_CONFIG['async_pipeline']:
+            job_id = submit_async_job(process_upload_job_async, temp_dir, zip_path, file.filename, archive_hash,
+                                      mode, key_column, delete_missing, filename=file.filename)
+        else:
+            job_id = submit_job(process_upload_job, temp_dir, zip_path, file.filename, archive_hash,
+                                mode, key_column, delete_missing, filename=file.filename)
+
+        return jsonify({
+            'success': True,
+            'message': f'Archivo {file.filename} recibido. Procesando en segundo plano.',
+            'job_id': job_id,
+            'status_url': f'/api/jobs/{job_id}'
+        }), 202
+
+    except Exception as e:
+        print(f"Error general en el procesamiento: {str(e)}")
+        return jsonify({'success': False, 'error': f'Error en el procesamiento: {str(e)}'}), 500
+
+
+def process_upload_job(job, temp_dir, zip_path, filename, archive_hash=None,
+                       mode='replace', key_column=None, delete_missing=False):
+    """
+    Procesa en segundo plano un ZIP ya guardado en disco:
+    lectura (o extracción) de los shapefiles, importación a PostGIS y publicación en GeoServer.
+    Todas las capas del ZIP se importan en paralelo y se publican en un solo lote.
+    Las capas idénticas a la última carga no se reimportan y las que solo cambian
+    en atributos se actualizan sin volver a cargar la geometría (app.manifest).
+    En los modos 'append' y 'upsert' las capas que ya tienen tabla se fusionan con
+    ella por key_column en lugar de reemplazarla (app.loader.merge_features).
+
+    Args:
+        job: Trabajo (app.jobs.Job) donde se registran las etapas
+        temp_dir: Directorio temporal del trabajo
+        zip_path: Ruta del ZIP subido
+        filename: Nombre original del archivo
+        archive_hash: SHA-256 del ZIP, para registrarlo en el manifiesto de cargas
+        mode: 'replace', 'append' o 'upsert'
+        key_column: Columna clave de la fusión (append/upsert)
+        delete_missing: Eliminar los registros que no vienen en el ZIP (upsert)
+
+    Returns:
+        dict: Información de las capas publicadas (detalle por capa en 'layers')
+    """
+    try:
+        merging = mode in MERGE_MODES
+        layers, plans, validation = prepare_layers(job, temp_dir, zip_path, merging)
+
+        # Subir a PostgreSQL/PostGIS usando ogr2ogr, varias capas a la vez
+        with job.stage('import') as detail:
+            if merging:
+                layer_results = import_merged_layers(layers, import_to_postgis, key_column, mode, delete_missing)
+            else:
+                layer_results = import_planned_layers(layers, plans, import_to_postgis)
+            imported = record_import(detail, layer_results, validation, archive_hash, merging)
+
+        if not imported:
+            raise JobError(layer_results[0]['error'] if len(layer_results) == 1
+                           else 'No se pudo importar ninguna capa del ZIP')
+
+        optimize_imported(job, imported)
+        imported = swap_imported(job, layer_results, imported, archive_hash, merging)
+
+        # Publicar en GeoServer todas las capas importadas en un solo lote
+        with job.stage('publish') as detail:
+            created = publish_to_geoserver([layer['table_name'] for layer in imported])
+            detail['created'] = sum(1 for value in created.values() if value)
+
+        return build_job_result(filename, layer_results, imported, merging)
+    finally:
+        remove_temp_dir(temp_dir)
+
+
+async def process_upload_job_async(job, temp_dir, zip_path, filename, archive_hash=None,
+                                   mode='replace', key_column=None, delete_missing=False):
+    """
+    Variante asíncrona de process_upload_job (UPLOAD_CONFIG['async_pipeline']), con las mismas
+    etapas y el mismo resultado. ogr2ogr se ejecuta como subproceso asíncrono y las peticiones
+    a GeoServer se lanzan a la vez (app.pipeline); las etapas que consultan PostgreSQL se
+    ejecutan en hilos auxiliares solo mientras duran.
+
+    Args:
+        Igual que process_upload_job
+
+    Returns:
+        dict: Información de las capas publicadas (detalle por capa en 'layers')
+    """
+    try:
+        merging = mode in MERGE_MODES
+        layers, plans, validation = await asyncio.to_thread(prepare_layers, job, temp_dir, zip_path, merging)
+
+        with job.stage('import') as detail:
+            layer_results = await import_layers_async(layers, plans, ogr2ogr_command, key_column, mode, delete_missing)
+            imported = await asyncio.to_thread(record_import, detail, layer_results, validation, archive_hash, merging)
+
+        if not imported:
+            raise JobError(layer_results[0]['error'] if len(layer_results) == 1
+                           else 'No se pudo importar ninguna capa del ZIP')
+
+        await asyncio.to_thread(optimize_imported, job, imported)
+        imported = await asyncio.to_thread(swap_imported, job, layer_results, imported, archive_hash, merging)
+
+        with job.stage('publish') as detail:
+            created = await publish_async([layer['table_name'] for layer in imported])
+            detail['created'] = sum(1 for value in created.values() if value)
+
+        return build_job_result(filename, layer_results, imported, merging)
+    finally:
+        await asyncio.to_thread(remove_temp_dir, temp_dir)
+
+
+def prepare_layers(job, temp_dir, zip_path, merging=False):
+    """
+    Etapas previas a la importación: lectura (o extracción) de los shapefiles del ZIP,
+    comparación con el manifiesto de cargas y validación de las geometrías
+
+    Args:
+        job: Trabajo donde se registran las etapas
+        temp_dir: Directorio temporal del trabajo
+        zip_path: Ruta del ZIP subido
+        merging: True en los modos append/upsert (no se consulta el manifiesto)
+
+    Returns:
+        tuple: (capas [(ruta, tabla)], planes del manifiesto o None, informes de validación por ruta)
+    """
+    if UPLOAD_CONFIG['stream_zip']:
+        # Leer los shapefiles directamente desde el ZIP mediante /vsizip/ de GDAL,
+        # sin escribir en disco una copia extraída de cada archivo
+        with job.stage('scan') as detail:
+            members = find_shapefiles_in_zip(zip_path)
+            shapefile_paths = [vsizip_path(zip_path, member) for member in members]
+            detail['bytes'] = os.path.getsize(zip_path)
+            detail['shapefiles'] = members
+    else:
+        extract_dir = os.path.join(temp_dir, "extracted")
+
+        # Descomprimir el ZIP
+        with job.stage('extract') as detail:
+            os.makedirs(extract_dir, exist_ok=True)
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                zip_ref.extractall(extract_dir)
+            print(f"Archivo ZIP descomprimido en: {extract_dir}")
+
+            # Buscar archivos shapefile en el directorio extraído
+            shapefile_paths = find_shapefiles_in_dir(extract_dir)
+            detail['bytes'] = os.path.getsize(zip_path)
+            detail['shapefiles'] = [os.path.relpath(path, extract_dir) for path in shapefile_paths]
+
+    if not shapefile_paths:
+        raise JobError('No se encontraron archivos shapefile (.shp) en el ZIP')
+
+    layers = assign_table_names(shapefile_paths)  # Nombres de las tablas en PostgreSQL
+    print(f"Shapefiles encontrados: {len(layers)}")
+    print(f"Tablas a crear: {', '.join(table for _, table in layers)}")
+
+    # Comparar cada capa con su última carga (hash de .shp/.shx/.prj y de .dbf/.cpg)
+    if merging:
+        plans = None
+        full = [path for path, _ in layers]
+    else:
+        with job.stage('dedupe') as detail:
+            plans = plan_layers(layers)
+            for action in ('unchanged', 'attributes', 'full'):
+                detail[action] = sum(1 for plan in plans if plan['action'] == action)
+        full = [path for (path, _), plan in zip(layers, plans) if plan['action'] == 'full']
+
+    # Validar las geometrías antes de importarlas (solo se lee la geometría, en lotes)
+    validation = {}
+    if UPLOAD_CONFIG['validate_before_import'] and full:
+        with job.stage('validate') as detail:
+            validation = dict(zip(full, validate_layers(full)))
+            detail['invalid'] = sum(report.get('invalid', 0) for report in validation.values())
+
+    return layers, plans, validation
+
+
+def record_import(detail, layer_results, validation, archive_hash, merging=False):
+    """
+    Completa el resultado de la etapa de importación: informes de validación, registros
+    de cada tabla e invalidación de las cachés de las capas fusionadas o actualizadas.
+    Las capas importadas completas siguen en su tabla de preparación (swap_imported).
+
+    Args:
+        detail: Detalle de la etapa 'import' del trabajo
+        layer_results: Resultado por capa de la importación
+        validation: Informes de validación por ruta del shapefile
+        archive_hash: SHA-256 del ZIP
+        merging: True en los modos append/upsert
+
+    Returns:
+        list: Resultados de las capas importadas correctamente
+    """
+    for layer in layer_results:
+        if layer['source'] in validation:
+            layer['validation'] = validation[layer['source']]
+    imported = [layer for layer in layer_results if layer['success']]
+    for layer in imported:
+        observe_layer(layer)
+        if layer['action'] == 'full':
+            layer['rows'] = count_rows(staging_name(layer['table_name']))
+        elif layer['action'] != 'unchanged':
+            invalidate_layer(layer['table_name'])
+            layer['rows'] = count_rows(layer['table_name'])
+    detail['layers'] = len(layer_results)
+    detail['imported'] = sum(1 for layer in imported if layer['action'] == 'full')
+    if merging:
+        detail['merged'] = sum(1 for layer in imported if layer['action'] == 'merge')
+        for count in ('inserted', 'updated', 'deleted'):
+            detail[count] = sum(layer.get(count, 0) for layer in imported)
+    else:
+        detail['updated'] = sum(1 for layer in imported if layer['action'] == 'attributes')
+        detail['unchanged'] = sum(1 for layer in imported if layer['action'] == 'unchanged')
+    detail['rows'] = sum(layer['rows'] or 0 for layer in imported)
+    return imported
+
+
+def optimize_imported(job, imported):
+    """
+    Índices, columnas generalizadas, orden espacial y estadísticas de cada tabla importada
+    completa. Se ejecuta sobre la tabla de preparación, antes de swap_imported, de modo que
+    los pasos que reescriben la tabla no bloquean a los lectores de la capa publicada.
+
+    Args:
+        job: Trabajo donde se registra la etapa 'optimize'
+        imported: Resultados de las capas importadas correctamente
+    """
+    optimized = [layer for layer in imported if layer['action'] == 'full']
+    if not OPTIMIZE_CONFIG['enabled'] or not optimized:
+        return
+    with job.stage('optimize') as detail:
+        for layer in optimized:
             try:
-                shutil.rmtree(temp_dir)
-                print(f"Directorio temporal eliminado: {temp_dir}")
+                layer['optimize'] = optimize_table(staging_name(layer['table_name']))
+                observe_stage('index', layer['optimize']['total_seconds'])
             except Exception as e:
-                print(f"Advertencia: No se pudo eliminar el directorio temporal: {str(e)}")
-                
-            return jsonify(response_data), 200
-            
+                # La capa ya está cargada: un fallo aquí no debe impedir publicarla
+                print(f"⚠️ No se pudo optimizar la tabla {layer['table_name']}: {str(e)}")
+                layer['optimize'] = {'error': str(e)}
+        detail['seconds'] = round(sum(layer['optimize'].get('total_seconds', 0) for layer in optimized), 3)
+
+
+def swap_imported(job, layer_results, imported, archive_hash, merging=False):
+    """
+    Reemplaza cada capa importada completa por su tabla de preparación (app.loader.swap_table),
+    invalida las cachés de las capas reemplazadas y registra la carga en el manifiesto.
+    Es el único paso en el que los lectores de esas capas esperan a la importación.
+
+    Args:
+        job: Trabajo donde se registra la etapa 'swap'
+        layer_results: Resultado por capa de la importación
+        imported: Resultados de las capas importadas correctamente
+        archive_hash: SHA-256 del ZIP
+        merging: True en los modos append/upsert
+
+    Returns:
+        list: Resultados de las capas importadas correctamente (sin las que no se pudieron reemplazar)
+
+    Raises:
+        JobError: Si no se pudo reemplazar ninguna capa
+    """
+    with job.stage('swap') as detail:
+        for layer in imported:
+            if layer['action'] != 'full':
+                continue
+            try:
+                swap_table(staging_name(layer['table_name']), layer['table_name'])
+                invalidate_layer(layer['table_name'])
+            except Exception as e:
+                print(f"❌ No se pudo reemplazar la tabla {layer['table_name']}: {str(e)}")
+                layer.update(success=False, error=f'Error al reemplazar la tabla: {str(e)}')
+        detail['swapped'] = sum(1 for layer in imported if layer['success'] and layer['action'] == 'full')
+
+    if not merging:
+        try:
+            record_layers(layer_results, archive_hash)
         except Exception as e:
-            print(f"Error al publicar en GeoServer: {str(e)}")
-            return jsonify({'success': False, 'error': f'Error al publicar en GeoServer: {str(e)}'}), 500
-            
+            print(f"⚠️ No se pudo actualizar el manifiesto de cargas: {str(e)}")
+
+    remaining = [layer for layer in imported if layer['success']]
+    if not remaining:
+        raise JobError(imported[0]['error'] if len(imported) == 1
+                       else 'No se pudo reemplazar ninguna capa del ZIP')
+    return remaining
+
+
+def build_job_result(filename, layer_results, imported, merging=False):
+    """
+    Resultado final de un trabajo de subida
+
+    Returns:
+        dict: Mensaje, capa principal (la primera importada) y detalle por capa en 'layers'
+    """
+    for layer in layer_results:
+        layer['published'] = layer['success']
+        if layer['success']:
+            layer.update(build_layer_info(layer['table_name']))
+
+    # La primera capa importada se mantiene en los campos principales por compatibilidad
+    first = imported[0]
+    if len(layer_results) == 1:
+        message = f'Archivo {filename} procesado correctamente. Capa {first["table_name"]} publicada.'
+    else:
+        message = (f'Archivo {filename} procesado: {len(imported)} de {len(layer_results)} '
+                   f'capas importadas y publicadas.')
+    if merging:
+        totals = {count: sum(layer.get(count, 0) for layer in imported) for count in ('inserted', 'updated', 'deleted')}
+        message += (f" Registros insertados: {totals['inserted']}, actualizados: {totals['updated']}, "
+                    f"eliminados: {totals['deleted']}.")
+
+    return {
+        'message': message,
+        'rows': first['rows'],
+        **build_layer_info(first['table_name']),
+        'layers': layer_results
+    }
+
+
+def remove_temp_dir(temp_dir):
+    """Elimina el directorio temporal de un trabajo"""
+    try:
+        shutil.rmtree(temp_dir)
+        print(f"Directorio temporal eliminado: {temp_dir}")
     except Exception as e:
-        print(f"Error general en el procesamiento: {str(e)}")
-        return jsonify({'success': False, 'error': f'Error en el procesamiento: {str(e)}'}), 500
+        print(f"Advertencia: No se pudo eliminar el directorio temporal: {str(e)}")
+
+
+def ogr2ogr_command(shapefile_path, table_name):
+    """
+    Comando ogr2ogr que importa un shapefile a PostgreSQL/PostGIS.
+    La capa se carga en su tabla de preparación (app.loader.staging_name); la tabla
+    publicada solo se reemplaza después de optimizarla (swap_imported).
+
+    Args:
+        shapefile_path: Ruta del archivo .shp
+        table_name: Nombre de la capa
+
+    Returns:
+        list: Argumentos del comando
+    """
+    # Construir la cadena de conexión PostgreSQL
+    pg_conn_string = f"PG:host={DB_CONFIG['host']} port={DB_CONFIG['port']} dbname={DB_CONFIG['dbname']} user={DB_CONFIG['user']} password={DB_CONFIG['password']}"
+
+    # Comando ogr2ogr para importar a PostGIS
+    ogr_cmd = [
+        'ogr2ogr',
+        '-f', 'PostgreSQL',
+        '-overwrite',  # Sobrescribir si ya existe
+        '-lco', 'GEOMETRY_NAME=geom',  # Nombre de la columna de geometría
+        '-lco', 'FID=gid',  # Nombre de la columna de ID
+        '-t_srs', f"EPSG:{UPLOAD_CONFIG['target_srid']}",  # Reproyectar una sola vez al SRID canónico
+        '-nlt', 'PROMOTE_TO_MULTI',  # Promover a geometrías multi para consistencia
+        '-nln', staging_name(table_name),  # Tabla de preparación de la capa
+    ]
+    if not has_prj(shapefile_path):
+        # Sin .prj no hay CRS de origen: se supone el configurado
+        ogr_cmd += ['-s_srs', f"EPSG:{UPLOAD_CONFIG['default_source_srid']}"]
+    if UPLOAD_CONFIG['make_valid']:
+        ogr_cmd.append('-makevalid')  # Reparar geometrías inválidas (GDAL >= 3.1)
+    ogr_cmd += [pg_conn_string, shapefile_path]
+    return ogr_cmd
+
+
+def import_to_postgis(shapefile_path, table_name):
+    """
+    Importa un shapefile a PostgreSQL/PostGIS usando ogr2ogr.
+    Es una función de nivel de módulo para poder ejecutarse en el pool de procesos.
+
+    Args:
+        shapefile_path: Ruta del archivo .shp
+        table_name: Nombre de la tabla a crear
+    """
+    ogr_cmd = ogr2ogr_command(shapefile_path, table_name)
+
+    print(f"Ejecutando ogr2ogr para la tabla {table_name}")
+    try:
+        result = subprocess.run(ogr_cmd, capture_output=True, text=True)
+    except Exception as e:
+        print(f"Error al ejecutar ogr2ogr: {str(e)}")
+        raise JobError(f'Error al importar a PostGIS: {str(e)}')
+
+    if result.returncode != 0:
+        print(f"Error en ogr2ogr: {result.stderr}")
+        raise JobError(f'Error al importar a PostGIS: {result.stderr}')
+
+    print("Shapefile importado correctamente a PostGIS")
+
+
+def has_prj(shapefile_path):
+    """
+    Indica si un shapefile tiene archivo .prj (en disco o dentro de un ZIP leído con /vsizip/)
+
+    Args:
+        shapefile_path: Ruta del archivo .shp
+
+    Returns:
+        bool: True si existe el .prj junto al .shp
+    """
+    base = os.path.splitext(shapefile_path)[0]
+    # /vsizip/<ruta del zip>/<ruta interna>
+    match = re.match(r'^/vsizip/(.+?\.zip)/(.+)$', base, re.IGNORECASE)
+    if match:
+        try:
+            with zipfile.ZipFile(match.group(1)) as zip_ref:
+                names = {name.lower() for name in zip_ref.namelist()}
+            return f"{match.group(2)}.prj".lower() in names
+        except (OSError, zipfile.BadZipFile):
+            return True
+    return any(os.path.exists(base + extension) for extension in ('.prj', '.PRJ'))
+
+
+def count_rows(table_name):
+    """
+    Cuenta los registros de una tabla importada
+
+    Args:
+        table_name: Nombre de la tabla
+
+    Returns:
+        int: Número de registros o None si no se pudo consultar
+    """
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql.SQL("SELECT count(*) FROM {}").format(sql.Identifier(table_name)))
+                return cursor.fetchone()[0]
+    except Exception as e:
+        print(f"Advertencia: No se pudo contar los registros de {table_name}: {str(e)}")
+        return None
+
+
+def publish_to_geoserver(table_names):
+    """
+    Publica un lote de tablas de PostGIS como capas de GeoServer. El workspace
+    y el datastore se verifican una sola vez por lote con el cliente REST compartido,
+    que además los mantiene en caché entre trabajos.
+
+    Args:
+        table_names: Nombres de las tablas en PostGIS
+
+    Returns:
+        dict: Para cada tabla, True si la capa se creó y False si ya existía
+    """
+    print(f"Publicando {len(table_names)} capa(s) en GeoServer...")
+    try:
+        client = get_geoserver_client()
+        created = client.publish_featuretypes(table_names)
+        publish_styles(table_names, client)
+        return created
+    except GeoServerError as e:
+        print(f"Error al publicar en GeoServer: {str(e)}")
+        raise JobError(f'Error al publicar en GeoServer: {str(e)}')
+
+
+def build_layer_info(table_name):
+    """
+    Construye los datos de acceso a una capa publicada
+
+    Args:
+        table_name: Nombre de la capa
+
+    Returns:
+        dict: Nombre de la capa, workspace y URLs WMS/WFS
+    """
+    # URLs para acceder a la capa
+    wms_url = f"{GEOSERVER_CONFIG['url']}/{GEOSERVER_CONFIG['workspace']}/wms?service=WMS&version=1.1.1&request=GetMap&layers={GEOSERVER_CONFIG['workspace']}:{table_name}"
+    wfs_url = f"{GEOSERVER_CONFIG['url']}/{GEOSERVER_CONFIG['workspace']}/wfs?service=WFS&version=1.0.0&request=GetFeature&typeName={GEOSERVER_CONFIG['workspace']}:{table_name}"
+    preview_url = f"{GEOSERVER_CONFIG['url']}/{GEOSERVER_CONFIG['workspace']}/wms?service=WMS&version=1.1.1&request=GetMap&layers={GEOSERVER_CONFIG['workspace']}:{table_name}&width=800&height=600&srs=EPSG:4326&bbox=-180,-90,180,90&format=application/openlayers"
+
+    return {
+        'layer_name': table_name,
+        'workspace': GEOSERVER_CONFIG['workspace'],
+        'full_layer_name': f"{GEOSERVER_CONFIG['workspace']}:{table_name}",
+        'urls': {
+            'wms': wms_url,
+            'wfs': wfs_url,
+            'preview': preview_url,
+            'export': f"/api/layers/{table_name}/export?format=geojson"
+        }
+    }
@@ -4,36 +4,51 @@ Este módulo contiene funciones auxiliares para el procesamiento de datos
 y otras operaciones comunes utilizadas en la aplicación.
 """
 
-import geopandas as gpd
 import psycopg2
 import os
-import requests
+import functools
 import glob
-from app.config import DB_CONFIG
+import multiprocessing
+import re
+import shutil
+import threading
+import time
+import zipfile
+import pyogrio
+from concurrent.futures import ProcessPoolExecutor
+from app.config import DB_CONFIG, UPLOAD_CONFIG, OPTIMIZE_CONFIG
+from app.database import get_engine
+from app.loader import (copy_features, merge_features, read_batches, layer_schema, new_validation_report,
+                        validate_geometries)
+from app.geoserver import get_geoserver_client
+from app.cache import invalidate_layer
+from app.indexing import optimize_table
+from app.generalize import publish_styles
+from app.manifest import plan_layers, update_attributes, record_layers, forget_layers, hash_file
+from app.postgis import get_layer_info
 from packaging import version
 import shapely
-from sqlalchemy import create_engine
 import traceback
 from app.config import GEOSERVER_CONFIG
 
 # Configuración de GeoServer
 GEOSERVER_URL = GEOSERVER_CONFIG['url']
-GEOSERVER_USER = GEOSERVER_CONFIG['user']
-GEOSERVER_PASSWORD = GEOSERVER_CONFIG['password']
 WORKSPACE = GEOSERVER_CONFIG['workspace']
 
-# Crear engine SQLAlchemy para GeoPandas
+# Pool de procesos para importar varias capas en paralelo (se crea bajo demanda)
+_import_pool = None
+_import_pool_lock = threading.Lock()
+
+# Engine SQLAlchemy para GeoPandas
 def get_sqlalchemy_engine():
     """
-    Crea y devuelve un engine SQLAlchemy para conexión a PostgreSQL/PostGIS
+    Devuelve el engine SQLAlchemy compartido para conexión a PostgreSQL/PostGIS.
+    Las conexiones salen del pool configurado en app.database.
     
     Returns:
         sqlalchemy.engine.Engine: Engine de conexión
     """
-    # Asegurarnos que el puerto sea string para la URL de conexión
-    port = str(DB_CONFIG['port'])
-    db_url = f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{port}/{DB_CONFIG['dbname']}"
-    return create_engine(db_url)
+    return get_engine()
 
 # Verificar la versión de Shapely e importar adecuadamente
 # Si se usa alguna función específica de Shapely que haya cambiado entre versiones
@@ -73,28 +88,18 @@ def save_and_import_file(filepath):
         dict: Resultado de la operación
     """
     try:
-        print(f"Leyendo archivo shapefile: {filepath}")
-        # Leer shapefile usando geopandas - NO intentar decodificar como texto
-        gdf = gpd.read_file(filepath)
-        
         # Obtener el nombre de la tabla a partir del nombre del archivo
         table_name = os.path.splitext(os.path.basename(filepath))[0].lower()
         print(f"Nombre de tabla extraído: {table_name}")
 
-        # Usar SQLAlchemy engine en lugar de conexión psycopg2 directa
-        print("Creando conexión a base de datos...")
-        engine = get_sqlalchemy_engine()
-        
         print(f"Importando a PostGIS como tabla: {table_name}")
-        # Guardar el GeoDataFrame en PostGIS - IMPORTANTE: if_exists='replace'
-        gdf.to_postgis(
-            table_name, 
-            engine, 
-            if_exists='replace',  # Reemplazar si ya existe
-            index=False,          # No incluir el índice
-            schema='public'       # Esquema público
-        )
+        # Leer por lotes y cargarlos con COPY; la tabla se optimiza antes de reemplazar la anterior
+        report = copy_features(table_name, read_batches(filepath),
+                               prepare=optimize_table if OPTIMIZE_CONFIG['enabled'] else None,
+                               schema=layer_schema(filepath))
         print("Datos importados correctamente a PostGIS")
+        log_validation([table_name], [report['validation']])
+        invalidate_layer(table_name)
         
         # Publicar automáticamente en GeoServer
         publish_success = publish_layer_to_geoserver(table_name)
@@ -116,119 +121,468 @@ def save_and_import_file(filepath):
         traceback.print_exc()
         return {'success': False, 'error': str(e)}
 
-def extract_shapefile_name(extract_dir):
+def find_shapefiles_in_zip(zip_path):
     """
-    Extrae el nombre del primer shapefile encontrado en un directorio
+    Lista los shapefiles contenidos en un ZIP sin extraerlo.
+    Solo se lee el directorio central del archivo, no su contenido.
+    
+    Args:
+        zip_path: Ruta del archivo ZIP
+        
+    Returns:
+        list: Rutas internas de los archivos .shp (se ignoran los metadatos __MACOSX)
+        
+    Raises:
+        zipfile.BadZipFile: Si el archivo no es un ZIP válido
+    """
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        return sorted(
+            member for member in zip_ref.namelist()
+            if member.lower().endswith('.shp') and not member.startswith('__MACOSX/')
+        )
+
+def vsizip_path(zip_path, member):
+    """
+    Construye la ruta virtual de GDAL para leer un archivo directamente dentro de un ZIP
+    
+    Args:
+        zip_path: Ruta del archivo ZIP
+        member: Ruta interna del archivo dentro del ZIP
+        
+    Returns:
+        str: Ruta /vsizip/ utilizable por ogr2ogr, GeoPandas o pyogrio
+    """
+    return f"/vsizip/{os.path.abspath(zip_path)}/{member}"
+
+def find_shapefiles_in_dir(extract_dir):
+    """
+    Busca todos los shapefiles de un directorio y sus subdirectorios
     
     Args:
         extract_dir: Directorio donde buscar archivos .shp
         
     Returns:
-        str: Nombre del archivo shapefile sin extensión o None si no se encuentra
+        list: Rutas de los archivos .shp encontrados
+    """
+    return sorted(
+        path for path in glob.glob(os.path.join(extract_dir, "**/*.shp"), recursive=True)
+        if '__MACOSX' not in path
+    )
+
+def sanitize_table_name(name):
+    """
+    Normaliza un nombre de archivo para usarlo como nombre de tabla en PostgreSQL
+    
+    Args:
+        name: Nombre del shapefile sin extensión
+        
+    Returns:
+        str: Nombre en minúsculas con solo letras, números y guiones bajos
     """
-    # Buscar todos los archivos .shp en el directorio y subdirectorios
-    shapefile_paths = glob.glob(os.path.join(extract_dir, "**/*.shp"), recursive=True)
+    table_name = re.sub(r'[^a-z0-9_]', '_', name.lower())
+    if not table_name or table_name[0].isdigit():
+        table_name = f"capa_{table_name}"
+    return table_name
+
+def assign_table_names(shapefile_paths):
+    """
+    Asigna un nombre de tabla único a cada shapefile de un archivo.
+    Si dos shapefiles de carpetas distintas se llaman igual se añade un sufijo numérico.
     
-    if not shapefile_paths:
-        return None
+    Args:
+        shapefile_paths: Rutas (o rutas /vsizip/) de los archivos .shp
+        
+    Returns:
+        list: Tuplas (ruta del shapefile, nombre de tabla)
+    """
+    layers = []
+    used = set()
+    for path in shapefile_paths:
+        base_name = sanitize_table_name(os.path.splitext(os.path.basename(path))[0])
+        table_name = base_name
+        suffix = 2
+        while table_name in used:
+            table_name = f"{base_name}_{suffix}"
+            suffix += 1
+        used.add(table_name)
+        layers.append((path, table_name))
+    return layers
+
+def get_import_pool():
+    """
+    Devuelve el pool de procesos compartido para importar capas en paralelo.
+    Se usa el método 'spawn' para no heredar hilos ni conexiones del servidor.
     
-    # Tomar el primer shapefile encontrado y extraer solo el nombre sin extensión
-    shapefile_name = os.path.splitext(os.path.basename(shapefile_paths[0]))[0].lower()
-    return shapefile_name
+    Returns:
+        ProcessPoolExecutor: Pool acotado por UPLOAD_CONFIG['import_workers']
+    """
+    global _import_pool
+    with _import_pool_lock:
+        if _import_pool is None:
+            _import_pool = ProcessPoolExecutor(
+                max_workers=UPLOAD_CONFIG['import_workers'],
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _import_pool
+
+def _timed_import(import_func, shapefile_path, table_name):
+    """Ejecuta una función de importación y mide su duración (se ejecuta en el pool de procesos)"""
+    start = time.perf_counter()
+    value = import_func(shapefile_path, table_name)
+    return value, round(time.perf_counter() - start, 3)
 
-def process_shapefile_zip(extract_dir):
+def import_layers_parallel(layers, import_func):
     """
-    Procesa un directorio con archivos shapefile extraídos de un ZIP
+    Importa varias capas a PostGIS de forma concurrente en el pool de procesos.
+    El tiempo total es aproximadamente el de la capa más lenta.
     
     Args:
-        extract_dir: Directorio con los archivos extraídos
+        layers: Tuplas (ruta del shapefile, nombre de tabla)
+        import_func: Función de nivel de módulo import_func(ruta, tabla); si devuelve un dict
+                     se añade al resultado de la capa, si no se guarda como 'rows'
         
     Returns:
-        dict: Resultado de la operación
+        list: Un resultado por capa, en el mismo orden que layers
     """
-    try:
-        print(f"Procesando directorio con shapefile: {extract_dir}")
-        # Buscar el primer archivo .shp en el directorio
-        shapefile_name = extract_shapefile_name(extract_dir)
+    results = [
+        {'source': path, 'table_name': table_name, 'success': False, 'rows': None, 'duration': None, 'error': None}
+        for path, table_name in layers
+    ]
+    
+    # Con una sola capa no compensa pasar por el pool de procesos
+    if len(layers) == 1:
+        try:
+            outcomes = [_timed_import(import_func, *layers[0])]
+        except Exception as e:
+            outcomes = [e]
+    else:
+        pool = get_import_pool()
+        futures = [pool.submit(_timed_import, import_func, path, table_name) for path, table_name in layers]
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except Exception as e:
+                outcomes.append(e)
+    
+    for result, outcome in zip(results, outcomes):
+        if isinstance(outcome, Exception):
+            result['error'] = str(outcome)
+            print(f"❌ Error al importar la capa {result['table_name']}: {str(outcome)}")
+        else:
+            value, result['duration'] = outcome
+            if isinstance(value, dict):
+                result.update(value)
+            else:
+                result['rows'] = value
+            result['success'] = True
+            print(f"✅ Capa {result['table_name']} importada en {result['duration']}s")
+    
+    return results
+
+def import_planned_layers(layers, plans, import_func):
+    """
+    Importa las capas según el plan del manifiesto de cargas (app.manifest.plan_layers):
+    las capas sin cambios no se tocan, las que solo cambian en atributos se actualizan
+    con un diff y el resto se importa completo en paralelo con import_layers_parallel.
+    
+    Args:
+        layers: Tuplas (ruta del shapefile, nombre de tabla)
+        plans: Un plan por capa, en el mismo orden
+        import_func: Función de importación completa (ver import_layers_parallel)
         
-        if not shapefile_name:
-            print("❌ No se encontró ningún archivo shapefile (.shp) en el ZIP")
-            return {'success': False, 'error': 'No se encontró ningún archivo shapefile (.shp) en el ZIP'}
+    Returns:
+        list: Un resultado por capa, en el mismo orden, con 'action' y 'fingerprint'
+    """
+    results = [None] * len(layers)
+    full = []
+    for index, ((path, table_name), plan) in enumerate(zip(layers, plans)):
+        result = {'source': path, 'table_name': table_name, 'success': True, 'rows': plan['rows'],
+                  'duration': 0.0, 'error': None, 'action': plan['action']}
+        if plan['action'] == 'unchanged':
+            print(f"👉 Capa {table_name} sin cambios desde la versión {plan['version']}: no se importa")
+            results[index] = result
+        elif plan['action'] == 'attributes':
+            start = time.perf_counter()
+            try:
+                result.update(update_attributes(table_name, path))
+                result['duration'] = round(time.perf_counter() - start, 3)
+                results[index] = result
+            except Exception as e:
+                print(f"⚠️ No se pudo actualizar {table_name} de forma incremental ({str(e)}), se importará completa")
+                full.append(index)
+        else:
+            full.append(index)
+    
+    if full:
+        for index, result in zip(full, import_layers_parallel([layers[i] for i in full], import_func)):
+            result['action'] = 'full'
+            results[index] = result
+    
+    for result, plan in zip(results, plans):
+        result['fingerprint'] = plan['fingerprint']
+    return results
+
+def import_merged_layers(layers, import_func, key_column, mode='upsert', delete_missing=False):
+    """
+    Carga incremental de capas: las que ya tienen tabla se fusionan con ella por key_column
+    (app.loader.merge_features) y las nuevas se importan completas con import_func.
+    Las capas fusionadas se retiran del manifiesto de cargas, cuyas huellas ya no las describen.
+    
+    Args:
+        layers: Tuplas (ruta del shapefile, nombre de tabla)
+        import_func: Función de importación completa (ver import_layers_parallel)
+        key_column: Columna que identifica cada registro
+        mode: 'append' o 'upsert'
+        delete_missing: Eliminar de la tabla los registros que no vienen en la carga
         
-        print(f"Shapefile encontrado: {shapefile_name}")
+    Returns:
+        list: Un resultado por capa, en el mismo orden, con 'action' ('merge' o 'full')
+    """
+    existing = [get_layer_info(table_name) is not None for _, table_name in layers]
+    merged = [layer for layer, exists in zip(layers, existing) if exists]
+    created = [layer for layer, exists in zip(layers, existing) if not exists]
+    
+    merge = functools.partial(merge_layer, key_column=key_column, mode=mode, delete_missing=delete_missing)
+    merged_results = iter(import_layers_parallel(merged, merge) if merged else [])
+    created_results = iter(import_layers_parallel(created, import_func) if created else [])
+    
+    results = []
+    for exists in existing:
+        result = next(merged_results) if exists else next(created_results)
+        result['action'] = 'merge' if exists else 'full'
+        results.append(result)
+    
+    forget_layers([result['table_name'] for result in results if result['success']])
+    return results
+
+def merge_layer(shapefile_path, table_name, key_column, mode='upsert', delete_missing=False):
+    """
+    Lee un shapefile por lotes y lo fusiona con una tabla existente (app.loader.merge_features).
+    Es una función de nivel de módulo para poder ejecutarse en el pool de procesos.
+    
+    Args:
+        shapefile_path: Ruta (o ruta /vsizip/) del archivo .shp
+        table_name: Tabla existente
+        key_column, mode, delete_missing: Igual que en merge_features
+        
+    Returns:
+        dict: Registros recibidos, insertados, actualizados y eliminados
+    """
+    print(f"Fusionando {shapefile_path} con {table_name} por {key_column} ({mode})")
+    return merge_features(table_name, read_batches(shapefile_path), key_column, mode, delete_missing)
+
+def import_shapefile_gdf(shapefile_path, table_name):
+    """
+    Lee un shapefile por lotes y lo carga en PostGIS mediante COPY, con memoria acotada
+    independientemente del tamaño de la capa.
+    Es una función de nivel de módulo para poder ejecutarse en el pool de procesos.
+    
+    Args:
+        shapefile_path: Ruta (o ruta /vsizip/) del archivo .shp
+        table_name: Nombre de la tabla destino
+        
+    Returns:
+        dict: Registros importados y tiempos de carga, índices y ANALYZE
+    """
+    # Leer por lotes de tamaño acotado y enviarlos a PostGIS a medida que se leen;
+    # índices, generalización y CLUSTER se hacen en la tabla de preparación
+    print(f"Leyendo shapefile por lotes: {shapefile_path}")
+    return copy_features(table_name, read_batches(shapefile_path),
+                         prepare=optimize_table if OPTIMIZE_CONFIG['enabled'] else None,
+                         schema=layer_schema(shapefile_path))
+
+def validate_layer(shapefile_path):
+    """
+    Valida las geometrías de una capa antes de importarla. Solo se lee la geometría,
+    por lotes, y se comprueba con las funciones vectorizadas de shapely 2
+    (is_missing, is_empty, is_valid y, para las inválidas, is_valid_reason).
+    Es una función de nivel de módulo para poder ejecutarse en el pool de procesos.
+    
+    Args:
+        shapefile_path: Ruta (o ruta /vsizip/) del archivo .shp
+        
+    Returns:
+        dict: Informe de validación (app.loader.new_validation_report) con su duración;
+              el bbox de los elementos inválidos está en el CRS de origen
+    """
+    start = time.perf_counter()
+    report = new_validation_report()
+    batch_size = UPLOAD_CONFIG['batch_size']
+    while True:
+        batch = pyogrio.read_dataframe(shapefile_path, columns=[], skip_features=report['features'],
+                                       max_features=batch_size)
+        validate_geometries(batch.geometry.values, report)
+        if len(batch) < batch_size:
+            break
+    report['seconds'] = round(time.perf_counter() - start, 3)
+    return report
+
+def validate_layers(shapefile_paths):
+    """
+    Valida varias capas en paralelo en el pool de procesos de importación
+    
+    Args:
+        shapefile_paths: Rutas de los shapefiles
+        
+    Returns:
+        list: Un informe por capa, en el mismo orden (con 'error' si no se pudo leer)
+    """
+    if len(shapefile_paths) == 1:
+        futures = None
+    else:
+        pool = get_import_pool()
+        futures = [pool.submit(validate_layer, path) for path in shapefile_paths]
+    
+    reports = []
+    for index, path in enumerate(shapefile_paths):
+        try:
+            report = futures[index].result() if futures else validate_layer(path)
+        except Exception as e:
+            print(f"⚠️ No se pudieron validar las geometrías de {path}: {str(e)}")
+            report = {'error': str(e)}
+        reports.append(report)
+    log_validation(shapefile_paths, reports)
+    return reports
+
+def log_validation(names, reports):
+    """
+    Resume en el registro los informes de validación de geometrías
+    
+    Args:
+        names: Nombre o ruta de cada capa
+        reports: Informes de validación, en el mismo orden
+    """
+    for name, report in zip(names, reports):
+        if not report or report.get('error'):
+            continue
+        if not report['invalid']:
+            print(f"✅ {name}: {report['features']} geometrías válidas "
+                  f"({report['null']} nulas, {report['empty']} vacías)")
+            continue
+        reasons = ', '.join(f"{reason}: {count}" for reason, count in
+                            sorted(report['reasons'].items(), key=lambda item: -item[1]))
+        print(f"⚠️ {name}: {report['invalid']} de {report['features']} geometrías inválidas ({reasons}); "
+              f"bbox {report['bbox']}")
+
+def build_geoserver_urls(table_name):
+    """
+    Construye las URLs de acceso WMS/WFS de una capa publicada
+    
+    Args:
+        table_name: Nombre de la capa
+        
+    Returns:
+        dict: URLs wms, wfs, preview y export (descarga en streaming desde el backend)
+    """
+    return {
+        'wms': f"{GEOSERVER_URL}/{WORKSPACE}/wms?service=WMS&version=1.1.1&request=GetMap&layers={WORKSPACE}:{table_name}",
+        'wfs': f"{GEOSERVER_URL}/{WORKSPACE}/wfs?service=WFS&version=1.0.0&request=GetFeature&typeName={WORKSPACE}:{table_name}",
+        'preview': f"{GEOSERVER_URL}/{WORKSPACE}/wms?service=WMS&version=1.1.1&request=GetMap&layers={WORKSPACE}:{table_name}&width=800&height=600&srs=EPSG:4326&bbox=-180,-90,180,90&format=application/openlayers",
+        'export': f"/api/layers/{table_name}/export?format=geojson"
+    }
+
+def process_shapefile_zip(source):
+    """
+    Procesa todos los shapefiles contenidos en un archivo ZIP o en un directorio ya extraído.
+    Si se recibe la ruta del ZIP, los shapefiles se leen directamente desde el archivo
+    comprimido mediante /vsizip/ de GDAL, sin extraerlos a disco.
+    Las capas se importan en paralelo y se publican en GeoServer en un solo lote.
+    
+    Args:
+        source: Ruta del archivo ZIP o directorio con los archivos extraídos
+        
+    Returns:
+        dict: Resultado de la operación, con el detalle de cada capa en 'layers'
+    """
+    try:
+        from_zip = os.path.isfile(source)
+        extract_dir = None if from_zip else source
+        
+        if from_zip:
+            print(f"Procesando ZIP con shapefiles sin extraer: {source}")
+            try:
+                shapefile_paths = [vsizip_path(source, member) for member in find_shapefiles_in_zip(source)]
+            except zipfile.BadZipFile:
+                return {'success': False, 'error': 'El archivo ZIP es inválido o está corrupto'}
+        else:
+            print(f"Procesando directorio con shapefiles: {extract_dir}")
+            shapefile_paths = find_shapefiles_in_dir(extract_dir)
         
-        # Buscar la ruta completa del shapefile
-        shapefile_paths = glob.glob(os.path.join(extract_dir, "**/*.shp"), recursive=True)
         if not shapefile_paths:
-            return {'success': False, 'error': 'No se pudo encontrar la ruta del shapefile'}
-            
-        shapefile_path = shapefile_paths[0]
-        print(f"Ruta del shapefile: {shapefile_path}")
+            print("❌ No se encontró ningún archivo shapefile (.shp) en el ZIP")
+            return {'success': False, 'error': 'No se encontró ningún archivo shapefile (.shp) en el ZIP'}
         
-        # Leer el shapefile y guardarlo en PostGIS
-        print(f"Leyendo shapefile con GeoPandas...")
-        gdf = gpd.read_file(shapefile_path)
-        table_name = shapefile_name  # Usar el nombre del shapefile como nombre de tabla
+        layers = assign_table_names(shapefile_paths)
+        print(f"Shapefiles encontrados: {len(layers)} ({', '.join(table for _, table in layers)})")
         
-        print(f"GeoDataFrame creado con {len(gdf)} registros. Importando a PostGIS como tabla: {table_name}")
+        # Comparar con el manifiesto de cargas: solo se importan las capas que cambiaron
+        archive_hash = hash_file(source) if from_zip else None
+        plans = plan_layers(layers)
         
-        # Usar SQLAlchemy engine en lugar de conexión psycopg2 directa
-        engine = get_sqlalchemy_engine()
+        # Importar a PostGIS en paralelo las capas nuevas o modificadas
+        layer_results = import_planned_layers(layers, plans, import_shapefile_gdf)
+        imported = [layer['table_name'] for layer in layer_results if layer['success']]
+        changed = [layer['table_name'] for layer in layer_results
+                   if layer['success'] and layer['action'] != 'unchanged']
         
-        # Asegurarnos que la tabla se crea correctamente
-        try:
-            # Si estamos teniendo problemas con to_postgis(), podemos intentar primero con to_file para GeoJSON y luego cargar
-            print(f"Importando directamente a PostGIS...")
-            gdf.to_postgis(
-                table_name, 
-                engine, 
-                if_exists='replace', 
-                index=False, 
-                schema='public',
-                dtype=None  # Dejar que GeoPandas infiera los tipos
-            )
-        except Exception as postgis_error:
-            print(f"❌ Error al importar directamente a PostGIS: {str(postgis_error)}")
-            # Método alternativo: guardar como GeoJSON y luego cargar
-            print("⚠️ Intentando método alternativo via GeoJSON...")
-            geojson_path = os.path.join(extract_dir, f"{shapefile_name}.geojson")
-            gdf.to_file(geojson_path, driver="GeoJSON")
-            
-            # Ahora cargar el GeoJSON
-            gdf_reloaded = gpd.read_file(geojson_path)
-            gdf_reloaded.to_postgis(table_name, engine, if_exists='replace', index=False)
-            print("✅ Importación via GeoJSON completada")
+        if not imported:
+            return {
+                'success': False,
+                'error': layer_results[0]['error'] if len(layer_results) == 1 else 'No se pudo importar ninguna capa del ZIP',
+                'layers': layer_results
+            }
         
         print("✅ Datos importados correctamente a PostGIS")
+        log_validation([layer['table_name'] for layer in layer_results],
+                       [layer.get('validation') for layer in layer_results])
+        for table_name in changed:
+            invalidate_layer(table_name)
+        try:
+            record_layers(layer_results, archive_hash)
+        except Exception as e:
+            print(f"⚠️ No se pudo actualizar el manifiesto de cargas: {str(e)}")
         
-        # Publicar automáticamente en GeoServer
-        publish_success = publish_layer_to_geoserver(table_name)
+        # Publicar automáticamente en GeoServer todas las capas importadas
+        published = publish_layers_to_geoserver(imported)
+        for layer in layer_results:
+            layer['published'] = published.get(layer['table_name'], False)
+            if layer['published']:
+                layer['geoserver_urls'] = build_geoserver_urls(layer['table_name'])
         
+        # La primera capa importada se mantiene en los campos principales por compatibilidad
+        table_name = imported[0]
         result = {
             'success': True, 
-            'table_name': table_name
+            'table_name': table_name,
+            'layers': layer_results
         }
         
-        if publish_success:
-            # Añadir URLs para acceder a la capa en GeoServer
-            result['message'] = f'Capa {table_name} importada y publicada con éxito en GeoServer'
-            result['geoserver_urls'] = {
-                'wms': f"{GEOSERVER_URL}/{WORKSPACE}/wms?service=WMS&version=1.1.1&request=GetMap&layers={WORKSPACE}:{table_name}",
-                'wfs': f"{GEOSERVER_URL}/{WORKSPACE}/wfs?service=WFS&version=1.0.0&request=GetFeature&typeName={WORKSPACE}:{table_name}",
-                'preview': f"{GEOSERVER_URL}/{WORKSPACE}/wms?service=WMS&version=1.1.1&request=GetMap&layers={WORKSPACE}:{table_name}&width=800&height=600&srs=EPSG:4326&bbox=-180,-90,180,90&format=application/openlayers"
-            }
+        published_count = sum(1 for name in imported if published.get(name))
+        if published.get(table_name):
+            result['geoserver_urls'] = build_geoserver_urls(table_name)
+        
+        if len(layer_results) == 1:
+            if published_count:
+                result['message'] = f'Capa {table_name} importada y publicada con éxito en GeoServer'
+            else:
+                result['message'] = f'Capa {table_name} importada con éxito. Advertencia: No se pudo publicar en GeoServer'
         else:
-            result['message'] = f'Capa {table_name} importada con éxito. Advertencia: No se pudo publicar en GeoServer'
+            result['message'] = (f'{len(imported)} de {len(layer_results)} capas importadas; '
+                                 f'{published_count} publicadas en GeoServer')
         
         # Eliminar el directorio del shapefile después de una importación exitosa
-        try:
-            import shutil
-            shutil.rmtree(extract_dir)
-            print(f"🧹 Directorio temporal de shapefile eliminado: {extract_dir}")
+        # (al leer directamente del ZIP no se crea ningún directorio)
+        if extract_dir:
+            try:
+                shutil.rmtree(extract_dir)
+                print(f"🧹 Directorio temporal de shapefile eliminado: {extract_dir}")
+                result['cleaned_directory'] = True
+            except Exception as cleanup_error:
+                print(f"⚠️ No se pudo eliminar el directorio temporal: {str(cleanup_error)}")
+                result['cleaned_directory'] = False
+        else:
             result['cleaned_directory'] = True
-        except Exception as cleanup_error:
-            print(f"⚠️ No se pudo eliminar el directorio temporal: {str(cleanup_error)}")
-            result['cleaned_directory'] = False
             
         return result
             
@@ -247,106 +601,46 @@ def publish_layer_to_geoserver(table_name):
     Returns:
         bool: True si la publicación fue exitosa, False en caso contrario
     """
-    try:
-        print(f"🔄 Iniciando publicación de capa {table_name} en GeoServer...")
-        
-        # 1. Crear el DataStore si no existe (una sola vez)
-        datastore_payload = {
-            "dataStore": {
-                "name": "postgis_store",  # Usar un store fijo para todas las capas
-                "connectionParameters": {
-                    "entry": [
-                        {"@key": "host", "$": DB_CONFIG['host']},
-                        {"@key": "port", "$": str(DB_CONFIG['port'])},  # Asegurar que sea string
-                        {"@key": "database", "$": DB_CONFIG['dbname']},
-                        {"@key": "user", "$": DB_CONFIG['user']},
-                        {"@key": "passwd", "$": DB_CONFIG['password']},
-                        {"@key": "dbtype", "$": "postgis"},
-                        {"@key": "schema", "$": "public"},
-                        {"@key": "Expose primary keys", "$": "true"}
-                    ]
-                }
-            }
-        }
-
-        headers = {"Content-Type": "application/json"}
+    return publish_layers_to_geoserver([table_name]).get(table_name, False)
 
-        datastore_url = f"{GEOSERVER_URL}/rest/workspaces/{WORKSPACE}/datastores"
+def publish_layers_to_geoserver(table_names):
+    """
+    Publica un lote de capas de PostGIS en GeoServer mediante el cliente REST compartido.
+    El DataStore se verifica una sola vez para todo el lote (y se cachea entre lotes).
+    
+    Args:
+        table_names: Nombres de las tablas en PostGIS
         
-        # Verificar si el datastore ya existe
-        print(f"👉 Verificando si existe el datastore 'postgis_store'...")
-        check_ds = requests.get(
-            f"{datastore_url}/postgis_store",
-            auth=(GEOSERVER_USER, GEOSERVER_PASSWORD)
-        )
+    Returns:
+        dict: Para cada tabla, True si quedó publicada y False en caso contrario
+    """
+    published = {name: False for name in table_names}
+    try:
+        print(f"🔄 Iniciando publicación de {len(table_names)} capa(s) en GeoServer...")
+        client = get_geoserver_client()
         
-        # Si no existe, crearlo
-        if check_ds.status_code != 200:
-            print(f"🆕 El datastore no existe. Creando nuevo datastore...")
-            ds_response = requests.post(
-                datastore_url,
-                auth=(GEOSERVER_USER, GEOSERVER_PASSWORD),
-                headers=headers,
-                json=datastore_payload
-            )
-
-            if ds_response.status_code not in [200, 201]:
-                print(f"❌ Error al crear DataStore: {ds_response.status_code} - {ds_response.text}")
-                return False
-            else:
-                print(f"✅ DataStore creado correctamente")
-        else:
-            print(f"✅ DataStore existente encontrado")
+        # 1. Crear el workspace y el DataStore si no existen (una sola vez para todo el lote)
+        client.ensure_datastore()
         
-        # 2. Publicar la capa
-        layer_url = f"{GEOSERVER_URL}/rest/workspaces/{WORKSPACE}/datastores/postgis_store/featuretypes"
-
-        # Verificar si la capa ya existe
-        print(f"👉 Verificando si la capa '{table_name}' ya existe...")
-        check_layer = requests.get(
-            f"{layer_url}/{table_name}",
-            auth=(GEOSERVER_USER, GEOSERVER_PASSWORD)
-        )
+        # 2. Publicar las capas
+        for table_name in table_names:
+            try:
+                client.publish_featuretype(table_name)
+                published[table_name] = True
+                
+                # Añadir información sobre cómo acceder a la capa
+                urls = build_geoserver_urls(table_name)
+                print(f"📍 URL de acceso WMS: {urls['wms']}")
+                print(f"📍 URL de acceso WFS: {urls['wfs']}")
+            except Exception as e:
+                print(f"❌ Error al publicar la capa {table_name}: {str(e)}")
         
-        # Si la capa existe, podemos actualizar o saltar
-        if check_layer.status_code == 200:
-            print(f"⚠️ La capa {table_name} ya existe en GeoServer. Se mantendrá la configuración actual.")
-            return True
-
-        print(f"👉 Publicando capa '{table_name}'...")
-        publish_payload = {
-            "featureType": {
-                "name": table_name,
-                "nativeName": table_name,
-                "title": table_name.replace("_", " ").title(),
-                "srs": "EPSG:4326",
-                "enabled": True
-            }
-        }
-
-        publish_response = requests.post(
-            layer_url,
-            auth=(GEOSERVER_USER, GEOSERVER_PASSWORD),
-            headers=headers,
-            json=publish_payload
-        )
-
-        if publish_response.status_code in [200, 201]:
-            print(f"✅ Capa {table_name} publicada en GeoServer correctamente.")
-            
-            # Añadir información sobre cómo acceder a la capa
-            wms_url = f"{GEOSERVER_URL}/{WORKSPACE}/wms?service=WMS&version=1.1.1&request=GetMap&layers={WORKSPACE}:{table_name}"
-            wfs_url = f"{GEOSERVER_URL}/{WORKSPACE}/wfs?service=WFS&version=1.0.0&request=GetFeature&typeName={WORKSPACE}:{table_name}"
-            print(f"📍 URL de acceso WMS: {wms_url}")
-            print(f"📍 URL de acceso WFS: {wfs_url}")
-            
-            return True
-        else:
-            print(f"❌ Error al publicar la capa {table_name}: {publish_response.status_code} - {publish_response.text}")
-            return False
+        # 3. Estilo por escalas para las capas con geometrías generalizadas
+        publish_styles([name for name, ok in published.items() if ok], client)
+        
+        return published
             
     except Exception as e:
         print(f"❌ Error en la publicación en GeoServer: {str(e)}")
-        import traceback
         traceback.print_exc()
-        return False
+        return published
@@ -1,6 +1,5 @@
-import psycopg2
 from psycopg2.extras import RealDictCursor
-from config import DB_CONFIG  # Reutilizar la configuración existente
+from app.database import get_connection  # Pool de conexiones compartido con el resto del backend
 
 def get_data_from_db(query, params=None):
     """
@@ -14,18 +13,15 @@ def get_data_from_db(query, params=None):
         list: Resultados de la consulta o None si hay error
     """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-            
-        results = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return results
+        # La conexión se toma del pool y se devuelve al salir del bloque
+        with get_connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                    
+                return cursor.fetchall()
     except Exception as e:
         print("Error en consulta DB:", e)
         return None
@@ -0,0 +1,50 @@
+"""
+Configuración de gunicorn para servir el GeoportalSV en producción.
+
+Uso:
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Los valores por defecto están en SERVER_CONFIG (app/config.py) y se pueden
+sobrescribir con variables de entorno, por ejemplo:
+    GEOPORTAL_WORKERS=8 GEOPORTAL_THREADS=16 gunicorn -c gunicorn.conf.py wsgi:app
+
+Se usan workers gthread: cada proceso atiende varias peticiones a la vez con
+hilos, de modo que una subida grande o una exportación en streaming no bloquea
+las consultas de teselas y datos. Las conexiones a PostgreSQL y al GeoServer se
+crean dentro de cada proceso la primera vez que se usan (no se precarga la
+aplicación), así que ningún socket se comparte entre procesos tras el fork.
+"""
+import os
+from app.config import SERVER_CONFIG, DB_POOL_CONFIG
+
+
+def _setting(key):
+    """Valor de SERVER_CONFIG, sobrescrito por la variable de entorno GEOPORTAL_<CLAVE> si existe"""
+    default = SERVER_CONFIG[key]
+    value = os.environ.get(f"GEOPORTAL_{key.upper()}")
+    if value is None:
+        return default
+    return type(default)(value)
+
+
+bind = _setting('bind')
+workers = _setting('workers')
+threads = _setting('threads')
+worker_class = 'gthread'
+timeout = _setting('timeout')
+graceful_timeout = _setting('graceful_timeout')
+keepalive = _setting('keepalive')
+max_requests = _setting('max_requests')
+max_requests_jitter = max_requests // 10
+loglevel = _setting('loglevel')
+preload_app = False
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    connections = workers * (DB_POOL_CONFIG['pool_size'] + DB_POOL_CONFIG['max_overflow'])
+    server.log.info(f"GeoportalSV: {workers} procesos x {threads} hilos en {bind} "
+                    f"(hasta {connections} conexiones a PostgreSQL)")
+    if threads > DB_POOL_CONFIG['pool_size'] + DB_POOL_CONFIG['max_overflow']:
+        server.log.warning("Hay más hilos por proceso que conexiones en el pool: algunas peticiones esperarán conexión")
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+"""
+Prueba de carga del backend con tráfico mixto de lecturas y subidas.
+
+Varios hilos lanzan peticiones durante un tiempo fijo, eligiendo cada vez una
+operación según su peso: catálogo de capas, página de datos, tesela vectorial,
+búsqueda y, con --upload-zip, subida de un shapefile. Al terminar se muestra,
+por operación, el número de peticiones, los errores, el rendimiento (req/s) y
+las latencias p50/p95/p99. Sirve para comparar el servidor de desarrollo
+(python run.py) con gunicorn (gunicorn -c gunicorn.conf.py wsgi:app).
+
+Uso:
+    python loadtest.py --url http://localhost:5000 --duration 60 --concurrency 16 \
+        [--layer municipios] [--upload-zip datos.zip --upload-weight 1 --fresh-uploads]
+
+Con --fresh-uploads cada subida cambia el nombre del shapefile (loadtest_<n>) para
+que se importe de verdad en lugar de reconocerse como un ZIP ya cargado; las capas
+creadas se eliminan al terminar con /api/layers/bulk-delete.
+"""
+import argparse
+import io
+import math
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+import zipfile
+import requests
+
+# Peso relativo de cada operación de lectura
+READ_WEIGHTS = {'catalog': 2, 'data': 4, 'tile': 8, 'search': 2}
+
+# Zooms de las teselas pedidas
+TILE_ZOOMS = range(5, 11)
+
+# Segundos máximos por petición
+REQUEST_TIMEOUT = 120
+
+
+def percentile(values, fraction):
+    """Percentil de una lista ordenada (interpolación al más cercano)"""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))
+    return values[index]
+
+
+def tile_for(extent, zoom):
+    """Tesela aleatoria dentro de una extensión en EPSG:4326"""
+    minx, miny, maxx, maxy = extent
+    lon = random.uniform(minx, maxx)
+    lat = max(min(random.uniform(miny, maxy), 85.0), -85.0)
+    n = 2 ** zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def renamed_zip(data, prefix):
+    """
+    Copia en memoria de un ZIP con los shapefiles renombrados a <prefix>_<nombre>,
+    para que cada subida cree una capa nueva
+
+    Returns:
+        bytes: Contenido del nuevo ZIP
+    """
+    output = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(data)) as source, zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as target:
+        for member in source.infolist():
+            if member.is_dir():
+                continue
+            folder, name = os.path.split(member.filename)
+            target.writestr(os.path.join(folder, f"{prefix}_{name}"), source.read(member))
+    return output.getvalue()
+
+
+class LoadTest:
+    """Estado compartido por los hilos de la prueba"""
+
+    def __init__(self, args, layer):
+        self.args = args
+        self.url = args.url.rstrip('/')
+        self.layer = layer
+        self.results = {}
+        self.lock = threading.Lock()
+        self.upload_count = 0
+        self.upload_data = None
+        self.job_ids = []
+        if args.upload_zip:
+            with open(args.upload_zip, 'rb') as f:
+                self.upload_data = f.read()
+
+        weights = dict(READ_WEIGHTS)
+        if not layer:
+            weights.pop('data')
+            weights.pop('tile')
+        if self.upload_data:
+            weights['upload'] = args.upload_weight
+        self.operations = list(weights)
+        self.weights = [weights[name] for name in self.operations]
+
+    def record(self, operation, seconds, ok):
+        with self.lock:
+            latencies, errors = self.results.setdefault(operation, ([], [0]))
+            latencies.append(seconds)
+            if not ok:
+                errors[0] += 1
+
+    def request(self, session, operation):
+        """Ejecuta una operación; devuelve True si la respuesta fue correcta"""
+        layer = self.layer
+        if operation == 'catalog':
+            response = session.get(f"{self.url}/api/layers/", timeout=REQUEST_TIMEOUT)
+        elif operation == 'data':
+            response = session.get(f"{self.url}/api/layers/{layer['name']}/data", params={'limit': 100},
+                                   timeout=REQUEST_TIMEOUT)
+        elif operation == 'tile':
+            zoom = random.choice(TILE_ZOOMS)
+            x, y = tile_for(layer['extent'] or [-180, -85, 180, 85], zoom)
+            response = session.get(f"{self.url}/api/tiles/{layer['name']}/{zoom}/{x}/{y}.pbf", timeout=REQUEST_TIMEOUT)
+        elif operation == 'search':
+            response = session.get(f"{self.url}/api/search/", params={'q': random.choice(self.args.search_terms)},
+                                   timeout=REQUEST_TIMEOUT)
+        else:
+            data = self.upload_data
+            if self.args.fresh_uploads:
+                with self.lock:
+                    self.upload_count += 1
+                    number = self.upload_count
+                data = renamed_zip(data, f"loadtest_{number}_{uuid.uuid4().hex[:6]}")
+            response = session.post(f"{self.url}/api/upload-shapefile",
+                                    files={'file': ('loadtest.zip', data, 'application/zip')},
+                                    timeout=REQUEST_TIMEOUT)
+            if response.status_code == 202:
+                with self.lock:
+                    self.job_ids.append(response.json()['job_id'])
+        # Leer el cuerpo completo para medir también la transferencia
+        response.content
+        return response.status_code < 400
+
+    def worker(self, deadline):
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            operation = random.choices(self.operations, self.weights)[0]
+            start = time.perf_counter()
+            try:
+                ok = self.request(session, operation)
+            except requests.RequestException:
+                ok = False
+            self.record(operation, time.perf_counter() - start, ok)
+
+    def run(self):
+        deadline = time.monotonic() + self.args.duration
+        threads = [threading.Thread(target=self.worker, args=(deadline,), daemon=True)
+                   for _ in range(self.args.concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+    def report(self, elapsed):
+        print(f"\n{'operación':<10} {'peticiones':>10} {'errores':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        all_latencies = []
+        all_errors = 0
+        for operation in sorted(self.results):
+            latencies, errors = self.results[operation]
+            latencies.sort()
+            all_latencies += latencies
+            all_errors += errors[0]
+            self._row(operation, latencies, errors[0], elapsed)
+        all_latencies.sort()
+        self._row('total', all_latencies, all_errors, elapsed)
+
+    def wait_jobs(self, timeout=600):
+        """
+        Espera a que terminen los trabajos de ingesta encolados durante la prueba
+        y muestra cuántos se completaron y su duración media
+        """
+        deadline = time.monotonic() + timeout
+        pending = list(self.job_ids)
+        finished = []
+        while pending and time.monotonic() < deadline:
+            for job_id in list(pending):
+                try:
+                    job = requests.get(f"{self.url}/api/jobs/{job_id}", timeout=30).json()['data']
+                except (requests.RequestException, ValueError, KeyError):
+                    continue
+                if job and job['status'] in ('completed', 'failed'):
+                    pending.remove(job_id)
+                    finished.append(job)
+            if pending:
+                time.sleep(2)
+
+        completed = [job for job in finished if job['status'] == 'completed']
+        durations = [job['duration'] for job in completed if job.get('duration') is not None]
+        average = f"{sum(durations) / len(durations):.1f}s" if durations else '-'
+        print(f"\nTrabajos de ingesta: {len(self.job_ids)} encolados, {len(completed)} completados, "
+              f"{len(finished) - len(completed)} fallidos, {len(pending)} sin terminar (duración media {average})")
+
+    @staticmethod
+    def _row(name, latencies, errors, elapsed):
+        def ms(value):
+            return f"{value * 1000:.0f}" if value is not None else '-'
+        print(f"{name:<10} {len(latencies):>10} {errors:>8} {len(latencies) / elapsed:>8.1f} "
+              f"{ms(percentile(latencies, 0.5)):>8} {ms(percentile(latencies, 0.95)):>8} {ms(percentile(latencies, 0.99)):>8}")
+
+
+def pick_layer(url, name=None):
+    """
+    Capa usada para las peticiones de datos y teselas (la indicada o la primera del catálogo)
+
+    Returns:
+        dict: Entrada del catálogo o None si no hay capas
+    """
+    response = requests.get(f"{url}/api/layers/", timeout=30)
+    response.raise_for_status()
+    layers = response.json()['data']['layers']
+    if name:
+        return next((layer for layer in layers if layer['name'] == name), None)
+    return next((layer for layer in layers if layer['geometry_column']), None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga con tráfico mixto de lecturas y subidas")
+    parser.add_argument('--url', default='http://localhost:5000', help="URL base del backend")
+    parser.add_argument('--duration', type=int, default=60, help="Segundos de prueba (por defecto 60)")
+    parser.add_argument('--concurrency', type=int, default=16, help="Clientes simultáneos (por defecto 16)")
+    parser.add_argument('--layer', help="Capa para datos y teselas (por defecto la primera del catálogo)")
+    parser.add_argument('--search-terms', default='san,santa,norte,valle',
+                        type=lambda value: [term for term in value.split(',') if term],
+                        help="Términos de búsqueda separados por comas")
+    parser.add_argument('--upload-zip', help="ZIP con shapefiles para incluir subidas en la mezcla")
+    parser.add_argument('--upload-weight', type=int, default=1,
+                        help=f"Peso de las subidas frente a las lecturas {READ_WEIGHTS}")
+    parser.add_argument('--fresh-uploads', action='store_true',
+                        help="Renombrar el shapefile en cada subida para forzar una importación real")
+    args = parser.parse_args()
+
+    url = args.url.rstrip('/')
+    try:
+        layer = pick_layer(url, args.layer)
+    except requests.RequestException as e:
+        print(f"❌ No se pudo consultar el catálogo en {url}: {str(e)}")
+        return 1
+    if args.layer and layer is None:
+        print(f"❌ La capa {args.layer} no existe")
+        return 1
+    if layer is None:
+        print("⚠️ No hay capas: solo se probarán el catálogo, la búsqueda y las subidas")
+
+    test = LoadTest(args, layer)
+    print(f"🔄 {args.concurrency} clientes durante {args.duration}s contra {url} "
+          f"({', '.join(f'{op}={w}' for op, w in zip(test.operations, test.weights))})")
+    elapsed = test.run()
+    test.report(elapsed)
+    if test.job_ids:
+        test.wait_jobs()
+
+    if args.fresh_uploads and test.upload_count:
+        response = requests.post(f"{url}/api/layers/bulk-delete", json={'pattern': 'loadtest_*'}, timeout=300)
+        print(f"🧹 Capas de prueba eliminadas: {response.json().get('message')}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
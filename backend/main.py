@@ -3,8 +3,7 @@ from flask_cors import CORS
 import os
 import uuid
 import zipfile
-import shutil
-from app.utils import process_shapefile_zip
+from app.utils import process_shapefile_zip, find_shapefiles_in_zip
 
 app = Flask(__name__)
 
@@ -17,11 +16,9 @@ CORS(app, resources={r"/*": {
 
 # Directorio para almacenar archivos subidos
 UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads')
-SHAPEFILE_FOLDER = os.path.join(os.getcwd(), 'shapefiles')
 
 # Crear directorios si no existen
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(SHAPEFILE_FOLDER, exist_ok=True)
 
 @app.route('/')
 def index():
@@ -60,32 +57,20 @@ def upload_shapefile():
         # Guardar el archivo ZIP
         file.save(zip_path)
         
-        # Crear directorio para extraer el shapefile
-        extract_dir = os.path.join(SHAPEFILE_FOLDER, str(uuid.uuid4()))
-        os.makedirs(extract_dir, exist_ok=True)
-        
-        # Extraer el archivo ZIP
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(extract_dir)
-        
-        # Verificar que contiene archivos shapefile (.shp)
-        has_shapefile = False
-        for root, _, files in os.walk(extract_dir):
-            for file in files:
-                if file.lower().endswith('.shp'):
-                    has_shapefile = True
-                    break
-            if has_shapefile:
-                break
+        # Verificar que contiene archivos shapefile (.shp) sin extraer el ZIP
+        try:
+            has_shapefile = bool(find_shapefiles_in_zip(zip_path))
+        except zipfile.BadZipFile:
+            os.remove(zip_path)
+            return jsonify({'error': 'El archivo ZIP es inválido o está corrupto', 'success': False}), 400
         
         if not has_shapefile:
             # Limpieza si no hay shapefiles
-            shutil.rmtree(extract_dir, ignore_errors=True)
             os.remove(zip_path)
             return jsonify({'error': 'El archivo ZIP no contiene ningún shapefile (.shp)', 'success': False}), 400
         
-        # Procesar el shapefile y publicar en GeoServer
-        result = process_shapefile_zip(extract_dir)
+        # Procesar el shapefile leyéndolo directamente del ZIP y publicar en GeoServer
+        result = process_shapefile_zip(zip_path)
         
         # Limpiar archivo ZIP original
         os.remove(zip_path)
@@ -97,10 +82,6 @@ def upload_shapefile():
                 'table_name': result.get('table_name', '')
             }
             
-            # Solo incluir la ruta si el directorio no se eliminó
-            if not result.get('cleaned_directory', False):
-                response_data['filepath'] = extract_dir
-            
             # Agregar información de GeoServer si está disponible
             if 'geoserver_urls' in result:
                 response_data['geoserver'] = result['geoserver_urls']
@@ -6,7 +6,7 @@ sudo systemctl stop geoportal
 # Aplicar los cambios
 cd /var/www/GeoportalSV/backend
 source venv/bin/activate
-pip install flask flask-cors
+pip install -r requirements.txt
 
 # Reiniciar el servicio
 sudo systemctl start geoportal
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 """
-Script para ejecutar la aplicación Flask del GeoportalSV
+Script para ejecutar la aplicación Flask del GeoportalSV con el servidor de desarrollo.
+En producción se usa gunicorn: gunicorn -c gunicorn.conf.py wsgi:app
 """
 from app import create_app
 from cors_middleware import setup_cors_middleware
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""
+Genera por adelantado las teselas vectoriales de una capa y las guarda en la caché en disco.
+
+Uso:
+    python seed_tiles.py <capa> --min-zoom 0 --max-zoom 12 [--bbox minx,miny,maxx,maxy] [--columns a,b] [--workers 4]
+"""
+import argparse
+import sys
+from app.postgis import get_layer_info, parse_columns, parse_bbox, LayerQueryError
+from app.tilecache import seed_layer
+from app.config import TILES_CONFIG
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera la caché de teselas MVT de una capa")
+    parser.add_argument('layer', help="Nombre de la capa (tabla en PostGIS)")
+    parser.add_argument('--min-zoom', type=int, default=0, help="Zoom inicial (por defecto 0)")
+    parser.add_argument('--max-zoom', type=int, default=12, help="Zoom final, incluido (por defecto 12)")
+    parser.add_argument('--bbox', help="minx,miny,maxx,maxy en EPSG:4326 (por defecto la extensión de la capa)")
+    parser.add_argument('--columns', help="Columnas de atributos separadas por comas (por defecto la clave primaria)")
+    parser.add_argument('--workers', type=int, default=4, help="Teselas que se generan a la vez")
+    args = parser.parse_args()
+
+    if not 0 <= args.min_zoom <= args.max_zoom <= TILES_CONFIG['max_zoom']:
+        print(f"❌ El rango de zooms debe estar entre 0 y {TILES_CONFIG['max_zoom']}")
+        return 1
+
+    info = get_layer_info(args.layer)
+    if info is None or not info['geometry_column']:
+        print(f"❌ La capa {args.layer} no existe o no tiene geometría")
+        return 1
+
+    try:
+        if args.columns:
+            columns = parse_columns(args.columns, info)
+        else:
+            columns = [info['primary_key']] if info['primary_key'] else []
+        bbox = parse_bbox(args.bbox)
+    except LayerQueryError as e:
+        print(f"❌ {str(e)}")
+        return 1
+
+    print(f"🔄 Generando teselas de {args.layer} (zoom {args.min_zoom}-{args.max_zoom})")
+    report = seed_layer(info, args.min_zoom, args.max_zoom, columns,
+                        bbox=bbox[:4] if bbox else None, workers=args.workers)
+    if report['bbox'] is None:
+        print(f"⚠️ La capa {args.layer} está vacía, no hay teselas que generar")
+        return 0
+
+    total = sum(sum(counts.values()) for counts in report['zooms'].values())
+    print(f"✅ {total} teselas procesadas en {report['duration']}s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
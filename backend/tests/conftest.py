@@ -0,0 +1,10 @@
+"""
+Configuración de pytest: permite importar el paquete app al ejecutar las pruebas
+desde cualquier directorio (python -m pytest backend/tests).
+Las pruebas solo cubren funciones puras; no necesitan PostgreSQL ni GeoServer.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,21 @@
+"""Utilidades compartidas por las pruebas"""
+
+from psycopg2 import sql
+
+
+def render(query):
+    """SQL compuesto como texto, sin conexión (los identificadores entre comillas dobles)"""
+    if isinstance(query, sql.Composed):
+        return ''.join(render(part) for part in query.seq)
+    if isinstance(query, sql.Identifier):
+        return '.'.join('"' + name.replace('"', '""') + '"' for name in query.strings)
+    if isinstance(query, sql.Literal):
+        return repr(query.wrapped)
+    if isinstance(query, sql.Placeholder):
+        return f"%({query.name})s" if query.name else '%s'
+    return query.string
+
+
+def normalize(text):
+    """Texto con los espacios y saltos de línea reducidos a un espacio"""
+    return ' '.join(text.split())
@@ -0,0 +1,105 @@
+"""Pruebas del índice incremental de app.catalog (PostgreSQL y GeoServer sustituidos)"""
+
+import contextlib
+import json
+from types import SimpleNamespace
+import pytest
+from app import catalog
+from app.config import CATALOG_CONFIG, GEOSERVER_CONFIG
+from app.loader import staging_name
+
+
+def _row(name, oid, reltuples=100, extent=(-90.1, 13.2, -87.7, 14.4)):
+    return (name, 'geom', 'MULTIPOLYGON', 32616, oid, reltuples, *extent)
+
+
+class _Database:
+    """Tablas de geometry_columns: {nombre: fila de _LAYER_QUERY}; registra las capas descritas"""
+
+    def __init__(self, rows):
+        self.rows = {row[0]: row for row in rows}
+        self.described = []
+
+    def cursor(self):
+        return _Cursor(self)
+
+
+class _Cursor:
+    def __init__(self, database):
+        self.database = database
+        self.result = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, query, params=None):
+        if params is None:
+            self.result = [(name, row[4]) for name, row in self.database.rows.items()]
+        else:
+            self.database.described.append(sorted(params[0]))
+            self.result = [self.database.rows[name] for name in params[0]]
+
+    def fetchall(self):
+        return self.result
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = _Database([_row('municipios', 1), _row('rios', 2), _row(staging_name('rios'), 3)])
+    monkeypatch.setattr(catalog, 'get_connection', lambda: contextlib.nullcontext(database))
+    monkeypatch.setattr(catalog, 'get_geoserver_client',
+                        lambda: SimpleNamespace(featuretypes=lambda: {'municipios'}))
+    monkeypatch.setattr(catalog, '_index', {})
+    monkeypatch.setattr(catalog, '_dirty', set())
+    monkeypatch.setattr(catalog, '_state', dict(catalog._state, checked_at=0.0, generation=0, body=None))
+    monkeypatch.setitem(CATALOG_CONFIG, 'check_seconds', 0)
+    return database
+
+
+def _layers(body):
+    return {layer['name']: layer for layer in json.loads(body)['data']['layers']}
+
+
+def test_entry_without_statistics():
+    entry = catalog._entry(_row('rios', 7, reltuples=-1, extent=(None, None, None, None)))
+    assert entry['full_name'] == f"{GEOSERVER_CONFIG['workspace']}:rios"
+    assert entry['rows_estimate'] is None
+    assert entry['extent'] is None
+
+
+def test_catalog_skips_staging_tables_and_marks_published(database):
+    body, _ = catalog.get_catalog()
+    layers = _layers(body)
+    assert sorted(layers) == ['municipios', 'rios']
+    assert layers['municipios']['published'] is True
+    assert layers['rios']['published'] is False
+    assert '_oid' not in layers['rios']
+
+
+def test_catalog_reuses_body_while_nothing_changes(database):
+    first = catalog.get_catalog()
+    assert catalog.get_catalog() == first
+    assert database.described == [['municipios', 'rios']]
+
+
+def test_catalog_reloads_only_changed_layers(database):
+    _, etag = catalog.get_catalog()
+    database.rows['rios'] = _row('rios', 20, reltuples=500)  # Se volvió a subir: nuevo OID
+    del database.rows['municipios']
+    body, new_etag = catalog.get_catalog()
+
+    assert database.described[-1] == ['rios']
+    assert new_etag != etag
+    layers = _layers(body)
+    assert list(layers) == ['rios']
+    assert layers['rios']['rows_estimate'] == 500
+
+
+def test_catalog_reloads_invalidated_layers(database):
+    catalog.get_catalog()
+    catalog._mark_dirty('municipios')
+    catalog.get_catalog()
+    assert database.described[-1] == ['municipios']
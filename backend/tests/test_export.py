@@ -0,0 +1,51 @@
+"""Pruebas de las funciones puras de app.export"""
+
+import gzip
+import pyarrow as pa
+import pytest
+from psycopg2 import sql
+from helpers import render, normalize
+from app.export import GEOMETRY_ALIAS, _arrow_type, _buffered, _select, gzip_chunks
+
+INFO = {'name': 'distritos', 'geometry_column': 'geom'}
+
+
+def test_select_transforms_geometry_and_applies_conditions():
+    query = _select(INFO, ['id', 'nombre'], "ST_AsText({})", [sql.SQL("id > %s")])
+    assert normalize(render(query)) == (
+        f'SELECT "id", "nombre", ST_AsText(ST_Transform("geom", 4326)) AS "{GEOMETRY_ALIAS}" '
+        'FROM "distritos" WHERE id > %s'
+    )
+
+
+def test_select_without_geometry_column():
+    query = _select(dict(INFO, geometry_column=None), ['id'], "{}", [])
+    assert normalize(render(query)) == f'SELECT "id", NULL::geometry AS "{GEOMETRY_ALIAS}" FROM "distritos"'
+
+
+@pytest.mark.parametrize('column_type, arrow_type', [
+    ('integer', pa.int64()),
+    ('numeric(10,2)', pa.float64()),
+    ('double precision', pa.float64()),
+    ('boolean', pa.bool_()),
+    ('date', pa.date32()),
+    ('timestamp with time zone', pa.timestamp('us', tz='UTC')),
+    ('timestamp without time zone', pa.timestamp('us')),
+    ('character varying', pa.string()),
+])
+def test_arrow_type(column_type, arrow_type):
+    assert _arrow_type(column_type) == arrow_type
+
+
+def test_buffered_groups_pieces_and_encodes_text():
+    chunks = list(_buffered(['ab', b'', 'c', b'de', 'f'], 3))
+    assert chunks == [b'abc', b'def']
+
+
+def test_buffered_flushes_remainder():
+    assert list(_buffered(['ñ'], 10)) == ['ñ'.encode('utf-8')]
+
+
+def test_gzip_chunks_round_trip():
+    data = [b'{"type": "FeatureCollection", ', b'"features": []}\n']
+    assert gzip.decompress(b''.join(gzip_chunks(data, level=1))) == b''.join(data)
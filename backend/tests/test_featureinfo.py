@@ -0,0 +1,24 @@
+"""Pruebas de las funciones puras de app.featureinfo"""
+
+import pytest
+from app import featureinfo
+from app.featureinfo import query_layer, search_window
+
+
+def test_search_window_is_centered_on_the_click():
+    assert search_window(100.0, 200.0, 2.0, 5) == (90.0, 190.0, 110.0, 210.0)
+
+
+def test_search_window_scales_with_resolution():
+    minx, miny, maxx, maxy = search_window(0.0, 0.0, 0.25, 4)
+    assert (maxx - minx, maxy - miny) == pytest.approx((2.0, 2.0))
+
+
+@pytest.mark.parametrize('info', [None, {'geometry_column': None}])
+def test_query_layer_without_geometry(monkeypatch, info):
+    # No se consulta la base de datos si la capa no existe o no tiene geometría
+    monkeypatch.setattr(featureinfo, 'get_layer_info_cached', lambda name: info)
+    result = query_layer('municipios', (0, 0, 1, 1), 3857, 10)
+    assert result['layer'] == 'municipios'
+    assert result['features'] == []
+    assert result['error']
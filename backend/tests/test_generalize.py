@@ -0,0 +1,48 @@
+"""Pruebas de las funciones puras de app.generalize"""
+
+import pytest
+from app.config import GENERALIZE_CONFIG
+from app.generalize import (METERS_PER_DEGREE, TILE_SIZE, ZOOM_0_SCALE, generalized_type, scale_denominator,
+                            zoom_for_resolution, zoom_tolerance)
+from app.tiles import WEB_MERCATOR_WIDTH
+
+
+@pytest.mark.parametrize('geometry_type, srid, expected', [
+    ('MultiPolygon', 32616, 'geometry(MultiPolygon, 32616)'),
+    ('MultiLineStringZ', 4326, 'geometry(MultiLineStringZ, 4326)'),
+    ('Geometry', 4326, 'geometry'),
+    ('MultiPolygon', None, 'geometry'),
+])
+def test_generalized_type_follows_the_source_column(geometry_type, srid, expected):
+    assert generalized_type({'geometry_type': geometry_type, 'srid': srid}) == expected
+
+
+def _resolution(zoom):
+    """Metros por píxel de EPSG:3857 a un zoom"""
+    return WEB_MERCATOR_WIDTH / (TILE_SIZE * 2 ** zoom)
+
+
+@pytest.mark.parametrize('zoom', [0, 5, 10, 18])
+def test_zoom_for_resolution_exact(zoom):
+    assert zoom_for_resolution(_resolution(zoom)) == zoom
+
+
+def test_zoom_for_resolution_rounds_down():
+    assert zoom_for_resolution(_resolution(10) * 1.5) == 9
+    assert zoom_for_resolution(_resolution(10) * 0.9) == 10
+
+
+@pytest.mark.parametrize('resolution', [None, 0, -1, _resolution(0) * 4])
+def test_zoom_for_resolution_never_negative(resolution):
+    assert zoom_for_resolution(resolution) == 0
+
+
+def test_zoom_tolerance():
+    assert zoom_tolerance(0) == pytest.approx(_resolution(0) * GENERALIZE_CONFIG['pixel_tolerance'])
+    assert zoom_tolerance(9) == pytest.approx(zoom_tolerance(8) / 2)
+    assert zoom_tolerance(8, geographic=True) == pytest.approx(zoom_tolerance(8) / METERS_PER_DEGREE)
+
+
+def test_scale_denominator():
+    assert scale_denominator(0) == ZOOM_0_SCALE
+    assert scale_denominator(2.5) == pytest.approx(ZOOM_0_SCALE / 2 ** 2.5)
@@ -0,0 +1,70 @@
+"""Pruebas de la publicación de featuretypes de app.geoserver (sin servidor: se sustituye request)"""
+
+import asyncio
+import httpx
+import requests
+import pytest
+from app.geoserver import AsyncGeoServerClient, GeoServerClient, GeoServerError, DATASTORE_NAME
+
+
+def _response(status_code, text=''):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = text.encode('utf-8')
+    return response
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = GeoServerClient()
+    monkeypatch.setattr(client, 'ensure_datastore', lambda *args: None)
+    return client
+
+
+def test_publish_posts_even_if_cached(client, monkeypatch):
+    # Otro worker eliminó la capa: la caché de este proceso aún la conserva
+    client._cache_put(('featuretypes', client.workspace, DATASTORE_NAME), {'distritos'})
+    calls = []
+    monkeypatch.setattr(client, 'request', lambda method, path, **kwargs: calls.append(method) or _response(201))
+    assert client.publish_featuretype('distritos') is True
+    assert calls == ['POST']
+
+
+@pytest.mark.parametrize('status_code, text', [
+    (409, ''),
+    (500, "Resource named 'distritos' already exists in store: 'postgis'"),
+])
+def test_publish_existing_featuretype_returns_false(client, monkeypatch, status_code, text):
+    monkeypatch.setattr(client, 'request', lambda method, path, **kwargs: _response(status_code, text))
+    assert client.publish_featuretype('distritos') is False
+
+
+def test_publish_error_raises(client, monkeypatch):
+    monkeypatch.setattr(client, 'request', lambda method, path, **kwargs: _response(500, 'error'))
+    with pytest.raises(GeoServerError):
+        client.publish_featuretype('distritos')
+
+
+def test_async_publish_posts_even_if_cached(client):
+    client._cache_put(('featuretypes', client.workspace, DATASTORE_NAME), {'distritos'})
+    async_client = AsyncGeoServerClient(client)
+    calls = []
+
+    async def ensure_datastore(*args):
+        pass
+
+    async def request(method, path, **kwargs):
+        calls.append(method)
+        return httpx.Response(409 if len(calls) > 1 else 201)
+
+    async_client.ensure_datastore = ensure_datastore
+    async_client.request = request
+
+    async def publish_twice():
+        try:
+            return [await async_client.publish_featuretype('distritos') for _ in range(2)]
+        finally:
+            await async_client.http.aclose()
+
+    assert asyncio.run(publish_twice()) == [True, False]
+    assert calls == ['POST', 'POST']
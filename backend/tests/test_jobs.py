@@ -0,0 +1,57 @@
+"""Pruebas de la recuperación de trabajos interrumpidos de app.jobs"""
+
+import subprocess
+import sys
+import uuid
+import pytest
+from app import jobs
+from app.jobs import Job, get_job, recover_interrupted_jobs
+
+
+@pytest.fixture(autouse=True)
+def jobs_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, 'JOBS_FOLDER', str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture(scope='module')
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def _job(status, **data):
+    job = Job(str(uuid.uuid4()))
+    job.data['status'] = status
+    job.data.update(data)
+    job.save()
+    return job.id
+
+
+def test_running_job_of_dead_process_is_failed(dead_pid):
+    job_id = _job('running', pid=dead_pid, current_stage='import',
+                  stages=[{'name': 'import', 'status': 'running'}])
+    assert recover_interrupted_jobs() == [job_id]
+
+    data = get_job(job_id)
+    assert data['status'] == 'failed'
+    assert 'interrumpido' in data['error']
+    assert data['current_stage'] is None
+    assert data['finished_at'] is not None
+    assert data['stages'][0]['status'] == 'failed'
+
+
+def test_queued_job_without_pid_is_failed():
+    job_id = _job('queued', pid=None)
+    assert recover_interrupted_jobs() == [job_id]
+
+
+def test_live_and_finished_jobs_are_kept(dead_pid):
+    live = _job('running')  # Este proceso
+    finished = _job('completed', pid=dead_pid)
+    remote = _job('running', pid=dead_pid, host='otra-maquina')
+    assert recover_interrupted_jobs() == []
+    assert get_job(live)['status'] == 'running'
+    assert get_job(finished)['status'] == 'completed'
+    assert get_job(remote)['status'] == 'running'
@@ -0,0 +1,126 @@
+"""Pruebas de las funciones puras de app.loader"""
+
+import io
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyogrio
+import pytest
+import shapely
+from app.loader import (launder_column_name, derived_name, staging_name, is_staging_table, layer_schema,
+                        read_batches, merge_statements, cast_integer_columns,
+                        MAX_IDENTIFIER_LENGTH, PROBE_BATCH_SIZE)
+from helpers import render, normalize
+
+
+def write_layer(path, rows, nulls):
+    """Capa de puntos con un campo entero 'pob' nulo en las posiciones de nulls"""
+    values = pd.array([None if i in nulls else i for i in range(rows)], dtype='Int64')
+    frame = gpd.GeoDataFrame({'pob': values, 'nombre': [f'n{i}' for i in range(rows)]},
+                             geometry=shapely.points(np.arange(rows), np.arange(rows)), crs=4326)
+    pyogrio.write_dataframe(frame, path, driver='GPKG')
+    return str(path)
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('NOMBRE', 'nombre'),
+    ('Cve Mun', 'cve_mun'),
+    ('área-km²', '_rea_km_'),
+    ('2020_pob', 'col_2020_pob'),
+    ('', 'col_'),
+    (7, 'col_7'),
+])
+def test_launder_column_name(name, expected):
+    assert launder_column_name(name) == expected
+
+
+def test_launder_column_name_truncates_to_identifier_length():
+    assert len(launder_column_name('x' * 100)) == MAX_IDENTIFIER_LENGTH
+
+
+def test_derived_name_keeps_suffix_within_identifier_length():
+    assert derived_name('municipios', '_nombre_trgm_idx') == 'municipios_nombre_trgm_idx'
+    name = derived_name('t' * 70, '_nombre_trgm_idx')
+    assert len(name) == MAX_IDENTIFIER_LENGTH
+    assert name.endswith('_nombre_trgm_idx')
+
+
+def test_staging_name_is_recognized():
+    assert staging_name('municipios') == 'municipios__carga'
+    assert is_staging_table(staging_name('municipios'))
+    assert is_staging_table(staging_name('m' * 70))
+    assert len(staging_name('m' * 70)) == MAX_IDENTIFIER_LENGTH
+    assert not is_staging_table('municipios')
+
+
+def test_layer_schema_keeps_integer_fields_with_nulls(tmp_path):
+    # Con nulos pandas leería 'pob' como float64; el esquema de OGR sigue diciendo entero
+    path = write_layer(tmp_path / 'capa.gpkg', rows=10, nulls={0, 5})
+    assert pyogrio.read_dataframe(path)['pob'].dtype.kind == 'f'
+    assert layer_schema(path) == {'pob': 'bigint', 'nombre': 'text'}
+
+
+def test_read_batches_keeps_integer_dtype_when_nulls_appear_after_probe(tmp_path):
+    rows = PROBE_BATCH_SIZE + 500
+    nulls = set(range(PROBE_BATCH_SIZE + 200, PROBE_BATCH_SIZE + 300))
+    path = write_layer(tmp_path / 'capa.gpkg', rows=rows, nulls=nulls)
+
+    batches = list(read_batches(path, batch_size=400))
+    assert len(batches) > 2
+    assert all(str(batch['pob'].dtype) == 'Int64' for batch in batches)
+
+    values = pd.concat(batch['pob'] for batch in batches)
+    assert [None if pd.isna(value) else value for value in values] == [None if i in nulls else i for i in range(rows)]
+
+    # Lo que llega al CSV de COPY son enteros, nunca "7.0"
+    buffer = io.StringIO()
+    values.to_csv(buffer, header=False, index=False, na_rep='\\N')
+    assert '.0' not in buffer.getvalue()
+    assert buffer.getvalue().count('\\N') == len(nulls)
+
+
+def test_merge_statements_upsert_with_delete_missing():
+    statements = merge_statements('capa', 'capa__merge', 'cve', ['cve', 'nombre', 'geom'],
+                                  mode='upsert', delete_missing=True)
+    assert [action for action, _ in statements] == ['delete', 'update', 'insert']
+    delete, update, insert = (normalize(render(statement)) for _, statement in statements)
+
+    assert delete == ('DELETE FROM "capa" AS t WHERE NOT EXISTS '
+                      '(SELECT 1 FROM "capa__merge" AS s WHERE s."cve" = t."cve")')
+    assert update == ('UPDATE "capa" AS t SET ("cve", "nombre", "geom") = (s."cve", s."nombre", s."geom") '
+                      'FROM "capa__merge" AS s WHERE t."cve" = s."cve" '
+                      'AND (t."cve", t."nombre", t."geom") IS DISTINCT FROM (s."cve", s."nombre", s."geom")')
+    assert insert == ('INSERT INTO "capa" ("cve", "nombre", "geom") '
+                      'SELECT s."cve", s."nombre", s."geom" FROM "capa__merge" AS s '
+                      'WHERE NOT EXISTS (SELECT 1 FROM "capa" AS t WHERE t."cve" = s."cve")')
+
+
+def test_merge_statements_append_only_inserts():
+    statements = merge_statements('capa', 'capa__merge', 'cve', ['cve', 'geom'], mode='append')
+    assert [action for action, _ in statements] == ['insert']
+
+
+def to_csv(frame):
+    buffer = io.StringIO()
+    frame.to_csv(buffer, header=False, index=False, na_rep='\\N')
+    return buffer.getvalue().splitlines()
+
+
+def test_cast_integer_columns_writes_nullable_integers_without_decimals():
+    # Clave y atributo enteros con nulos: pandas los lee como float64
+    frame = pd.DataFrame({'cve': [1.0, None, 3.0], 'pob': [None, 20.0, 30.0], 'nombre': ['a', None, 'c']})
+    cast_integer_columns(frame, {'cve': 'bigint', 'pob': 'integer', 'nombre': 'character varying(80)'})
+
+    assert str(frame['cve'].dtype) == 'Int64'
+    assert str(frame['pob'].dtype) == 'Int64'
+    assert to_csv(frame) == ['1,\\N,a', '\\N,20,\\N', '3,30,c']
+
+
+def test_cast_integer_columns_leaves_other_columns():
+    frame = pd.DataFrame({'area': [1.5, None], 'tasa': [1.0, None], 'pob': [1.5, 2.0]})
+    cast_integer_columns(frame, {'area': 'double precision', 'tasa': 'numeric', 'pob': 'integer'})
+
+    assert frame['area'].dtype.kind == 'f'
+    assert frame['tasa'].dtype.kind == 'f'
+    # Decimales reales: no se redondean en silencio, COPY informará del error
+    assert frame['pob'].dtype.kind == 'f'
@@ -0,0 +1,67 @@
+"""Pruebas del formato de texto de Prometheus de app.metrics"""
+
+import re
+from types import SimpleNamespace
+from app import metrics
+from app.metrics import Counter, Histogram, _labels, count_bytes
+
+
+def test_labels_are_escaped():
+    assert _labels({}) == ''
+    assert _labels({'path': 'a"b\\c\nd'}) == '{path="a\\"b\\\\c\\nd"}'
+
+
+def test_counter_lines():
+    counter = Counter('prueba_total', 'Contador de prueba')
+    counter.inc(2, kind='upload')
+    counter.inc(kind='upload')
+    counter.inc(5, kind='export')
+    assert list(counter.lines()) == [
+        '# HELP prueba_total Contador de prueba',
+        '# TYPE prueba_total counter',
+        'prueba_total{kind="export"} 5',
+        'prueba_total{kind="upload"} 3',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('prueba_seconds', 'Histograma de prueba', [1, 0.1])
+    for value in (0.05, 0.5, 3):
+        histogram.observe(value, stage='load')
+    assert list(histogram.lines())[2:] == [
+        'prueba_seconds_bucket{stage="load",le="0.1"} 1',
+        'prueba_seconds_bucket{stage="load",le="1.0"} 2',
+        'prueba_seconds_bucket{stage="load",le="+Inf"} 3',
+        'prueba_seconds_sum{stage="load"} 3.55',
+        'prueba_seconds_count{stage="load"} 3',
+    ]
+
+
+def test_count_bytes_passes_chunks_through(monkeypatch):
+    counter = Counter('bytes_total', 'Bytes')
+    monkeypatch.setattr(metrics, 'BYTES', counter)
+    assert list(count_bytes([b'abc', b'de'], 'export')) == [b'abc', b'de']
+    assert list(counter.lines())[-1] == 'bytes_total{kind="export"} 5'
+
+
+def test_render(monkeypatch):
+    monkeypatch.setattr(metrics, 'pool_status', lambda: {'pool_size': 5, 'checkouts': 12, 'errors': None})
+    client = SimpleNamespace(stats=lambda: {'requests': 3, 'cached_entries': 2})
+    monkeypatch.setattr(metrics, 'get_geoserver_client', lambda: client)
+    monkeypatch.setattr(metrics, 'cache_stats', lambda: {'hits': 7, 'entries': 1})
+
+    text = metrics.render()
+    assert text.endswith('\n')
+    samples = dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+    assert samples['geoportal_db_pool_pool_size'] == '5.0'
+    assert samples['geoportal_db_pool_checkouts_total'] == '12.0'
+    assert samples['geoportal_geoserver_client_requests_total'] == '3.0'
+    assert samples['geoportal_geoserver_client_cached_entries'] == '2.0'
+    assert samples['geoportal_layer_cache_hits_total'] == '7.0'
+    # Los valores ausentes no se exponen
+    assert not any(name.startswith('geoportal_db_pool_errors') for name in samples)
+
+    # Cada métrica se declara una sola vez y los contadores terminan en _total
+    types = re.findall(r'^# TYPE (\S+) (\S+)$', text, re.MULTILINE)
+    assert len(types) == len({name for name, _ in types})
+    assert all(name.endswith('_total') for name, kind in types if kind == 'counter')
@@ -0,0 +1,69 @@
+"""Pruebas de la interpretación de parámetros y del WHERE de app.postgis"""
+
+import pytest
+from helpers import render
+from app.postgis import LayerQueryError, build_where, parse_bbox, parse_columns, parse_filters
+
+INFO = {
+    'name': 'municipios',
+    'geometry_column': 'geom',
+    'srid': 32616,
+    'columns': [
+        {'name': 'nombre', 'type': 'character varying(80)'},
+        {'name': 'poblacion', 'type': 'integer'},
+        {'name': 'fecha', 'type': 'date'},
+    ]
+}
+
+
+def test_parse_columns():
+    assert parse_columns(None, INFO) == ['nombre', 'poblacion', 'fecha']
+    assert parse_columns(' poblacion, nombre ,', INFO) == ['poblacion', 'nombre']
+    with pytest.raises(LayerQueryError):
+        parse_columns('nombre,area', INFO)
+
+
+def test_parse_bbox():
+    assert parse_bbox(None) is None
+    assert parse_bbox('-90,13,-88,14.5') == (-90.0, 13.0, -88.0, 14.5, 4326)
+    assert parse_bbox('1,2,3,4,32616') == (1.0, 2.0, 3.0, 4.0, 32616)
+
+
+@pytest.mark.parametrize('value', ['1,2,3', '1,2,3,x', '3,2,1,4', '1,2,3,4,5,6'])
+def test_parse_bbox_rejects_invalid(value):
+    with pytest.raises(LayerQueryError):
+        parse_bbox(value)
+
+
+def test_parse_filters():
+    filters = parse_filters(['nombre:LIKE:San:%', 'poblacion:gte:1000', 'nombre:in:A|B', 'fecha:null'], INFO)
+    assert filters == [
+        ('nombre', 'ILIKE', 'San:%'),
+        ('poblacion', '>=', '1000'),
+        ('nombre', 'IN', ['A', 'B']),
+        ('fecha', 'IS NULL', None),
+    ]
+
+
+@pytest.mark.parametrize('value', ['nombre', 'area:eq:1', 'nombre:between:1', 'poblacion:gt'])
+def test_parse_filters_rejects_invalid(value):
+    with pytest.raises(LayerQueryError):
+        parse_filters([value], INFO)
+
+
+def test_build_where():
+    filters = parse_filters(['nombre:like:San%', 'poblacion:gte:1000', 'nombre:in:A|B', 'fecha:notnull'], INFO)
+    conditions, params = build_where(INFO, (1, 2, 3, 4, 4326), filters)
+    assert [render(condition) for condition in conditions] == [
+        '"geom" && ST_Transform(ST_MakeEnvelope(%s, %s, %s, %s, %s), %s)',
+        '"nombre"::text ILIKE %s',
+        '"poblacion" >= %s::integer',
+        '"nombre"::text = ANY(%s)',
+        '"fecha" IS NOT NULL',
+    ]
+    assert params == [1, 2, 3, 4, 4326, 32616, 'San%', '1000', ['A', 'B']]
+
+
+def test_build_where_bbox_requires_geometry():
+    with pytest.raises(LayerQueryError):
+        build_where(dict(INFO, geometry_column=None), (1, 2, 3, 4, 4326))
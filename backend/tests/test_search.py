@@ -0,0 +1,22 @@
+"""Pruebas de las funciones puras de app.search"""
+
+import pytest
+from app.config import SEARCH_CONFIG
+from app.search import SearchError, search, _escape_like
+
+
+def test_escape_like_escapes_wildcards():
+    assert _escape_like('50%_a\\b') == '50\\%\\_a\\\\b'
+
+
+@pytest.mark.parametrize('query', [None, '', '   ', 'a '])
+def test_search_rejects_short_queries(query):
+    with pytest.raises(SearchError):
+        search(query)
+
+
+@pytest.mark.parametrize('limit', [-1, SEARCH_CONFIG['max_limit'] + 1])
+def test_search_rejects_limit_out_of_range(limit):
+    # Se valida antes de consultar la base de datos
+    with pytest.raises(SearchError):
+        search('municipio', limit=limit)
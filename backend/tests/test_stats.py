@@ -0,0 +1,94 @@
+"""Pruebas de las funciones puras y de las consultas de app.stats"""
+
+import contextlib
+import pytest
+from psycopg2 import sql
+from helpers import render, normalize
+from app import stats
+from app.postgis import LayerQueryError
+from app.stats import column_kind, parse_aggregates, aggregate_layer, _source, _where
+
+INFO = {
+    'name': 'municipios',
+    'columns': [
+        {'name': 'depto', 'type': 'character varying(50)'},
+        {'name': 'poblacion', 'type': 'integer'},
+        {'name': 'area', 'type': 'numeric(12,3)'},
+    ]
+}
+
+
+@pytest.mark.parametrize('column_type, kind', [
+    ('bigint', 'numeric'),
+    ('double precision', 'numeric'),
+    ('numeric(12,3)', 'numeric'),
+    ('date', 'temporal'),
+    ('timestamp with time zone', 'temporal'),
+    ('boolean', 'boolean'),
+    ('character varying(50)', 'text'),
+])
+def test_column_kind(column_type, kind):
+    assert column_kind(column_type) == kind
+
+
+def test_parse_aggregates_defaults_to_count():
+    assert parse_aggregates([], INFO) == [('count', None, 'count')]
+
+
+def test_parse_aggregates_maps_functions_and_aliases():
+    assert parse_aggregates(['SUM:poblacion', 'stddev:area'], INFO) == [
+        ('sum', 'poblacion', 'sum_poblacion'),
+        ('stddev_samp', 'area', 'stddev_area'),
+    ]
+
+
+@pytest.mark.parametrize('value', ['median:poblacion', 'sum:desconocida', 'avg:depto', 'max'])
+def test_parse_aggregates_rejects_invalid(value):
+    with pytest.raises(LayerQueryError):
+        parse_aggregates([value], INFO)
+
+
+def test_source_and_where():
+    assert render(_source(INFO, None)) == '"municipios"'
+    assert render(_source(INFO, 5)) == '"municipios" TABLESAMPLE SYSTEM (5.0)'
+    assert render(_where([])) == ''
+    assert render(_where([sql.SQL("a = %s"), sql.SQL("b = %s")])) == ' WHERE a = %s AND b = %s'
+
+
+class _Cursor:
+    def __init__(self, executed):
+        self.executed = executed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, query, params):
+        self.executed.append((normalize(render(query)), params))
+
+    def fetchall(self):
+        return [('Norte', 3, 1500)]
+
+
+class _Connection:
+    def __init__(self, executed):
+        self.executed = executed
+
+    def cursor(self):
+        return _Cursor(self.executed)
+
+
+def test_aggregate_layer_query(monkeypatch):
+    executed = []
+    monkeypatch.setattr(stats, 'get_connection', lambda: contextlib.nullcontext(_Connection(executed)))
+    aggregates = parse_aggregates(['count', 'sum:poblacion'], INFO)
+    groups = aggregate_layer(INFO, ['depto'], aggregates, [sql.SQL("area > %s")], [10], limit=20)
+
+    assert groups == [{'depto': 'Norte', 'count': 3, 'sum_poblacion': 1500}]
+    assert executed == [(
+        'SELECT "depto", count(*) AS "count", sum("poblacion") AS "sum_poblacion" FROM "municipios" '
+        'WHERE area > %s GROUP BY "depto" ORDER BY "count" DESC NULLS LAST LIMIT %s',
+        [10, 20]
+    )]
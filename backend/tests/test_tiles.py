@@ -0,0 +1,40 @@
+"""Pruebas de la aritmética de teselas de app.tiles"""
+
+import pytest
+from app.config import TILES_CONFIG
+from app.tiles import WEB_MERCATOR_WIDTH, TileRequestError, simplify_tolerance, tiles_for_bbox, validate_tile
+
+
+@pytest.mark.parametrize('z, x, y', [(0, 0, 0), (3, 7, 7), (TILES_CONFIG['max_zoom'], 0, 0)])
+def test_validate_tile_accepts(z, x, y):
+    validate_tile(z, x, y)
+
+
+@pytest.mark.parametrize('z, x, y', [(-1, 0, 0), (TILES_CONFIG['max_zoom'] + 1, 0, 0), (3, 8, 0), (3, 0, -1)])
+def test_validate_tile_rejects(z, x, y):
+    with pytest.raises(TileRequestError):
+        validate_tile(z, x, y)
+
+
+def test_tiles_for_bbox_whole_world():
+    assert tiles_for_bbox((-180, -90, 180, 90), 0) == (0, 0, 0, 0)
+    # Las latitudes fuera del rango de Web Mercator se recortan a la última fila
+    assert tiles_for_bbox((-180, -90, 180, 90), 2) == (0, 0, 3, 3)
+
+
+def test_tiles_for_bbox_quadrant():
+    assert tiles_for_bbox((10, 10, 20, 20), 1) == (1, 0, 1, 0)
+    assert tiles_for_bbox((-20, -20, -10, -10), 1) == (0, 1, 0, 1)
+
+
+def test_tiles_for_bbox_el_salvador():
+    # x crece hacia el este; y crece hacia el sur (esquina superior izquierda primero)
+    assert tiles_for_bbox((-90.2, 13.1, -87.6, 14.5), 8) == (63, 117, 65, 118)
+
+
+def test_simplify_tolerance():
+    assert simplify_tolerance(0) == pytest.approx(
+        WEB_MERCATOR_WIDTH / TILES_CONFIG['extent'] * TILES_CONFIG['simplify_factor']
+    )
+    assert simplify_tolerance(5) == pytest.approx(simplify_tolerance(4) / 2)
+    assert simplify_tolerance(TILES_CONFIG['simplify_max_zoom']) == 0.0
@@ -0,0 +1,33 @@
+"""Pruebas de las funciones puras de app.upload"""
+
+import zipfile
+from app.upload import has_prj
+from app.utils import vsizip_path
+
+
+def test_has_prj_on_disk(tmp_path):
+    (tmp_path / 'con.shp').write_bytes(b'')
+    (tmp_path / 'con.prj').write_text('GEOGCS["WGS 84"]')
+    (tmp_path / 'mayus.shp').write_bytes(b'')
+    (tmp_path / 'mayus.PRJ').write_text('GEOGCS["WGS 84"]')
+    (tmp_path / 'sin.shp').write_bytes(b'')
+
+    assert has_prj(str(tmp_path / 'con.shp'))
+    assert has_prj(str(tmp_path / 'mayus.shp'))
+    assert not has_prj(str(tmp_path / 'sin.shp'))
+
+
+def test_has_prj_inside_zip(tmp_path):
+    zip_path = tmp_path / 'carga.zip'
+    with zipfile.ZipFile(zip_path, 'w') as archive:
+        archive.writestr('datos/con.shp', b'')
+        archive.writestr('datos/CON.PRJ', 'GEOGCS["WGS 84"]')
+        archive.writestr('datos/sin.shp', b'')
+
+    assert has_prj(vsizip_path(str(zip_path), 'datos/con.shp'))
+    assert not has_prj(vsizip_path(str(zip_path), 'datos/sin.shp'))
+
+
+def test_has_prj_assumes_prj_when_zip_is_unreadable(tmp_path):
+    # Sin poder leer el ZIP no se fuerza un CRS de origen
+    assert has_prj(vsizip_path(str(tmp_path / 'no_existe.zip'), 'capa.shp'))
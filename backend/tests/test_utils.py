@@ -0,0 +1,37 @@
+"""Pruebas de las funciones puras de app.utils"""
+
+import os
+import zipfile
+from app.utils import find_shapefiles_in_zip, vsizip_path, sanitize_table_name, assign_table_names
+
+
+def test_find_shapefiles_in_zip_skips_macos_metadata(tmp_path):
+    zip_path = tmp_path / 'carga.zip'
+    with zipfile.ZipFile(zip_path, 'w') as archive:
+        for name in ('rios.shp', 'rios.dbf', 'datos/LIMITES.SHP', '__MACOSX/datos/._LIMITES.SHP', 'leeme.txt'):
+            archive.writestr(name, b'')
+
+    assert find_shapefiles_in_zip(str(zip_path)) == ['datos/LIMITES.SHP', 'rios.shp']
+
+
+def test_vsizip_path_uses_absolute_zip_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = vsizip_path('carga.zip', 'capas/municipios.shp')
+    assert path == f"/vsizip/{os.path.join(str(tmp_path), 'carga.zip')}/capas/municipios.shp"
+
+
+def test_sanitize_table_name():
+    assert sanitize_table_name('Municipios 2024') == 'municipios_2024'
+    assert sanitize_table_name('2024_rios') == 'capa_2024_rios'
+    assert sanitize_table_name('') == 'capa_'
+
+
+def test_assign_table_names_from_file_names():
+    layers = assign_table_names(['/tmp/x/Municipios.shp', '/vsizip//tmp/a.zip/datos/Rios-Principales.shp'])
+    assert layers == [('/tmp/x/Municipios.shp', 'municipios'),
+                      ('/vsizip//tmp/a.zip/datos/Rios-Principales.shp', 'rios_principales')]
+
+
+def test_assign_table_names_adds_suffix_to_repeated_names():
+    paths = ['a/limites.shp', 'b/limites.shp', 'c/LIMITES.shp', 'd/limites_2.shp']
+    assert [table for _, table in assign_table_names(paths)] == ['limites', 'limites_2', 'limites_3', 'limites_2_2']
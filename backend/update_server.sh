@@ -8,6 +8,7 @@ echo "Copiando archivos actualizados..."
 cp cors_middleware.py /var/www/GeoportalSV/backend/
 cp run.py /var/www/GeoportalSV/backend/
 cp app.py /var/www/GeoportalSV/backend/
+cp wsgi.py gunicorn.conf.py /var/www/GeoportalSV/backend/
 cp -r app /var/www/GeoportalSV/backend/
 
 # Crear el archivo upload.py específicamente
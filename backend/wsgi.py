@@ -0,0 +1,14 @@
+"""
+Punto de entrada WSGI del GeoportalSV para servidores de producción.
+
+Uso:
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+run.py, main.py y app.py usan el servidor de desarrollo de Werkzeug y solo
+deben emplearse en desarrollo.
+"""
+from app import create_app
+from cors_middleware import setup_cors_middleware
+
+# Misma aplicación que run.py: factory más middleware CORS
+app = setup_cors_middleware(create_app())
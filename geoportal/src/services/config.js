@@ -10,10 +10,23 @@ export const API_ROUTES = {
   // Asegurarse que todas las rutas estén en minúsculas
   UPLOAD_SHAPEFILE: `${API_URL}/upload-shapefile`,
   LAYERS: `${API_URL}/layers`,
+  // Estado de los trabajos de ingesta en segundo plano
+  JOBS: `${API_URL}/jobs`,
+  // Estadísticas y agregados calculados en el servidor
+  STATS: `${API_URL}/stats`,
+  // Teselas vectoriales (MVT) generadas por el backend desde PostGIS
+  TILES: `${API_URL}/tiles`,
+  // Búsqueda por nombre en las capas (índices de trigramas en PostGIS)
+  SEARCH: `${API_URL}/search`,
+  // Consulta de elementos en un punto para varias capas en una sola petición
+  FEATURE_INFO: `${API_URL}/feature-info`,
   // Añadir una ruta alternativa en caso de que la principal no funcione
   PROCESS_SHAPEFILE: `${API_URL}/process-shapefile`,
 };
 
+// Dibujar las capas como teselas vectoriales del backend en lugar de imágenes WMS de GeoServer
+export const USE_VECTOR_TILES = import.meta.env.VITE_VECTOR_TILES === 'true';
+
 // Configuración para solicitudes
 export const API_CONFIG = {
   DEFAULT_TIMEOUT: 600000,
@@ -1,6 +1,8 @@
 /**
  * Servicio para obtener información de entidades geográficas mediante WMS GetFeatureInfo
+ * o, para varias capas a la vez, mediante el endpoint /api/feature-info del backend
  */
+import { API_ROUTES } from './config';
 
 /**
  * Obtiene información de una característica geográfica en una ubicación específica del mapa
@@ -91,10 +93,10 @@ export async function getFeatureInfoFromAllLayers(map, coordinate, visibleLayers
 
   // Si no se proporcionan capas visibles, obtenerlas del mapa
   const layers = visibleLayers || map.getLayers().getArray().filter(layer => {
-    // Solo consultar capas WMS visibles
+    // Solo consultar capas WMS o de teselas vectoriales del backend visibles
     return layer.getVisible() && 
            layer.getSource() && 
-           typeof layer.getSource().getFeatureInfoUrl === 'function';
+           (typeof layer.getSource().getFeatureInfoUrl === 'function' || layer.get('type') === 'mvt');
   });
 
   if (layers.length === 0) {
@@ -105,7 +107,17 @@ export async function getFeatureInfoFromAllLayers(map, coordinate, visibleLayers
     };
   }
 
-  // Consultar cada capa y combinar resultados
+  // Una sola petición al backend para todas las capas (consultas en paralelo en el servidor)
+  try {
+    const batchResult = await getFeatureInfoBatch(map, coordinate, layers);
+    if (batchResult) {
+      return batchResult;
+    }
+  } catch (batchError) {
+    console.warn('Consulta combinada no disponible, usando GetFeatureInfo por capa:', batchError.message);
+  }
+
+  // Alternativa: consultar cada capa en GeoServer y combinar resultados
   const results = await Promise.all(
     layers.map(layer => getFeatureInfo(map, coordinate, layer))
   );
@@ -124,3 +136,74 @@ export async function getFeatureInfoFromAllLayers(map, coordinate, visibleLayers
   // Devolver el primer resultado con características
   return successfulResults[0];
 }
+
+/**
+ * Nombre de la tabla de una capa de OpenLayers (sin el prefijo del workspace)
+ * @param {Object} layer - Capa OpenLayers
+ * @returns {string|null} Nombre de la tabla
+ */
+function getLayerTableName(layer) {
+  const source = layer.getSource();
+  const wmsName = source && typeof source.getParams === 'function' ? source.getParams().LAYERS : null;
+  const name = wmsName || layer.get('id') || layer.get('name');
+  return name ? String(name).split(':').pop() : null;
+}
+
+/**
+ * Consulta todas las capas en una sola petición a /api/feature-info
+ * 
+ * @param {Object} map - Instancia del mapa OpenLayers
+ * @param {Array} coordinate - Coordenadas [x, y] donde se hizo clic (proyección del mapa)
+ * @param {Array} layers - Capas OpenLayers a consultar
+ * @param {Object} options - Opciones adicionales (featureCount, tolerance)
+ * @returns {Promise<Object|null>} Resultado de la primera capa con elementos, en el mismo formato que getFeatureInfo
+ */
+export async function getFeatureInfoBatch(map, coordinate, layers, options = {}) {
+  const tableNames = layers.map(getLayerTableName).filter(Boolean);
+  if (tableNames.length === 0) {
+    return null;
+  }
+  
+  const view = map.getView();
+  const params = new URLSearchParams({
+    layers: tableNames.join(','),
+    x: String(coordinate[0]),
+    y: String(coordinate[1]),
+    resolution: String(view.getResolution()),
+    srid: view.getProjection().getCode().split(':').pop(),
+    limit: String(options.featureCount || 10)
+  });
+  if (options.tolerance) params.set('tolerance', String(options.tolerance));
+  
+  const response = await fetch(`${API_ROUTES.FEATURE_INFO}/?${params}`);
+  if (!response.ok) {
+    throw new Error(`Error en la respuesta: ${response.status}`);
+  }
+  const payload = await response.json();
+  
+  // Mismo criterio que la consulta por capa: la primera capa (en orden) con elementos
+  const index = payload.data.layers.findIndex(result => result.features.length > 0);
+  if (index === -1) {
+    return {
+      success: false,
+      error: 'No se encontraron características en esta ubicación',
+      features: []
+    };
+  }
+  
+  const result = payload.data.layers[index];
+  const layer = layers[layers.findIndex(l => getLayerTableName(l) === result.layer)];
+  return {
+    success: true,
+    layerName: layer?.get('name') || layer?.get('title') || result.layer,
+    layerId: layer?.get('id'),
+    data: payload.data,
+    features: result.features.map(feature => ({
+      type: 'Feature',
+      id: feature.id,
+      properties: feature.properties,
+      geometry: feature.geometry
+    })),
+    timestamp: new Date().toISOString()
+  };
+}
@@ -1,6 +1,7 @@
 /**
  * Servicio para interactuar con GeoServer
  */
+import { API_ROUTES } from './config';
 
 // URL base del servidor GeoServer
 const GEOSERVER_URL = 'https://geoportal.sembrandodatos.com/geoserver';
@@ -12,11 +13,73 @@ const GEOSERVER_AUTH = {
   password: 'geoserver'
 };
 
+// Catálogo de capas del backend y su ETag (para pedirlo con If-None-Match)
+let catalogCache = null;
+let catalogEtag = null;
+
+/**
+ * Obtiene el catálogo de capas del backend (/api/layers/).
+ * Si el catálogo no cambió, el servidor responde 304 y se reutiliza la copia local.
+ * @returns {Promise<Object>} Datos del catálogo (workspace, wms_url, layers)
+ */
+export async function getLayerCatalog() {
+  const headers = { 'Accept': 'application/json' };
+  if (catalogEtag && catalogCache) {
+    headers['If-None-Match'] = catalogEtag;
+  }
+  
+  const response = await fetch(`${API_ROUTES.LAYERS}/`, { headers });
+  if (response.status === 304 && catalogCache) {
+    return catalogCache;
+  }
+  if (!response.ok) {
+    throw new Error(`Error en la respuesta del catálogo: ${response.status}`);
+  }
+  
+  const payload = await response.json();
+  catalogCache = payload.data;
+  catalogEtag = response.headers.get('ETag');
+  return catalogCache;
+}
+
 /**
- * Obtiene las capacidades del servicio WMS de GeoServer
+ * Convierte una capa del catálogo del backend al formato usado por los componentes del mapa
+ * @param {Object} layer - Capa del catálogo
+ * @returns {Object} Capa con id, name, title, boundingBox y legendUrl
+ */
+function catalogLayerToWMS(layer) {
+  return {
+    id: layer.name,
+    name: layer.full_name,
+    title: layer.name,
+    description: '',
+    boundingBox: layer.extent ? {
+      minx: layer.extent[0],
+      miny: layer.extent[1],
+      maxx: layer.extent[2],
+      maxy: layer.extent[3],
+      crs: 'EPSG:4326'
+    } : null,
+    styles: [],
+    legendUrl: getLegendUrl(layer.full_name),
+    geometryType: layer.geometry_type,
+    rowsEstimate: layer.rows_estimate
+  };
+}
+
+/**
+ * Obtiene las capacidades del servicio WMS de GeoServer.
+ * Usa el catálogo del backend y solo recurre a GetCapabilities si no está disponible.
  * @returns {Promise<Array>} Lista de capas disponibles
  */
 export async function getWMSCapabilities() {
+  try {
+    const catalog = await getLayerCatalog();
+    return catalog.layers.filter(layer => layer.published).map(catalogLayerToWMS);
+  } catch (catalogError) {
+    console.warn('Catálogo del backend no disponible, usando GetCapabilities:', catalogError.message);
+  }
+  
   try {
     // Construir la URL para el request GetCapabilities
     const url = `${GEOSERVER_URL}/${WORKSPACE}/wms?service=WMS&version=1.1.1&request=GetCapabilities`;
@@ -191,6 +254,25 @@ export function getWorkspace() {
  * @returns {Promise<Array>} Lista de capas disponibles
  */
 export async function getAvailableLayers() {
+  try {
+    const catalog = await getLayerCatalog();
+    return catalog.layers.filter(layer => layer.published).map(layer => ({
+      name: layer.name,
+      title: layer.name,
+      abstract: '',
+      fullName: layer.full_name,
+      workspace: WORKSPACE,
+      wmsUrl: `${GEOSERVER_URL}/${WORKSPACE}/wms`,
+      wfsUrl: `${GEOSERVER_URL}/wfs`,
+      legendUrl: getLegendUrl(layer.full_name),
+      geometryType: layer.geometry_type,
+      rowsEstimate: layer.rows_estimate,
+      extent: layer.extent
+    }));
+  } catch (catalogError) {
+    console.warn('Catálogo del backend no disponible, usando el API REST de GeoServer:', catalogError.message);
+  }
+  
   try {
     // URL del API REST de GeoServer para listar feature types
     const url = `${GEOSERVER_URL}/rest/workspaces/${WORKSPACE}/featuretypes.json`;
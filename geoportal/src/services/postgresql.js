@@ -1,35 +1,106 @@
 // Servicio para interactuar con la base de datos PostgreSQL/PostGIS
-
-// URL base para las peticiones a la API
-const API_URL = import.meta.env.VITE_API_URL || 'http://31.97.8.51:5000';
+import { API_ROUTES } from './config';
 
 /**
  * Obtiene los datos tabulares de una capa específica
  * @param {string} layerName - Nombre de la capa
- * @returns {Promise<Array>} - Datos de la capa
+ * @param {Object} options - Opciones de consulta (limit, after, columns, bbox, filters, geometry, zoom)
+ * @returns {Promise<Array>} - Datos de la capa (con la propiedad nextCursor si hay más páginas)
  */
-export const getLayerData = async (layerName) => {
+export const getLayerData = async (layerName, options = {}) => {
   try {
     if (!layerName) {
       throw new Error('Nombre de capa no especificado');
     }
     
-    // Aquí normalmente iríamos a la API
-    // const response = await fetch(`${API_URL}/api/layers/${layerName}/data`);
-    // if (!response.ok) throw new Error('Error al obtener datos de la capa');
-    // return await response.json();
+    const params = new URLSearchParams({ limit: String(options.limit || 500) });
+    if (options.after !== undefined && options.after !== null) params.set('after', options.after);
+    if (options.columns) params.set('columns', options.columns.join(','));
+    if (options.bbox) params.set('bbox', options.bbox.join(','));
+    (options.filters || []).forEach(filter => params.append('filter', filter));
+    if (options.geometry) params.set('geometry', 'true');
+    // Con el zoom del mapa el servidor devuelve la geometría generalizada adecuada
+    if (options.zoom !== undefined && options.zoom !== null) params.set('zoom', String(Math.floor(options.zoom)));
     
-    // Solución temporal con datos de prueba
-    console.log(`Generando datos de prueba para la capa: ${layerName}`);
-    const mockData = generateMockData(layerName);
-    console.log(`Datos generados:`, mockData.slice(0, 2), `... (total: ${mockData.length})`);
-    return mockData;
+    try {
+      const response = await fetch(`${API_ROUTES.LAYERS}/${encodeURIComponent(layerName)}/data?${params}`);
+      if (!response.ok) throw new Error(`Error al obtener datos de la capa (HTTP ${response.status})`);
+      const payload = await response.json();
+      const data = payload.data || [];
+      data.nextCursor = payload.next_cursor;
+      return data;
+    } catch (apiError) {
+      // Solución temporal con datos de prueba si la API no está disponible
+      console.warn(`No se pudieron obtener datos reales de ${layerName}, usando datos de prueba:`, apiError.message);
+      return generateMockData(layerName);
+    }
   } catch (error) {
     console.error('Error al obtener datos de la capa:', error);
     throw error; // Propagar el error original para mejor manejo
   }
 };
 
+/**
+ * Obtiene el resumen estadístico de una capa completa calculado en el servidor
+ * @param {string} layerName - Nombre de la capa
+ * @param {Object} options - Opciones (columns, bins, top, filters, sample)
+ * @returns {Promise<Object>} - Registros totales y resumen por columna
+ */
+export const getLayerStats = async (layerName, options = {}) => {
+  const params = new URLSearchParams();
+  if (options.columns) params.set('columns', options.columns.join(','));
+  if (options.bins) params.set('bins', String(options.bins));
+  if (options.top) params.set('top', String(options.top));
+  if (options.sample) params.set('sample', String(options.sample));
+  (options.filters || []).forEach(filter => params.append('filter', filter));
+  
+  const response = await fetch(`${API_ROUTES.STATS}/${encodeURIComponent(layerName)}?${params}`);
+  const payload = await response.json();
+  if (!response.ok || !payload.success) {
+    throw new Error(payload.message || 'Error al obtener las estadísticas de la capa');
+  }
+  return payload.data;
+};
+
+/**
+ * Obtiene agregados por grupo de una capa calculados en el servidor
+ * @param {string} layerName - Nombre de la capa
+ * @param {Array<string>} groupBy - Columnas de agrupación
+ * @param {Array<string>} aggregates - Agregaciones con el formato función:columna (por ejemplo sum:poblacion)
+ * @returns {Promise<Array>} - Grupos con sus agregados
+ */
+export const getLayerAggregate = async (layerName, groupBy = [], aggregates = ['count']) => {
+  const params = new URLSearchParams();
+  if (groupBy.length) params.set('group_by', groupBy.join(','));
+  aggregates.forEach(aggregate => params.append('agg', aggregate));
+  
+  const response = await fetch(`${API_ROUTES.STATS}/${encodeURIComponent(layerName)}/aggregate?${params}`);
+  const payload = await response.json();
+  if (!response.ok || !payload.success) {
+    throw new Error(payload.message || 'Error al obtener los agregados de la capa');
+  }
+  return payload.data.groups;
+};
+
+/**
+ * Busca elementos por nombre en las capas publicadas (coincidencia parcial o aproximada)
+ * @param {string} query - Texto a buscar
+ * @param {Object} options - Opciones (layers, limit)
+ * @returns {Promise<Array>} - Resultados {layer, id, name, score, bbox} ordenados por relevancia
+ */
+export const searchFeatures = async (query, options = {}) => {
+  const params = new URLSearchParams({ q: query });
+  if (options.layers) params.set('layers', options.layers.join(','));
+  if (options.limit) params.set('limit', String(options.limit));
+  
+  const response = await fetch(`${API_ROUTES.SEARCH}/?${params}`);
+  const payload = await response.json();
+  if (!response.ok || !payload.success) {
+    throw new Error(payload.message || 'Error en la búsqueda');
+  }
+  return payload.data.results;
+};
+
 /**
  * Función para generar datos de prueba según el tipo de capa
  * @param {string} layerName - Nombre de la capa